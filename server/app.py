@@ -1,124 +1,571 @@
-from flask import Flask, make_response, request, jsonify
-from flask_migrate import Migrate
+import csv
+import io
+import json
+import os
+import weakref
+from collections import defaultdict
+
+import click
+from flask import Blueprint, Flask, Response, current_app, request, stream_with_context, url_for
 from marshmallow import ValidationError
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import configure_mappers
 
-from models import db, Exercise, Workout, WorkoutExercise
+from archive import ARCHIVE_BATCH_SIZE, archive_workouts_before, delete_workouts_before
+from cache import ResponseCache
+from conditional import (
+    expected_versions, is_modified, touch_workouts, validator_headers, version_condition, workout_version_query
+)
+from config import get_config, engine_options, set_sqlite_pragmas
+from encoders import FastJSONProvider, encode_response, negotiate_mimetype
+from metrics import Metrics, timed
+from models import db, begin_transaction, UPSERT_DIALECTS, Exercise, Workout, WorkoutExercise
+from pagination import parse_limit, parse_date, parse_int, encode_cursor, decode_cursor, paginate
+from query_counter import check_query_budgets
+from query_plans import check_query_plans
+from replicas import ReplicaRouter
+from related import rebuild_pairs, record_pairs, related_exercises, suggested_exercises, workout_pair_entries
+from records import progression, rebuild_personal_records, record_personal_records, records_from_workouts, refresh_personal_records
+from queries import (
+    WORKOUT_FIELDS, WORKOUT_INCLUDES, EXERCISE_FIELDS, EXERCISE_INCLUDES,
+    parse_fieldset, parse_workout_list_args, parse_exercise_list_args,
+    workouts_page_query, exercises_page_query, workout_query, exercise_query,
+    workout_links_query, exercise_workouts_query, workout_cursor, exercise_cursor
+)
+from rules import EXERCISE_RULES, WORKOUT_RULES, build_trusted
+from search import SEARCH_TYPES, exercise_search_query, rebuild_search_index, workout_search_query
+from serializers import (
+    exercises_from_rows, workouts_from_rows, workout_detail_from_rows, exercise_detail_from_rows,
+    sparse_exercises_from_rows, sparse_workouts_from_rows, sparse_exercise_detail_from_rows
+)
+from stats import record_volume, rebuild_volume, volume_stats, workout_volume_entries
+from write_behind import AckTimeout, QueueFull, create_write_queue
 from schemas import (
-    exercise_schema, exercises_schema,
-    workout_schema, workouts_schema,
-    workout_exercise_schema
+    exercise_schema, workout_schema,
+    workout_exercise_schema, workout_exercises_batch_schema, bulk_workouts_schema
 )
 
-app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///app.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Largest number of workouts accepted by one POST /workouts/bulk request
+BULK_MAX_ITEMS = 5000
+
+# Default and largest rolling-average window of /exercises/<id>/progression, in days
+PROGRESSION_WINDOW = 28
+PROGRESSION_MAX_WINDOW = 366
 
-migrate = Migrate(app, db)
-db.init_app(app)
+# Default and largest number of results of /exercises/<id>/related and /workouts/<id>/suggestions
+RELATED_LIMIT = 10
+RELATED_MAX_LIMIT = 100
+
+# Rows fetched per round trip while streaming an export
+EXPORT_BATCH_SIZE = 1000
+EXPORT_COLUMNS = [
+    'workout_id', 'date', 'duration_minutes', 'notes',
+    'workout_exercise_id', 'exercise_id', 'exercise_name', 'exercise_category',
+    'reps', 'sets', 'duration_seconds',
+]
+
+api = Blueprint('api', __name__, cli_group=None)
+response_cache = ResponseCache()
+metrics = Metrics()
+replicas = ReplicaRouter()
 
 # Helper function for error responses
 def create_error_response(message, status_code=400):
-    return make_response(jsonify({'error': message}), status_code)
+    with timed('encode'):
+        return encode_response({'error': message}, status_code)
 
 # Helper function for success responses
 def create_success_response(data, status_code=200):
-    return make_response(jsonify(data), status_code)
+    with timed('encode'):
+        return encode_response(data, status_code)
+
+# Helper function telling which kind of constraint an IntegrityError broke:
+# 'unique', 'foreign_key', or None for anything else
+def constraint_violation(error):
+    code = getattr(error.orig, 'pgcode', None) or getattr(error.orig, 'sqlstate', None)
+    if code == '23505' or 'UNIQUE constraint failed' in str(error.orig):
+        return 'unique'
+    if code == '23503' or 'FOREIGN KEY constraint failed' in str(error.orig):
+        return 'foreign_key'
+    return None
+
+# Helper function for a write whose If-Match precondition (or workout) was
+# not found; call it after rolling the write back
+def precondition_failed_response(workout_id):
+    current = db.session.execute(workout_version_query(workout_id)).first()
+    if current is None:
+        return create_error_response("Workout not found", 404)
+    response = create_error_response("Workout has been modified; fetch it again and retry", 412)
+    response.headers.update(validator_headers(workout_id, *current, response.mimetype))
+    return response
+
+# Helper function for paginated list responses. The body stays a plain list;
+# the cursor for the next page is returned in the Link/X-Next-Cursor headers.
+def create_page_response(data, next_cursor):
+    response = create_success_response(data)
+    if next_cursor:
+        args = request.args.to_dict()
+        args['cursor'] = next_cursor
+        response.headers['Link'] = f'<{url_for(request.endpoint, **args)}>; rel="next"'
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+# Helper function for reading a bulk request body. Accepts a JSON array or
+# NDJSON (one JSON object per line). Returns (items, errors) where errors maps
+# the position of any unparseable line to its message.
+def parse_bulk_items():
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        items, errors = [], {}
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError:
+                errors[len(items)] = ["Invalid JSON"]
+                items.append(None)
+        return items, errors
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, list):
+        raise ValueError("Request body must be a JSON array or NDJSON")
+    return data, {}
+
+# Helper function for the ?limit= of the related-exercise endpoints
+def parse_related_limit():
+    limit = parse_int(request.args.get('limit', RELATED_LIMIT), 'limit')
+    if not 1 <= limit <= RELATED_MAX_LIMIT:
+        raise ValueError(f"limit must be between 1 and {RELATED_MAX_LIMIT}")
+    return limit
+
+# Helper for CLI commands that change data behind the cached views. Only a
+# shared cache (RESPONSE_CACHE_URL) carries the invalidation to the serving
+# workers; an in-process cache belongs to this CLI process alone.
+def invalidate_for_workers(*names):
+    response_cache.invalidate(*names)
+    if not response_cache.backend.shared:
+        ttl = current_app.config['RESPONSE_CACHE_TTL']
+        click.echo(
+            f"Warning: RESPONSE_CACHE_URL is not set, so running workers may serve stale cached "
+            f"responses for up to {ttl}s; restart them to clear their caches now", err=True
+        )
+
+# Generators for GET /workouts/export. Both consume the flattened
+# workout LEFT JOIN workout_exercises rows in (date, id) order.
+def export_ndjson(rows):
+    """One JSON object per workout, with its workout_exercises nested"""
+    current = None
+    for row in rows:
+        if current is None or current['id'] != row.workout_id:
+            if current is not None:
+                yield json.dumps(current) + '\n'
+            current = {
+                'id': row.workout_id,
+                'date': row.date.isoformat(),
+                'duration_minutes': row.duration_minutes,
+                'notes': row.notes,
+                'workout_exercises': [],
+            }
+        if row.workout_exercise_id is not None:
+            current['workout_exercises'].append({
+                'id': row.workout_exercise_id,
+                'exercise_id': row.exercise_id,
+                'exercise_name': row.exercise_name,
+                'exercise_category': row.exercise_category,
+                'reps': row.reps,
+                'sets': row.sets,
+                'duration_seconds': row.duration_seconds,
+            })
+    if current is not None:
+        yield json.dumps(current) + '\n'
+
+def export_csv(rows):
+    """One CSV line per workout exercise (or per workout with none)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for i, row in enumerate(rows, 1):
+        writer.writerow([row.workout_id, row.date.isoformat()] + list(row[2:]))
+        if i % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
 
 # WORKOUT ENDPOINTS
-@app.route('/workouts', methods=['GET'])
+@api.route('/workouts', methods=['GET'])
+@replicas.reads
 def get_workouts():
-    """List all workouts"""
-    workouts = Workout.query.all()
-    return create_success_response(workouts_schema.dump(workouts))
+    """List workouts, newest first, one keyset page at a time.
+
+    Query params: limit, cursor, start_date, end_date, category,
+    fields (id, date, duration_minutes, notes), include (exercises, workout_exercises)
+    """
+    try:
+        params = parse_workout_list_args(request.args)
+    except ValueError as e:
+        return create_error_response(str(e))
 
-@app.route('/workouts/<int:id>', methods=['GET'])
+    # Serialized straight from row tuples: one query for the page of
+    # workouts, one for all of their exercises (skipped if none are included)
+    fields, include = params['fields'], params['include']
+    workouts, has_more = paginate(workouts_page_query(**params), params['limit'], db.session.execute)
+    links = []
+    if workouts and (fields is None or include):
+        links = db.session.execute(workout_links_query([w.id for w in workouts])).all()
+    next_cursor = encode_cursor(*workout_cursor(workouts[-1])) if has_more else None
+    if fields is None:
+        return create_page_response(workouts_from_rows(workouts, links), next_cursor)
+    return create_page_response(sparse_workouts_from_rows(workouts, links, fields, include), next_cursor)
+
+@api.route('/workouts/export', methods=['GET'])
+def export_workouts():
+    """Stream the full workout history as NDJSON or CSV.
+
+    Query params: format (ndjson or csv), start_date, end_date
+    """
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in ('ndjson', 'csv'):
+        return create_error_response("format must be one of: ndjson, csv")
+    try:
+        start_date = parse_date(request.args.get('start_date'), 'start_date')
+        end_date = parse_date(request.args.get('end_date'), 'end_date')
+    except ValueError as e:
+        return create_error_response(str(e))
+
+    stmt = (
+        select(
+            Workout.id.label('workout_id'), Workout.date, Workout.duration_minutes, Workout.notes,
+            WorkoutExercise.id.label('workout_exercise_id'), WorkoutExercise.exercise_id,
+            Exercise.name.label('exercise_name'), Exercise.category.label('exercise_category'),
+            WorkoutExercise.reps, WorkoutExercise.sets, WorkoutExercise.duration_seconds,
+        )
+        .outerjoin(WorkoutExercise, WorkoutExercise.workout_id == Workout.id)
+        .outerjoin(Exercise, Exercise.id == WorkoutExercise.exercise_id)
+        .order_by(Workout.date, Workout.id, WorkoutExercise.id)
+    )
+    if start_date:
+        stmt = stmt.where(Workout.date >= start_date)
+    if end_date:
+        stmt = stmt.where(Workout.date <= end_date)
+
+    def generate():
+        # yield_per streams from a server-side cursor where the driver supports it
+        rows = db.session.execute(stmt, execution_options={'yield_per': EXPORT_BATCH_SIZE})
+        try:
+            if export_format == 'csv':
+                yield from export_csv(rows)
+            else:
+                yield from export_ndjson(rows)
+        finally:
+            rows.close()
+
+    if export_format == 'csv':
+        mimetype, filename = 'text/csv', 'workouts.csv'
+    else:
+        mimetype, filename = 'application/x-ndjson', 'workouts.ndjson'
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+@api.route('/workouts/<int:id>', methods=['GET'])
+@replicas.reads
 def get_workout(id):
-    """Show a single workout with its associated exercises"""
-    workout = Workout.query.get(id)
+    """Show a single workout with its associated exercises.
+
+    Sends ETag and Last-Modified; If-None-Match / If-Modified-Since are
+    answered with a 304 from the workout's version alone.
+
+    Query params: fields, include (as for GET /workouts)
+    """
+    try:
+        fields, include = parse_fieldset(request.args, WORKOUT_FIELDS, WORKOUT_INCLUDES)
+    except ValueError as e:
+        return create_error_response(str(e))
+    if request.if_none_match or request.if_modified_since:
+        mimetype = negotiate_mimetype()
+        current = db.session.execute(workout_version_query(id)).first()
+        if current and not is_modified(request.environ, id, *current, mimetype):
+            response = Response(status=304, headers=validator_headers(id, *current, mimetype))
+            response.vary.add('Accept')
+            return response
+
+    workout = db.session.execute(workout_query(id, fields)).first()
     if not workout:
         return create_error_response("Workout not found", 404)
     
     # Include workout exercises data for stretch goal
-    workout_data = workout_schema.dump(workout)
-    workout_data['workout_exercises'] = [
-        {
-            'id': we.id,
-            'exercise': exercise_schema.dump(we.exercise),
-            'reps': we.reps,
-            'sets': we.sets,
-            'duration_seconds': we.duration_seconds
-        }
-        for we in workout.workout_exercises
-    ]
-    
-    return create_success_response(workout_data)
+    if fields is None:
+        links = db.session.execute(workout_links_query([id])).all()
+        body = workout_detail_from_rows(workout, links)
+    else:
+        links = db.session.execute(workout_links_query([id])).all() if include else []
+        body = sparse_workouts_from_rows([workout], links, fields, include)[0]
+    response = create_success_response(body)
+    response.headers.update(validator_headers(id, workout.version, workout.updated_at, response.mimetype))
+    return response
+
+@api.route('/workouts/<int:id>/suggestions', methods=['GET'])
+@response_cache.cached('exercises', 'workout_exercises')
+def get_workout_suggestions(id):
+    """Exercises to add to a workout, ranked by how often they are trained with its current ones
+
+    Query params: limit (default 10)
+    """
+    try:
+        limit = parse_related_limit()
+    except ValueError as e:
+        return create_error_response(str(e))
 
-@app.route('/workouts', methods=['POST'])
+    suggestions = suggested_exercises(id, limit)
+    if suggestions is None:
+        return create_error_response("Workout not found", 404)
+    return create_success_response({'workout_id': id, 'suggestions': suggestions})
+
+@api.route('/workouts', methods=['POST'])
 def create_workout():
     """Create a workout"""
     try:
         data = workout_schema.load(request.json)
-        workout = Workout(**data)
+        workout = build_trusted(Workout, WORKOUT_RULES, data)
         db.session.add(workout)
         db.session.commit()
-        return create_success_response(workout_schema.dump(workout), 201)
+        response = create_success_response(workout_schema.dump(workout), 201)
+        response.headers.update(validator_headers(workout.id, workout.version, workout.updated_at, response.mimetype))
+        return response
     except ValidationError as e:
         return create_error_response(str(e.messages))
     except Exception as e:
         db.session.rollback()
         return create_error_response(str(e))
 
-@app.route('/workouts/<int:id>', methods=['DELETE'])
+@api.route('/workouts/bulk', methods=['POST'])
+def create_workouts_bulk():
+    """Create many workouts (with nested workout_exercises) in one transaction.
+
+    Invalid items are reported by position in 'errors' and skipped; the
+    valid ones are still inserted.
+    """
+    try:
+        items, errors = parse_bulk_items()
+    except ValueError as e:
+        return create_error_response(str(e))
+    if len(items) > BULK_MAX_ITEMS:
+        return create_error_response(f"Cannot create more than {BULK_MAX_ITEMS} workouts per request", 413)
+
+    # Validate everything in one pass; valid_data stays aligned with items
+    positions = [i for i, item in enumerate(items) if i not in errors]
+    try:
+        loaded = bulk_workouts_schema.load([items[i] for i in positions])
+        schema_errors = {}
+    except ValidationError as e:
+        loaded, schema_errors = e.valid_data, e.messages
+    valid = []
+    for idx, data in enumerate(loaded):
+        if idx in schema_errors:
+            errors[positions[idx]] = schema_errors[idx]
+        else:
+            valid.append((positions[idx], data))
+
+    # One query to check every referenced exercise exists
+    exercise_ids = {we['exercise_id'] for _, data in valid for we in data['workout_exercises']}
+    if exercise_ids:
+        found = set(db.session.scalars(select(Exercise.id).where(Exercise.id.in_(exercise_ids))))
+        missing = exercise_ids - found
+        if missing:
+            still_valid = []
+            for position, data in valid:
+                bad = sorted({we['exercise_id'] for we in data['workout_exercises']} & missing)
+                if bad:
+                    errors[position] = {'workout_exercises': [f"Exercise not found: {', '.join(map(str, bad))}"]}
+                else:
+                    still_valid.append((position, data))
+            valid = still_valid
+
+    created = []
+    if valid:
+        try:
+            workout_rows = [
+                {'date': data['date'], 'duration_minutes': data['duration_minutes'], 'notes': data['notes']}
+                for _, data in valid
+            ]
+            created = list(db.session.scalars(
+                insert(Workout).returning(Workout.id, sort_by_parameter_order=True),
+                workout_rows
+            ))
+            workout_exercise_rows = [
+                dict(we, workout_id=workout_id)
+                for workout_id, (_, data) in zip(created, valid)
+                for we in data['workout_exercises']
+            ]
+            if workout_exercise_rows:
+                db.session.execute(insert(WorkoutExercise), workout_exercise_rows)
+                record_volume(
+                    (data['date'], we['exercise_id'], data['duration_minutes'],
+                     we.get('sets'), we.get('reps'), we.get('duration_seconds'))
+                    for _, data in valid
+                    for we in data['workout_exercises']
+                )
+                record_personal_records(
+                    (data['date'], we['exercise_id'], workout_id, we.get('sets'), we.get('reps'), we.get('duration_seconds'))
+                    for workout_id, (_, data) in zip(created, valid)
+                    for we in data['workout_exercises']
+                )
+                record_pairs(
+                    ([we['exercise_id'] for we in data['workout_exercises']],) * 2 for _, data in valid
+                )
+            db.session.commit()
+            if workout_exercise_rows:
+                response_cache.invalidate('workout_exercises')
+        except Exception as e:
+            db.session.rollback()
+            return create_error_response(str(e))
+
+    body = {'created': created, 'errors': {str(k): v for k, v in sorted(errors.items())}}
+    return create_success_response(body, 201 if created or not errors else 400)
+
+@api.route('/workouts/<int:id>', methods=['DELETE'])
 def delete_workout(id):
-    """Delete a workout (stretch goal: delete associated WorkoutExercises)"""
-    workout = Workout.query.get(id)
-    if not workout:
-        return create_error_response("Workout not found", 404)
-    
+    """Delete a workout (stretch goal: delete associated WorkoutExercises)
+
+    With If-Match, only deletes the workout if it is still at that version.
+    """
+    versions = expected_versions(request.if_match, id)
     try:
-        # Associated WorkoutExercises are deleted automatically due to cascade
-        db.session.delete(workout)
+        entries = workout_volume_entries([id])
+        pairs = workout_pair_entries([id])
+        record_holders = records_from_workouts([id])
+        # Associated WorkoutExercises and personal records are deleted by the
+        # database (ON DELETE CASCADE)
+        result = db.session.execute(delete(Workout).where(*version_condition(id, versions)))
+        if result.rowcount == 0:
+            db.session.rollback()
+            return precondition_failed_response(id)
+        record_volume(entries, sign=-1)
+        record_pairs(pairs, sign=-1)
+        refresh_personal_records(record_holders)
         db.session.commit()
+        response_cache.invalidate('workout_exercises')
         return create_success_response({'message': 'Workout deleted successfully'})
     except Exception as e:
         db.session.rollback()
         return create_error_response(str(e))
 
+@api.route('/workouts', methods=['DELETE'])
+def delete_workouts():
+    """Delete every workout dated before ?before=YYYY-MM-DD, in batches"""
+    try:
+        before = parse_date(request.args.get('before'), 'before')
+    except ValueError as e:
+        return create_error_response(str(e))
+    if before is None:
+        return create_error_response("before is required")
+
+    try:
+        deleted = delete_workouts_before(before)
+    except Exception as e:
+        db.session.rollback()
+        return create_error_response(str(e))
+    finally:
+        # Batches committed before a failure are gone too
+        response_cache.invalidate('workout_exercises')
+    return create_success_response({'deleted': deleted})
+
 # EXERCISE ENDPOINTS
-@app.route('/exercises', methods=['GET'])
+@api.route('/exercises', methods=['GET'])
+@response_cache.cached('exercises')
+@replicas.reads
 def get_exercises():
-    """List all exercises"""
-    exercises = Exercise.query.all()
-    return create_success_response(exercises_schema.dump(exercises))
+    """List exercises ordered by id, one keyset page at a time.
+
+    Query params: limit, cursor, category, fields (id, name, category, equipment_needed)
+    """
+    try:
+        params = parse_exercise_list_args(request.args)
+    except ValueError as e:
+        return create_error_response(str(e))
+
+    exercises, has_more = paginate(exercises_page_query(**params), params['limit'], db.session.execute)
+    next_cursor = encode_cursor(*exercise_cursor(exercises[-1])) if has_more else None
+    if params['fields'] is None:
+        return create_page_response(exercises_from_rows(exercises), next_cursor)
+    return create_page_response(sparse_exercises_from_rows(exercises, params['fields']), next_cursor)
 
-@app.route('/exercises/<int:id>', methods=['GET'])
+@api.route('/exercises/<int:id>', methods=['GET'])
+@response_cache.cached('exercises', 'workout_exercises')
+@replicas.reads
 def get_exercise(id):
-    """Show an exercise and associated workouts"""
-    exercise = Exercise.query.get(id)
+    """Show an exercise and associated workouts
+
+    Query params: fields (as for GET /exercises), include (workouts)
+    """
+    try:
+        fields, include = parse_fieldset(request.args, EXERCISE_FIELDS, EXERCISE_INCLUDES)
+    except ValueError as e:
+        return create_error_response(str(e))
+    exercise = db.session.execute(exercise_query(id, fields)).first()
     if not exercise:
         return create_error_response("Exercise not found", 404)
     
-    exercise_data = exercise_schema.dump(exercise)
-    exercise_data['workouts'] = [
-        {
-            'id': workout.id,
-            'date': workout.date.isoformat(),
-            'duration_minutes': workout.duration_minutes,
-            'notes': workout.notes
-        }
-        for workout in exercise.workouts
-    ]
-    
-    return create_success_response(exercise_data)
+    if fields is None:
+        workouts = db.session.execute(exercise_workouts_query(id)).all()
+        return create_success_response(exercise_detail_from_rows(exercise, workouts))
+    workouts = db.session.execute(exercise_workouts_query(id)).all() if include else []
+    return create_success_response(sparse_exercise_detail_from_rows(exercise, workouts, fields, include))
 
-@app.route('/exercises', methods=['POST'])
+@api.route('/exercises/<int:id>/progression', methods=['GET'])
+@response_cache.cached('exercises', 'workout_exercises')
+def get_exercise_progression(id):
+    """Personal records and daily progression of an exercise, with rolling averages
+
+    Query params: start_date, end_date, window (days, default 28)
+    """
+    try:
+        start_date = parse_date(request.args.get('start_date'), 'start_date')
+        end_date = parse_date(request.args.get('end_date'), 'end_date')
+        window = parse_int(request.args.get('window', PROGRESSION_WINDOW), 'window')
+    except ValueError as e:
+        return create_error_response(str(e))
+    if not 1 <= window <= PROGRESSION_MAX_WINDOW:
+        return create_error_response(f"window must be between 1 and {PROGRESSION_MAX_WINDOW}")
+
+    exercise = db.session.execute(exercise_query(id)).first()
+    if not exercise:
+        return create_error_response("Exercise not found", 404)
+    body = progression(id, start_date=start_date, end_date=end_date, window=window)
+    return create_success_response(dict(exercise=exercises_from_rows([exercise])[0], **body))
+
+@api.route('/exercises/<int:id>/related', methods=['GET'])
+@response_cache.cached('exercises', 'workout_exercises')
+def get_related_exercises(id):
+    """The exercises most often trained in the same workouts as this one
+
+    Query params: limit (default 10)
+    """
+    try:
+        limit = parse_related_limit()
+    except ValueError as e:
+        return create_error_response(str(e))
+
+    exercise = db.session.execute(exercise_query(id)).first()
+    if not exercise:
+        return create_error_response("Exercise not found", 404)
+    return create_success_response(dict(exercise=exercises_from_rows([exercise])[0], **related_exercises(id, limit)))
+
+@api.route('/exercises', methods=['POST'])
 def create_exercise():
     """Create an exercise"""
     try:
         data = exercise_schema.load(request.json)
-        exercise = Exercise(**data)
+        exercise = build_trusted(Exercise, EXERCISE_RULES, data)
         db.session.add(exercise)
         db.session.commit()
+        response_cache.invalidate('exercises')
         return create_success_response(exercise_schema.dump(exercise), 201)
     except ValidationError as e:
         return create_error_response(str(e.messages))
@@ -126,43 +573,137 @@ def create_exercise():
         db.session.rollback()
         return create_error_response(str(e))
 
-@app.route('/exercises/<int:id>', methods=['DELETE'])
+@api.route('/exercises/<int:id>', methods=['DELETE'])
 def delete_exercise(id):
     """Delete an exercise (stretch goal: delete associated WorkoutExercises)"""
-    exercise = Exercise.query.get(id)
-    if not exercise:
-        return create_error_response("Exercise not found", 404)
-    
     try:
-        # Associated WorkoutExercises are deleted automatically due to cascade
-        db.session.delete(exercise)
+        # Associated WorkoutExercises and volume rows are deleted by the
+        # database (ON DELETE CASCADE), changing the workouts they were in
+        touch_workouts(Workout.id.in_(select(WorkoutExercise.workout_id).where(WorkoutExercise.exercise_id == id)))
+        result = db.session.execute(delete(Exercise).where(Exercise.id == id))
+        if result.rowcount == 0:
+            db.session.rollback()
+            return create_error_response("Exercise not found", 404)
         db.session.commit()
+        response_cache.invalidate('exercises', 'workout_exercises')
         return create_success_response({'message': 'Exercise deleted successfully'})
     except Exception as e:
         db.session.rollback()
         return create_error_response(str(e))
 
 # WORKOUT EXERCISE ENDPOINTS
-@app.route('/workouts/<int:workout_id>/exercises/<int:exercise_id>/workout_exercises', methods=['POST'])
+
+# Inserts workout exercises for one workout in a single statement, relying on
+# unique_workout_exercise and the foreign keys instead of checking first.
+# Returns the bodies of the new rows, as workout_exercise_schema would dump
+# them, and the workout's new (version, updated_at) for validator_headers;
+# or None, None when the workout is missing or not at one of `versions`
+# (from If-Match).
+def attach_exercises(workout_id, items, versions=None):
+    if not touch_workouts(*version_condition(workout_id, versions)):
+        return None, None
+    rows = db.session.execute(insert_workout_exercises([(workout_id, item) for item in items])).all()
+    return describe_new_links([workout_id], {row.id for row in rows})[workout_id]
+
+def insert_workout_exercises(entries):
+    """INSERT ... RETURNING id, workout_id, exercise_id for (workout_id, item) entries"""
+    return (
+        insert(WorkoutExercise)
+        .values([
+            {
+                'workout_id': workout_id,
+                'exercise_id': item['exercise_id'],
+                'reps': item.get('reps'),
+                'sets': item.get('sets'),
+                'duration_seconds': item.get('duration_seconds'),
+            }
+            for workout_id, item in entries
+        ])
+        .returning(WorkoutExercise.id, WorkoutExercise.workout_id, WorkoutExercise.exercise_id)
+    )
+
+# Records volume, personal records and exercise pairs for newly inserted workout exercises.
+# Returns {workout_id: (bodies of the new rows, (version, updated_at))}.
+# Validator headers depend on the response type, so the caller builds them.
+def describe_new_links(workout_ids, new_ids):
+    workouts = {id: db.session.execute(workout_query(id)).first() for id in workout_ids}
+    links = db.session.execute(workout_links_query(list(workout_ids))).all()
+    new_links = [link for link in links if link[1] in new_ids]
+    record_volume(
+        (workouts[workout_id].date, exercise_id, workouts[workout_id].duration_minutes, sets, reps, duration_seconds)
+        for workout_id, _, reps, sets, duration_seconds, exercise_id, *_ in new_links
+    )
+    record_personal_records(
+        (workouts[workout_id].date, exercise_id, workout_id, sets, reps, duration_seconds)
+        for workout_id, _, reps, sets, duration_seconds, exercise_id, *_ in new_links
+    )
+    exercise_ids = defaultdict(list)
+    for workout_id, _, _, _, _, exercise_id, *_ in links:
+        exercise_ids[workout_id].append(exercise_id)
+    new_exercise_ids = defaultdict(list)
+    for workout_id, _, _, _, _, exercise_id, *_ in new_links:
+        new_exercise_ids[workout_id].append(exercise_id)
+    record_pairs((exercise_ids[workout_id], new_exercise_ids[workout_id]) for workout_id in new_exercise_ids)
+    described = {}
+    for body in workouts_from_rows(list(workouts.values()), links):
+        workout = workouts[body['id']]
+        described[body['id']] = (
+            [we for we in body['workout_exercises'] if we['id'] in new_ids],
+            (workout.version, workout.updated_at),
+        )
+    return described
+
+# Group-commit writer for the write-behind queue: inserts queued
+# (workout_id, item) entries in one transaction. An entry that violates a
+# constraint gets its IntegrityError as its result; the others are still
+# written. Results are (body, (version, updated_at)), as attach_exercises gives.
+def write_queued_workout_exercises(entries):
+    # The batch is one transaction: its savepoints must not commit on their own
+    begin_transaction()
+    try:
+        with db.session.begin_nested():
+            rows = db.session.execute(insert_workout_exercises(entries)).all()
+        ids = {(row.workout_id, row.exercise_id): row.id for row in rows}
+        results = [ids[(workout_id, item['exercise_id'])] for workout_id, item in entries]
+    except IntegrityError:
+        # Find the offending rows one savepoint at a time
+        results = []
+        for entry in entries:
+            try:
+                with db.session.begin_nested():
+                    results.append(db.session.execute(insert_workout_exercises([entry])).one().id)
+            except IntegrityError as e:
+                results.append(e)
+
+    new_ids = {result for result in results if not isinstance(result, Exception)}
+    workout_ids = {workout_id for (workout_id, _), result in zip(entries, results) if result in new_ids}
+    if not workout_ids:
+        db.session.rollback()
+        return results
+    touch_workouts(Workout.id.in_(workout_ids))
+    described = describe_new_links(workout_ids, new_ids)
+    db.session.commit()
+    response_cache.invalidate('workout_exercises')
+
+    bodies = {we['id']: (we, validators) for created, validators in described.values() for we in created}
+    return [result if isinstance(result, Exception) else bodies[result] for result in results]
+
+# Maps an IntegrityError from attach_exercises to an error response
+def attach_error_response(error, workout_id, exercise_ids):
+    violation = constraint_violation(error)
+    if violation == 'unique':
+        if len(exercise_ids) == 1:
+            return create_error_response("Exercise already added to this workout", 409)
+        return create_error_response("One or more exercises are already added to this workout", 409)
+    if violation == 'foreign_key':
+        if db.session.get(Workout, workout_id) is None:
+            return create_error_response("Workout not found", 404)
+        return create_error_response("Exercise not found", 404)
+    return create_error_response(str(error.orig))
+
+@api.route('/workouts/<int:workout_id>/exercises/<int:exercise_id>/workout_exercises', methods=['POST'])
 def add_exercise_to_workout(workout_id, exercise_id):
     """Add an exercise to a workout, including reps/sets/duration"""
-    # Verify workout and exercise exist
-    workout = Workout.query.get(workout_id)
-    if not workout:
-        return create_error_response("Workout not found", 404)
-    
-    exercise = Exercise.query.get(exercise_id)
-    if not exercise:
-        return create_error_response("Exercise not found", 404)
-    
-    # Check if this combination already exists
-    existing = WorkoutExercise.query.filter_by(
-        workout_id=workout_id, 
-        exercise_id=exercise_id
-    ).first()
-    if existing:
-        return create_error_response("Exercise already added to this workout", 409)
-    
     try:
         # Get additional data from request
         data = request.json or {}
@@ -176,27 +717,315 @@ def add_exercise_to_workout(workout_id, exercise_id):
         
         # Validate the data
         validated_data = workout_exercise_schema.load(workout_exercise_data)
-        workout_exercise = WorkoutExercise(**validated_data)
-        
-        db.session.add(workout_exercise)
+        del validated_data['workout_id']
+        write_queue = current_app.extensions.get('write_behind')
+        # If-Match needs the workout's version checked now, so conditional adds skip the queue
+        if write_queue is not None and not request.if_match:
+            return queue_workout_exercise(write_queue, workout_id, validated_data)
+        created, validators = attach_exercises(workout_id, [validated_data], expected_versions(request.if_match, workout_id))
+        if created is None:
+            db.session.rollback()
+            return precondition_failed_response(workout_id)
         db.session.commit()
+        response_cache.invalidate('workout_exercises')
         
-        return create_success_response(workout_exercise_schema.dump(workout_exercise), 201)
+        response = create_success_response(created[0], 201)
+        response.headers.update(validator_headers(workout_id, *validators, response.mimetype))
+        return response
     except ValidationError as e:
         return create_error_response(str(e.messages))
+    except IntegrityError as e:
+        db.session.rollback()
+        return attach_error_response(e, workout_id, [exercise_id])
     except Exception as e:
         db.session.rollback()
         return create_error_response(str(e))
 
+# Adds one workout exercise through the write-behind queue (WRITE_BEHIND).
+# sync acks answer like the direct path once the group commit is done, or
+# 503 if it does not finish within WRITE_BEHIND_ACK_TIMEOUT_MS; async acks
+# answer 202 with the queued row as soon as it is queued.
+def queue_workout_exercise(write_queue, workout_id, item):
+    try:
+        future = write_queue.submit((workout_id, item))
+    except QueueFull as e:
+        response = create_error_response(str(e), 503)
+        response.headers['Retry-After'] = '1'
+        return response
+    if write_queue.ack == 'async':
+        return create_success_response(dict(item, workout_id=workout_id, status='queued'), 202)
+    try:
+        created, validators = write_queue.result(future)
+    except AckTimeout as e:
+        response = create_error_response(str(e), 503)
+        response.headers['Retry-After'] = '1'
+        return response
+    except IntegrityError as e:
+        return attach_error_response(e, workout_id, [item['exercise_id']])
+    response = create_success_response(created, 201)
+    response.headers.update(validator_headers(workout_id, *validators, response.mimetype))
+    return response
+
+@api.route('/workouts/<int:workout_id>/workout_exercises', methods=['POST'])
+def add_exercises_to_workout(workout_id):
+    """Add many exercises to a workout in one statement.
+
+    Takes a JSON array (or NDJSON) of {exercise_id, reps, sets,
+    duration_seconds}. All of them are added, or none are. With If-Match,
+    only if the workout is still at that version.
+    """
+    try:
+        items, errors = parse_bulk_items()
+    except ValueError as e:
+        return create_error_response(str(e))
+    if not items:
+        return create_error_response("At least one workout exercise is required")
+    if len(items) > BULK_MAX_ITEMS:
+        return create_error_response(f"Cannot add more than {BULK_MAX_ITEMS} exercises per request", 413)
+
+    try:
+        validated = workout_exercises_batch_schema.load(items)
+    except ValidationError as e:
+        errors.update(e.messages)
+    if errors:
+        return create_error_response(errors)
+
+    exercise_ids = [item['exercise_id'] for item in validated]
+    if len(exercise_ids) != len(set(exercise_ids)):
+        return create_error_response("Each exercise can only be added to a workout once")
+
+    try:
+        workout_exercises, validators = attach_exercises(workout_id, validated, expected_versions(request.if_match, workout_id))
+        if workout_exercises is None:
+            db.session.rollback()
+            return precondition_failed_response(workout_id)
+        db.session.commit()
+    except IntegrityError as e:
+        db.session.rollback()
+        return attach_error_response(e, workout_id, exercise_ids)
+    response_cache.invalidate('workout_exercises')
+    response = create_success_response(workout_exercises, 201)
+    response.headers.update(validator_headers(workout_id, *validators, response.mimetype))
+    return response
+
+# SEARCH ENDPOINTS
+@api.route('/search', methods=['GET'])
+def search():
+    """Full-text search, best match first, one keyset page at a time.
+
+    Query params: q, type (workouts searches notes, exercises fuzzy-matches
+    names), limit, cursor
+    """
+    q = request.args.get('q', '').strip()
+    if not q:
+        return create_error_response("q is required")
+    search_type = request.args.get('type', 'workouts')
+    if search_type not in SEARCH_TYPES:
+        return create_error_response(f"type must be one of: {', '.join(SEARCH_TYPES)}")
+    try:
+        limit = parse_limit(request.args.get('limit'))
+    except ValueError as e:
+        return create_error_response(str(e))
+    try:
+        cursor = decode_cursor(request.args.get('cursor'), 2)
+        if cursor:
+            cursor = (float(cursor[0]), int(cursor[1]))
+    except (TypeError, ValueError):
+        return create_error_response("Invalid cursor")
+
+    if search_type == 'workouts':
+        query = workout_search_query(q, cursor)
+    else:
+        query = exercise_search_query(q, cursor)
+    if query is None:
+        return create_page_response([], None)
+
+    rows, has_more = paginate(query, limit, db.session.execute)
+    next_cursor = encode_cursor(rows[-1].rank, rows[-1].id) if has_more else None
+    # Drop the rank column so the rows match what the serializers expect
+    rows = [row[:-1] for row in rows]
+    if search_type == 'exercises':
+        return create_page_response(exercises_from_rows(rows), next_cursor)
+    links = []
+    if rows:
+        links = db.session.execute(workout_links_query([row[0] for row in rows])).all()
+    return create_page_response(workouts_from_rows(rows, links), next_cursor)
+
+# STATS ENDPOINTS
+@api.route('/stats/volume', methods=['GET'])
+def get_volume_stats():
+    """Training volume per week (or day) and per exercise (or category)
+
+    Query params: group_by (exercise or category), period (week or day),
+    start_date, end_date, category, exercise_id
+    """
+    group_by = request.args.get('group_by', 'exercise')
+    if group_by not in ('exercise', 'category'):
+        return create_error_response("group_by must be one of: exercise, category")
+    period = request.args.get('period', 'week')
+    if period not in ('week', 'day'):
+        return create_error_response("period must be one of: week, day")
+    try:
+        start_date = parse_date(request.args.get('start_date'), 'start_date')
+        end_date = parse_date(request.args.get('end_date'), 'end_date')
+        exercise_id = parse_int(request.args.get('exercise_id'), 'exercise_id')
+    except ValueError as e:
+        return create_error_response(str(e))
+    category = request.args.get('category')
+
+    return create_success_response(volume_stats(
+        group_by=group_by, period=period, start_date=start_date, end_date=end_date,
+        category=category.lower() if category else None, exercise_id=exercise_id,
+    ))
+
+# CLI commands
+@api.cli.command('check-queries')
+def check_queries():
+    """Fail if any read endpoint exceeds its SQL statement budget"""
+    if not check_query_budgets(current_app._get_current_object()):
+        raise SystemExit(1)
+
+@api.cli.command('check-query-plans')
+def check_plans():
+    """Fail if any read endpoint's SQL scans a whole table"""
+    if not check_query_plans(current_app._get_current_object()):
+        raise SystemExit(1)
+
+@api.cli.command('archive-workouts')
+@click.option('--before', required=True, help="Archive workouts dated before this YYYY-MM-DD date")
+@click.option('--batch-size', default=ARCHIVE_BATCH_SIZE, show_default=True, help="Workouts moved per transaction")
+@click.option('--pause', default=0.0, show_default=True, help="Seconds to wait between batches")
+def archive_workouts_command(before, batch_size, pause):
+    """Move old workouts to the archive tables in small transactions"""
+    try:
+        before = parse_date(before, 'before')
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--before')
+    archived = archive_workouts_before(before, batch_size, pause)
+    invalidate_for_workers('workout_exercises')
+    print(f"Archived {archived} workouts dated before {before.isoformat()}")
+
+@api.cli.command('rebuild-search')
+def rebuild_search_command():
+    """Re-index all workout notes and exercise names for /search"""
+    rebuild_search_index()
+    db.session.commit()
+    print("Search index rebuilt")
+
+@api.cli.command('rebuild-records')
+def rebuild_records_command():
+    """Recompute every exercise's personal records from all workout history"""
+    rebuild_personal_records()
+    db.session.commit()
+    invalidate_for_workers('workout_exercises')
+    print("Personal records rebuilt")
+
+@api.cli.command('rebuild-related')
+def rebuild_related_command():
+    """Recompute the exercise co-occurrence pairs from all workout history"""
+    rebuild_pairs()
+    db.session.commit()
+    invalidate_for_workers('workout_exercises')
+    print("Exercise pairs rebuilt")
+
+@api.cli.command('rebuild-volume')
+def rebuild_volume_command():
+    """Recompute the exercise_volume rollup from all workout history"""
+    rebuild_volume()
+    db.session.commit()
+    print("Exercise volume rebuilt")
+
 # Error handlers
-@app.errorhandler(404)
+@api.app_errorhandler(404)
 def not_found(error):
     return create_error_response("Resource not found", 404)
 
-@app.errorhandler(500)
+@api.app_errorhandler(500)
 def internal_error(error):
     db.session.rollback()
     return create_error_response("Internal server error", 500)
 
+def create_app(config_name=None, overrides=None):
+    """Application factory; config_name is one of config.config_by_name.
+
+    overrides is an optional dict applied on top of the chosen config.
+    """
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.config.from_object(get_config(config_name))
+    app.config.update(overrides or {})
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+    # The rollups (stats.py, records.py, related.py) are kept with upsert()
+    backend = make_url(app.config['SQLALCHEMY_DATABASE_URI']).get_backend_name()
+    if backend not in UPSERT_DIALECTS:
+        raise ValueError(f"Unsupported database {backend!r}; SQLALCHEMY_DATABASE_URI must use one of: {', '.join(UPSERT_DIALECTS)}")
+
+    db.init_app(app)
+    if app.config['LOAD_MIGRATIONS']:
+        # Imported here: alembic is a large import that only `flask db` needs
+        from flask_migrate import Migrate
+        Migrate(app, db)
+    response_cache.init_app(app)
+    metrics.init_app(app)
+    replicas.init_app(app, db)
+    if app.config['WRITE_BEHIND']:
+        app.extensions['write_behind'] = create_write_queue(app, write_queued_workout_exercises)
+    app.register_blueprint(api)
+
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', set_sqlite_pragmas(app.config))
+
+    # Once, here, rather than on the first query of every forked worker
+    configure_mappers()
+    _apps.add(app)
+    return app
+
+# Every live app this module created, reset in forked children by the one
+# at-fork hook below. Weak, so apps that are dropped (tests, repeated
+# factory calls) are not kept alive or reset.
+_apps = weakref.WeakSet()
+
+def _reset_apps_after_fork():
+    for app in list(_apps):
+        reset_after_fork(app)
+
+os.register_at_fork(after_in_child=_reset_apps_after_fork)
+
+def reset_after_fork(app):
+    """Drop the pooled connections and per-process state a forked worker inherited"""
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False: the connections still belong to the parent, which may be using them
+            engine.dispose(close=False)
+    app.extensions['response_cache'].after_fork()
+    metrics.after_fork()
+    for name in ('write_behind', 'replicas'):
+        if name in app.extensions:
+            app.extensions[name].after_fork()
+
+def warm_up(app):
+    """Do the first requests' one-off work before a pre-forking server forks.
+
+    Runs each read route's statements once, so they are compiled into the
+    engine's statement cache that every worker then inherits, and closes
+    the connections this opened so no worker shares them.
+    """
+    with app.app_context():
+        for stmt in (
+            workouts_page_query(**parse_workout_list_args({})),
+            exercises_page_query(**parse_exercise_list_args({})),
+            workout_version_query(0),
+            workout_query(0),
+            workout_links_query([0]),
+            exercise_query(0),
+            exercise_workouts_query(0),
+        ):
+            db.session.execute(stmt).all()
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+# `flask run` and `flask db` find create_app on their own; pre-forking servers use wsgi.py
 if __name__ == '__main__':
-    app.run(port=5555, debug=True)
\ No newline at end of file
+    create_app().run(port=5555, debug=True)
\ No newline at end of file
@@ -0,0 +1,78 @@
+"""Bulk deletion and archival of old workouts.
+
+Both work through the oldest matching workouts in batches and commit after
+each one, so no single transaction holds the write lock for long.
+WorkoutExercises go with their workouts through ON DELETE CASCADE, and the
+exercise_volume rollup, exercise pairs and personal records are adjusted
+batch by batch. Records then reflect the live workouts only.
+"""
+import time
+from datetime import datetime
+
+from sqlalchemy import delete, insert, literal, select
+
+from models import db, Workout, WorkoutArchive, WorkoutExercise, WorkoutExerciseArchive
+from records import records_from_workouts, refresh_personal_records
+from related import record_pairs, workout_pair_entries
+from stats import record_volume, workout_volume_entries
+
+ARCHIVE_BATCH_SIZE = 1000
+
+def _oldest_workout_ids(before, batch_size):
+    return db.session.scalars(
+        select(Workout.id)
+        .where(Workout.date < before)
+        .order_by(Workout.date, Workout.id)
+        .limit(batch_size)
+    ).all()
+
+def _delete_workouts(ids):
+    record_volume(workout_volume_entries(ids), sign=-1)
+    record_pairs(workout_pair_entries(ids), sign=-1)
+    record_holders = records_from_workouts(ids)
+    db.session.execute(delete(Workout).where(Workout.id.in_(ids)), execution_options={'synchronize_session': False})
+    refresh_personal_records(record_holders)
+
+def _archive_workouts(ids):
+    archived_at = datetime.utcnow()
+    archive_ids = db.session.scalars(
+        insert(WorkoutArchive).from_select(
+            ['workout_id', 'date', 'duration_minutes', 'notes', 'archived_at'],
+            select(Workout.id, Workout.date, Workout.duration_minutes, Workout.notes, literal(archived_at))
+            .where(Workout.id.in_(ids))
+        ).returning(WorkoutArchive.id)
+    ).all()
+    db.session.execute(insert(WorkoutExerciseArchive).from_select(
+        ['workout_exercise_id', 'workout_archive_id', 'exercise_id', 'reps', 'sets', 'duration_seconds'],
+        select(
+            WorkoutExercise.id, WorkoutArchive.id, WorkoutExercise.exercise_id,
+            WorkoutExercise.reps, WorkoutExercise.sets, WorkoutExercise.duration_seconds,
+        )
+        .join(WorkoutArchive, WorkoutArchive.workout_id == WorkoutExercise.workout_id)
+        .where(WorkoutArchive.id.in_(archive_ids))
+    ))
+    _delete_workouts(ids)
+
+def _in_batches(process, before, batch_size, pause):
+    total = 0
+    while True:
+        ids = _oldest_workout_ids(before, batch_size)
+        if not ids:
+            return total
+        process(ids)
+        db.session.commit()
+        total += len(ids)
+        if pause:
+            # Let waiting writers take the lock between batches
+            time.sleep(pause)
+
+def delete_workouts_before(before, batch_size=ARCHIVE_BATCH_SIZE, pause=0):
+    """Delete every workout dated before `before`; returns how many were deleted"""
+    return _in_batches(_delete_workouts, before, batch_size, pause)
+
+def archive_workouts_before(before, batch_size=ARCHIVE_BATCH_SIZE, pause=0):
+    """Move every workout dated before `before` (and its exercises) to the archive tables.
+
+    Returns how many workouts were archived.
+    """
+    return _in_batches(_archive_workouts, before, batch_size, pause)
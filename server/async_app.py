@@ -0,0 +1,262 @@
+"""Async serving mode: the read endpoints on SQLAlchemy's asyncio engine.
+
+    uvicorn --factory async_app:create_async_app --workers 1
+
+Each Flask worker thread is blocked for as long as its request waits on
+the database, so concurrency is capped by the thread count. This ASGI app
+serves GET /workouts, /workouts/<id>, /exercises and /exercises/<id> from
+coroutines instead, so thousands of connections can wait on the database
+from one process. The statements (queries.py), serializers, response
+bodies and paging headers are the same as the Flask views'.
+
+Every other request (writes, exports, stats, /metrics) is handed to the
+Flask app via asgiref's WSGI adapter, which runs it on a worker thread.
+The async reads skip the Flask response cache and request metrics.
+
+Needs aiosqlite (SQLite) or asyncpg (PostgreSQL); asgiref is optional and
+only needed for the delegated routes.
+"""
+import os
+import re
+import weakref
+from urllib.parse import parse_qsl, urlencode
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from app import create_app
+from conditional import is_modified, validator_headers, workout_version_query
+from config import engine_options, set_sqlite_pragmas
+from encoders import best_mimetype, encode_body
+from pagination import encode_cursor
+from queries import (
+    WORKOUT_FIELDS, WORKOUT_INCLUDES, EXERCISE_FIELDS, EXERCISE_INCLUDES,
+    parse_fieldset, parse_workout_list_args, parse_exercise_list_args,
+    workouts_page_query, exercises_page_query, workout_query, exercise_query,
+    workout_links_query, exercise_workouts_query, workout_cursor, exercise_cursor
+)
+from serializers import (
+    exercises_from_rows, workouts_from_rows, workout_detail_from_rows, exercise_detail_from_rows,
+    sparse_exercises_from_rows, sparse_workouts_from_rows, sparse_exercise_detail_from_rows
+)
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:
+    WsgiToAsgi = None
+
+ASYNC_DRIVERS = {'sqlite': 'sqlite+aiosqlite', 'postgresql': 'postgresql+asyncpg'}
+
+def async_database_url(url, instance_path):
+    """The asyncio-driver equivalent of a synchronous database URL.
+
+    Relative SQLite paths resolve against the instance folder, as
+    Flask-SQLAlchemy resolves them for the sync engine.
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver for {backend!r} databases")
+    url = url.set(drivername=ASYNC_DRIVERS[backend])
+    if backend == 'sqlite' and url.database and url.database != ':memory:' and not os.path.isabs(url.database):
+        url = url.set(database=os.path.join(instance_path, url.database))
+    return url
+
+def async_engine_options(config):
+    """engine_options() translated for the async drivers"""
+    options = engine_options(config)
+    if config['SQLALCHEMY_DATABASE_URI'].startswith('postgresql'):
+        # asyncpg takes server settings directly instead of a libpq options string
+        options['connect_args'] = {'server_settings': {'statement_timeout': str(config['DB_STATEMENT_TIMEOUT_MS'])}}
+    return options
+
+
+class Request:
+    """The parts of an ASGI HTTP scope the read views need"""
+
+    def __init__(self, scope):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.root_path = scope.get('root_path', '')
+        self.args = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True))
+        headers = {name.decode('latin-1'): value.decode('latin-1') for name, value in scope['headers']}
+        self.mimetype = best_mimetype(parse_accept_header(headers.get('accept'), MIMEAccept))
+        # Just enough of a WSGI environ for werkzeug's conditional request checks
+        self.environ = {'REQUEST_METHOD': self.method}
+        for name in ('if-none-match', 'if-modified-since'):
+            if name in headers:
+                self.environ['HTTP_' + name.upper().replace('-', '_')] = headers[name]
+        self.conditional = len(self.environ) > 1
+
+
+# Engines of every live AsyncAPI, disposed in forked children by one at-fork hook
+_engines = weakref.WeakSet()
+
+def _dispose_engines_after_fork():
+    for engine in list(_engines):
+        engine.dispose(close=False)
+
+os.register_at_fork(after_in_child=_dispose_engines_after_fork)
+
+
+class AsyncAPI:
+    """ASGI app serving the read endpoints asynchronously; see the module docstring"""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        config = flask_app.config
+        self.engine = create_async_engine(
+            async_database_url(config['SQLALCHEMY_DATABASE_URI'], flask_app.instance_path),
+            **async_engine_options(config)
+        )
+        if self.engine.dialect.name == 'sqlite':
+            event.listen(self.engine.sync_engine, 'connect', set_sqlite_pragmas(config))
+        # Forked workers (e.g. gunicorn --preload with uvicorn workers) open their own connections
+        _engines.add(self.engine.sync_engine)
+        self.fallback = WsgiToAsgi(flask_app) if WsgiToAsgi is not None else None
+        self.routes = [
+            (re.compile(r'/workouts'), self.get_workouts),
+            (re.compile(r'/workouts/(\d+)'), self.get_workout),
+            (re.compile(r'/exercises'), self.get_exercises),
+            (re.compile(r'/exercises/(\d+)'), self.get_exercise),
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+        if scope['method'] == 'GET':
+            for pattern, view in self.routes:
+                match = pattern.fullmatch(scope['path'])
+                if match:
+                    request = Request(scope)
+                    try:
+                        status, data, headers = await view(request, *(int(arg) for arg in match.groups()))
+                    except Exception:
+                        self.flask_app.logger.exception("Unhandled error in %s %s", request.method, request.path)
+                        status, data, headers = 500, {'error': "Internal server error"}, {}
+                    return await self.respond(send, request, status, data, headers)
+        if self.fallback is not None:
+            return await self.fallback(scope, receive, send)
+        await self.respond(send, Request(scope), 404, {'error': "Resource not found"})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def respond(self, send, request, status, data, headers=None):
+        body = encode_body(data, request.mimetype, self.flask_app.json) if status != 304 else b''
+        raw_headers = [
+            (b'content-type', request.mimetype.encode()),
+            (b'content-length', str(len(body)).encode()),
+            (b'vary', b'Accept'),
+        ]
+        raw_headers += [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+        await send({'type': 'http.response.start', 'status': status, 'headers': raw_headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    def page_headers(self, request, next_cursor):
+        # Same Link/X-Next-Cursor headers as create_page_response
+        if not next_cursor:
+            return {}
+        args = dict(request.args, cursor=next_cursor)
+        return {
+            'Link': f'<{request.root_path}{request.path}?{urlencode(args)}>; rel="next"',
+            'X-Next-Cursor': next_cursor,
+        }
+
+    async def fetch_page(self, conn, query, limit):
+        # paginate(), awaiting the query
+        rows = (await conn.execute(query.limit(limit + 1))).all()
+        return rows[:limit], len(rows) > limit
+
+    # ROUTES
+
+    async def get_workouts(self, request):
+        try:
+            params = parse_workout_list_args(request.args)
+        except ValueError as e:
+            return 400, {'error': str(e)}, {}
+
+        fields, include = params['fields'], params['include']
+        async with self.engine.connect() as conn:
+            workouts, has_more = await self.fetch_page(conn, workouts_page_query(**params), params['limit'])
+            links = []
+            if workouts and (fields is None or include):
+                links = (await conn.execute(workout_links_query([w.id for w in workouts]))).all()
+        next_cursor = encode_cursor(*workout_cursor(workouts[-1])) if has_more else None
+        if fields is None:
+            body = workouts_from_rows(workouts, links)
+        else:
+            body = sparse_workouts_from_rows(workouts, links, fields, include)
+        return 200, body, self.page_headers(request, next_cursor)
+
+    async def get_workout(self, request, id):
+        try:
+            fields, include = parse_fieldset(request.args, WORKOUT_FIELDS, WORKOUT_INCLUDES)
+        except ValueError as e:
+            return 400, {'error': str(e)}, {}
+
+        async with self.engine.connect() as conn:
+            if request.conditional:
+                current = (await conn.execute(workout_version_query(id))).first()
+                if current and not is_modified(request.environ, id, *current, request.mimetype):
+                    return 304, None, validator_headers(id, *current, request.mimetype)
+            workout = (await conn.execute(workout_query(id, fields))).first()
+            if not workout:
+                return 404, {'error': "Workout not found"}, {}
+            links = []
+            if fields is None or include:
+                links = (await conn.execute(workout_links_query([id]))).all()
+        if fields is None:
+            body = workout_detail_from_rows(workout, links)
+        else:
+            body = sparse_workouts_from_rows([workout], links, fields, include)[0]
+        return 200, body, validator_headers(id, workout.version, workout.updated_at, request.mimetype)
+
+    async def get_exercises(self, request):
+        try:
+            params = parse_exercise_list_args(request.args)
+        except ValueError as e:
+            return 400, {'error': str(e)}, {}
+
+        async with self.engine.connect() as conn:
+            exercises, has_more = await self.fetch_page(conn, exercises_page_query(**params), params['limit'])
+        next_cursor = encode_cursor(*exercise_cursor(exercises[-1])) if has_more else None
+        if params['fields'] is None:
+            body = exercises_from_rows(exercises)
+        else:
+            body = sparse_exercises_from_rows(exercises, params['fields'])
+        return 200, body, self.page_headers(request, next_cursor)
+
+    async def get_exercise(self, request, id):
+        try:
+            fields, include = parse_fieldset(request.args, EXERCISE_FIELDS, EXERCISE_INCLUDES)
+        except ValueError as e:
+            return 400, {'error': str(e)}, {}
+
+        async with self.engine.connect() as conn:
+            exercise = (await conn.execute(exercise_query(id, fields))).first()
+            if not exercise:
+                return 404, {'error': "Exercise not found"}, {}
+            workouts = []
+            if fields is None or include:
+                workouts = (await conn.execute(exercise_workouts_query(id))).all()
+        if fields is None:
+            return 200, exercise_detail_from_rows(exercise, workouts), {}
+        return 200, sparse_exercise_detail_from_rows(exercise, workouts, fields, include), {}
+
+
+def create_async_app(config_name=None, overrides=None):
+    """ASGI application factory; takes the same arguments as create_app"""
+    return AsyncAPI(create_app(config_name, overrides))
@@ -0,0 +1,7 @@
+"""Load-testing and benchmark suite for the workout API.
+
+Run from the server/ directory:
+
+    python -m benchmarks.run --workouts 20000 --concurrency 8 --output bench.json
+    python -m benchmarks.compare before.json after.json
+"""
@@ -0,0 +1,37 @@
+import argparse
+import json
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps', 'sql_statements')
+
+def change(before, after):
+    if before is None or after is None:
+        return ''
+    if not before:
+        return '' if not after else '(new)'
+    return f'({(after - before) / before * 100:+.1f}%)'
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports endpoint by endpoint")
+    parser.add_argument('before')
+    parser.add_argument('after')
+    args = parser.parse_args(argv)
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    print(f"{before['meta'].get('commit')} -> {after['meta'].get('commit')}")
+
+    for name, result in after['endpoints'].items():
+        old = before['endpoints'].get(name, {})
+        print(name)
+        for metric in METRICS:
+            value = result.get(metric)
+            if value is None:
+                continue
+            previous = old.get(metric)
+            previous = '-' if previous is None else f'{previous:.4g}'
+            print(f"    {metric:<15} {previous:>10} -> {value:<10.4g} {change(old.get(metric), value)}")
+
+if __name__ == '__main__':
+    main()
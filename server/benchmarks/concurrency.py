@@ -0,0 +1,223 @@
+"""Compare the sync (Flask) and async (async_app) serving modes under many concurrent connections.
+
+    python -m benchmarks.concurrency --connections 500 --requests 5000
+
+Each mode runs in its own server process against the same seeded
+database. The sync server gets a fixed pool of worker threads, like a
+threaded gunicorn worker; the async server is uvicorn with one event loop.
+The client opens --connections connections at once and keeps them all busy
+until --requests requests per endpoint have completed. Needs uvicorn and
+aiosqlite (or asyncpg).
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import socket
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from sqlalchemy import func, select
+from werkzeug.serving import BaseWSGIServer
+
+from app import create_app
+from models import db, Exercise, Workout
+from seed import seed_scale
+from benchmarks.load import percentile
+from benchmarks.run import git_commit
+
+ENDPOINTS = {
+    'GET /workouts': '/workouts',
+    'GET /workouts/<id>': '/workouts/{id}',
+    'GET /exercises': '/exercises?limit=100',
+    'GET /exercises/<id>': '/exercises/{id}',
+}
+LISTEN_BACKLOG = 2048
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server handling connections on a fixed number of threads"""
+
+    multithread = True
+    request_queue_size = LISTEN_BACKLOG
+
+    def __init__(self, host, port, app, threads):
+        super().__init__(host, port, app)
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+def serve_sync(database_url, port, threads):
+    # The async views do not use the response cache, so expire entries
+    # immediately to compare database-bound work on both sides
+    app = create_app('production', {'SQLALCHEMY_DATABASE_URI': database_url, 'RESPONSE_CACHE_TTL': 0})
+    PooledWSGIServer('127.0.0.1', port, app, threads).serve_forever()
+
+def serve_async(database_url, port):
+    import uvicorn
+    from async_app import create_async_app
+
+    app = create_async_app('production', {'SQLALCHEMY_DATABASE_URI': database_url})
+    uvicorn.run(app, host='127.0.0.1', port=port, log_level='warning', backlog=LISTEN_BACKLOG)
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_for_server(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Server on port {port} did not start within {timeout}s")
+
+
+async def fetch(port, path, timeout):
+    """One GET on a fresh connection; returns the status code"""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n'.encode())
+        response = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    return int(response.split(b' ', 2)[1])
+
+async def run_load(port, paths, connections, timeout):
+    """Send every path with `connections` requests in flight at a time"""
+    queue = iter(paths)
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        for path in queue:
+            start = time.perf_counter()
+            try:
+                status = await fetch(port, path, timeout)
+            except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+                status = None
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status is None or status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(connections)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'mean_ms': sum(latencies) / len(latencies) if latencies else None,
+        'throughput_rps': len(latencies) / elapsed if elapsed else None,
+    }
+
+def endpoint_paths(requests, max_workout, max_exercise):
+    paths = {}
+    for name, template in ENDPOINTS.items():
+        top = max_exercise if 'exercises' in name else max_workout
+        # Deterministic spread of ids over 1..top
+        paths[name] = [template.format(id=(i * 7919) % top + 1) for i in range(requests)]
+    return paths
+
+def benchmark_mode(mode, target, database_url, paths, args):
+    port = free_port()
+    extra = (args.threads,) if mode == 'sync' else ()
+    server = multiprocessing.Process(target=target, args=(database_url, port) + extra, daemon=True)
+    server.start()
+    try:
+        wait_for_server(port)
+        results = {}
+        for name, reqs in paths.items():
+            print(f"  {mode} {name}", file=sys.stderr)
+            asyncio.run(run_load(port, reqs[:args.connections], args.connections, args.timeout))  # warm up
+            results[name] = asyncio.run(run_load(port, reqs, args.connections, args.timeout))
+        return results
+    finally:
+        server.terminate()
+        server.join()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', help="Database to benchmark; a fresh SQLite file is created when omitted")
+    parser.add_argument('--skip-seed', action='store_true', help="Use the data already in --database-url")
+    parser.add_argument('--workouts', type=int, default=20000)
+    parser.add_argument('--connections', type=int, default=500, help="Concurrent connections")
+    parser.add_argument('--requests', type=int, default=5000, help="Requests per endpoint")
+    parser.add_argument('--threads', type=int, default=32, help="Worker threads for the sync server")
+    parser.add_argument('--timeout', type=float, default=60, help="Seconds before a request counts as failed")
+    parser.add_argument('--mode', choices=['sync', 'async'], action='append', help="Default: both")
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    database_url = args.database_url
+    if not database_url:
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='workout-bench-'), 'bench.db')
+
+    app = create_app('production', {'SQLALCHEMY_DATABASE_URI': database_url})
+    with app.app_context():
+        if not args.skip_seed:
+            db.drop_all()
+            db.create_all()
+            print(f"Seeding {database_url} ...", file=sys.stderr)
+            seed_scale(args.workouts)
+        max_workout = db.session.scalar(select(func.max(Workout.id))) or 1
+        max_exercise = db.session.scalar(select(func.max(Exercise.id))) or 1
+        db.engine.dispose()
+
+    paths = endpoint_paths(args.requests, max_workout, max_exercise)
+    targets = {'sync': serve_sync, 'async': serve_async}
+    results = {mode: benchmark_mode(mode, targets[mode], database_url, paths, args)
+               for mode in args.mode or targets}
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'database': database_url.split('://')[0],
+            'connections': args.connections,
+            'requests_per_endpoint': args.requests,
+            'sync_threads': args.threads,
+        },
+        'modes': results,
+    }
+    if 'sync' in results and 'async' in results:
+        print(f"\n{'endpoint':<22} {'sync rps':>10} {'async rps':>10} {'sync p99':>10} {'async p99':>10}", file=sys.stderr)
+        for name in paths:
+            sync, async_ = results['sync'][name], results['async'][name]
+            print(f"{name:<22} {sync['throughput_rps']:>10.4g} {async_['throughput_rps']:>10.4g} "
+                  f"{sync['p99_ms']:>10.4g} {async_['p99_ms']:>10.4g}", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
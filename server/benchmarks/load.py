@@ -0,0 +1,200 @@
+import http.client
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from urllib.parse import urlsplit
+
+from sqlalchemy import func, insert, select
+
+from models import db, Exercise, Workout, WorkoutExercise
+from query_counter import count_queries
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+def unique_name(prefix):
+    # Exercise names may not contain digits, so map the hex digits to letters
+    token = ''.join(chr(ord('g') + int(c)) if c.isdigit() else c for c in uuid.uuid4().hex[:12])
+    return f'{prefix} {token}'
+
+def create_workouts(count, exercise_ids=()):
+    """Insert throwaway workouts (optionally linked to exercise_ids) for write scenarios"""
+    ids = list(db.session.scalars(
+        insert(Workout).returning(Workout.id, sort_by_parameter_order=True),
+        [{'date': date.today(), 'duration_minutes': 30, 'notes': 'Benchmark'}] * count
+    ))
+    if exercise_ids:
+        db.session.execute(insert(WorkoutExercise), [
+            {'workout_id': workout_id, 'exercise_id': exercise_id, 'reps': 10, 'sets': 3}
+            for workout_id in ids for exercise_id in exercise_ids
+        ])
+    return ids
+
+def create_exercises(count):
+    return list(db.session.scalars(
+        insert(Exercise).returning(Exercise.id, sort_by_parameter_order=True),
+        [{'name': unique_name('Disposable'), 'category': 'strength', 'equipment_needed': False}
+         for _ in range(count)]
+    ))
+
+def build_scenarios(app, requests):
+    """Return {name: [(method, path, json_body), ...]} covering every route.
+
+    Each scenario gets `requests` requests. Write scenarios get their own
+    freshly inserted rows, so they never collide with each other.
+    """
+    with app.app_context():
+        max_workout = db.session.scalar(select(func.max(Workout.id))) or 1
+        max_exercise = db.session.scalar(select(func.max(Exercise.id))) or 1
+        sample_exercises = list(db.session.scalars(select(Exercise.id).order_by(Exercise.id).limit(3)))
+        delete_workouts = create_workouts(requests, sample_exercises)
+        link_workouts = create_workouts(requests)
+        batch_workouts = create_workouts(requests)
+        delete_exercises = create_exercises(requests)
+        db.session.commit()
+
+    week_ago = (date.today() - timedelta(days=7)).isoformat()
+    today = date.today().isoformat()
+    workout = {'date': today, 'duration_minutes': 45, 'notes': 'Benchmark'}
+    bulk = [dict(workout, workout_exercises=[{'exercise_id': e, 'reps': 10, 'sets': 3} for e in sample_exercises])] * 50
+
+    def spread(i, n):
+        # Deterministic spread of ids over 1..n
+        return (i * 7919) % n + 1
+
+    return {
+        'GET /workouts': [('GET', '/workouts', None)] * requests,
+        'GET /workouts?start_date': [('GET', f'/workouts?start_date={week_ago}', None)] * requests,
+        'GET /workouts?fields=id,date': [('GET', '/workouts?fields=id,date', None)] * requests,
+        'GET /workouts/<id>': [('GET', f'/workouts/{spread(i, max_workout)}', None) for i in range(requests)],
+        'GET /workouts/export': [('GET', f'/workouts/export?start_date={week_ago}', None)] * requests,
+        'POST /workouts': [('POST', '/workouts', workout)] * requests,
+        'POST /workouts/bulk': [('POST', '/workouts/bulk', bulk)] * requests,
+        'DELETE /workouts/<id>': [('DELETE', f'/workouts/{i}', None) for i in delete_workouts],
+        # Nothing is that old, so every request scans for work and finds none
+        'DELETE /workouts?before': [('DELETE', '/workouts?before=1970-01-01', None)] * requests,
+        'GET /exercises': [('GET', '/exercises', None)] * requests,
+        'GET /exercises/<id>': [('GET', f'/exercises/{spread(i, max_exercise)}', None) for i in range(requests)],
+        'GET /exercises/<id>/progression': [
+            ('GET', f'/exercises/{spread(i, max_exercise)}/progression', None) for i in range(requests)
+        ],
+        'POST /exercises': [
+            ('POST', '/exercises', {'name': unique_name('Bench'), 'category': 'strength'})
+            for _ in range(requests)
+        ],
+        'DELETE /exercises/<id>': [('DELETE', f'/exercises/{i}', None) for i in delete_exercises],
+        'POST /workouts/<id>/exercises/<id>/workout_exercises': [
+            ('POST', f'/workouts/{i}/exercises/{sample_exercises[0]}/workout_exercises', {'reps': 10, 'sets': 3})
+            for i in link_workouts
+        ],
+        'POST /workouts/<id>/workout_exercises': [
+            ('POST', f'/workouts/{i}/workout_exercises',
+             [{'exercise_id': e, 'reps': 10, 'sets': 3} for e in sample_exercises])
+            for i in batch_workouts
+        ],
+        'GET /stats/volume': [('GET', '/stats/volume?group_by=category', None)] * requests,
+    }
+
+
+class ClientDriver:
+    """Sends requests through Flask's test client, one client per thread"""
+
+    def __init__(self, app):
+        self.app = app
+        self.local = threading.local()
+
+    def __call__(self, method, path, body):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body)
+        response.get_data()
+        return response.status_code
+
+
+class HTTPDriver:
+    """Sends real HTTP requests to a running WSGI server"""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.local = threading.local()
+
+    def __call__(self, method, path, body):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        headers = {}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        try:
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        except (http.client.HTTPException, OSError):
+            # The server closed a kept-alive connection; retry on a fresh one
+            conn.close()
+            conn = self.local.conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+            conn.request(method, path, body=payload, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        if response.getheader('Connection', '').lower() == 'close':
+            conn.close()
+            self.local.conn = None
+        return response.status
+
+
+def start_server(app):
+    """Serve app from a threaded werkzeug server on a free port; returns (server, base_url)"""
+    from werkzeug.serving import make_server
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+def run_scenario(driver, requests, concurrency):
+    """Fire the requests from `concurrency` threads and summarize the latencies"""
+    def timed(req):
+        start = time.perf_counter()
+        try:
+            status = driver(*req)
+        except Exception:
+            status = None
+        return time.perf_counter() - start, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(timed, requests))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    errors = sum(1 for _, status in results if status is None or status >= 400)
+    return {
+        'requests': len(results),
+        'errors': errors,
+        'p50_ms': percentile(latencies, 50),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'mean_ms': sum(latencies) / len(latencies) if latencies else None,
+        'throughput_rps': len(results) / elapsed if elapsed else None,
+    }
+
+
+def statement_count(app, method, path, body):
+    """SQL statements issued by one request, measured on its own"""
+    with app.app_context():
+        engine = db.engine
+    client = app.test_client()
+    with count_queries(engine) as counter:
+        client.open(path, method=method, json=body)
+    return counter.count
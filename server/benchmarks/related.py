@@ -0,0 +1,119 @@
+"""Time top-k related exercises and workout suggestions on a large co-occurrence matrix.
+
+    python -m benchmarks.related --workouts 1000000 --exercises 10000
+
+Seeds (or reuses) a database, which builds exercise_pairs in one pass,
+then answers --queries lookups for random exercises and workouts, both
+as plain function calls and as uncached GET requests. Also checks that
+the incrementally maintained pairs match a full rebuild after a few
+hundred writes through the API.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import func, select
+
+from app import create_app
+from models import db, Exercise, ExercisePair, Workout, WorkoutExercise
+from related import rebuild_pairs, related_exercises, suggested_exercises
+from seed import seed_scale
+from benchmarks.load import percentile
+
+def timed_calls(function, ids):
+    """Sorted milliseconds of function(id) for every id"""
+    latencies = []
+    for id in ids:
+        start = time.perf_counter()
+        function(id)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return sorted(latencies)
+
+def report(name, latencies):
+    print(f"  {name:<40} p50 {percentile(latencies, 50):7.3f} ms  p99 {percentile(latencies, 99):7.3f} ms")
+
+def pair_rows():
+    return db.session.execute(
+        select(ExercisePair.exercise_id, ExercisePair.related_id, ExercisePair.workout_count)
+        .order_by(ExercisePair.exercise_id, ExercisePair.related_id)
+    ).all()
+
+def check_incremental(app, writes, rng):
+    """Write through the API, then compare exercise_pairs with a rebuild; returns a failure message or None"""
+    with app.app_context():
+        workouts = db.session.scalar(select(func.max(Workout.id)))
+        exercises = db.session.scalar(select(func.max(Exercise.id)))
+    client = app.test_client()
+    today = date.today()
+    for _ in range(writes):
+        action = rng.random()
+        if action < 0.6:
+            client.post(f'/workouts/{rng.randint(1, workouts)}/exercises/{rng.randint(1, exercises)}/workout_exercises',
+                        json={'reps': rng.randint(1, 20)})
+        elif action < 0.8:
+            client.post('/workouts/bulk', json=[{
+                'date': (today - timedelta(days=rng.randrange(300))).isoformat(), 'duration_minutes': 45,
+                'workout_exercises': [{'exercise_id': id} for id in rng.sample(range(1, exercises + 1), 4)],
+            }])
+        else:
+            client.delete(f'/workouts/{rng.randint(1, workouts)}')
+    with app.app_context():
+        incremental = pair_rows()
+        rebuild_pairs()
+        rebuilt = pair_rows()
+        db.session.rollback()
+    if incremental != rebuilt:
+        return f"{len(set(incremental) ^ set(rebuilt))} pair rows differ from a rebuild"
+    return None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', help="Use existing data instead of seeding a fresh SQLite file")
+    parser.add_argument('--workouts', type=int, default=200000)
+    parser.add_argument('--exercises', type=int, default=10000)
+    parser.add_argument('--links-per-workout', type=int, default=5)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--limit', type=int, default=10)
+    parser.add_argument('--writes', type=int, default=300, help="API writes before the incremental check")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    database_url = args.database_url
+    if not database_url:
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='workout-bench-'), 'bench.db')
+    app = create_app('production', {'SQLALCHEMY_DATABASE_URI': database_url, 'RESPONSE_CACHE_TTL': 0})
+    rng = random.Random(args.seed)
+
+    with app.app_context():
+        if not args.database_url:
+            db.create_all()
+            print(f"Seeding {args.workouts} workouts, {args.exercises} exercises ...")
+            timings = seed_scale(args.workouts, args.exercises, args.links_per_workout, args.seed)
+            rows, seconds = timings['exercise_pairs']
+            print(f"  exercise_pairs: {rows:,} rows built from {timings['workout_exercises'][0]:,} links in {seconds:.2f}s")
+        workouts = db.session.scalar(select(func.max(Workout.id)))
+        exercises = db.session.scalar(select(func.max(Exercise.id)))
+        links = db.session.scalar(select(func.count()).select_from(WorkoutExercise))
+        exercise_ids = [rng.randint(1, exercises) for _ in range(args.queries)]
+        workout_ids = [rng.randint(1, workouts) for _ in range(args.queries)]
+
+        print(f"\n{args.queries} lookups, top {args.limit}, {exercises:,} exercises, {links:,} links:")
+        report('related_exercises()', timed_calls(lambda id: related_exercises(id, args.limit), exercise_ids))
+        report('suggested_exercises()', timed_calls(lambda id: suggested_exercises(id, args.limit), workout_ids))
+
+    client = app.test_client()
+    report('GET /exercises/<id>/related', timed_calls(
+        lambda id: client.get(f'/exercises/{id}/related?limit={args.limit}'), exercise_ids))
+    report('GET /workouts/<id>/suggestions', timed_calls(
+        lambda id: client.get(f'/workouts/{id}/suggestions?limit={args.limit}'), workout_ids))
+
+    failure = check_incremental(app, args.writes, rng)
+    print(f"\nIncremental pairs after {args.writes} writes: {failure or 'match a full rebuild'}")
+    return 1 if failure else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Check read-replica routing against a primary SQLite file and copied replicas.
+
+    python -m benchmarks.replicas --replicas 2 --reads 2000
+
+Seeds a primary, copies it to --replicas files plus one replica that does
+not exist, then sends reads and reports how many SELECTs each database
+answered; the exercise views fill the response cache, so their misses
+read the primary. Writes a workout the replicas never see and checks
+that the writer reads it back (stickiness) while other clients keep
+reading the replicas, and that the broken replica is taken out. Exits
+non-zero if a check fails.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date
+
+from sqlalchemy import event
+
+from app import create_app
+from models import db
+from seed import seed_scale
+
+READS = ('/workouts?limit=20', '/workouts/1', '/exercises?limit=20', '/exercises/1')
+
+def count_selects(engine, name, counts):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and statement.strip() != 'SELECT 1':
+            counts[name] += 1
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--replicas', type=int, default=2)
+    parser.add_argument('--reads', type=int, default=2000)
+    parser.add_argument('--workouts', type=int, default=1000)
+    parser.add_argument('--exercises', type=int, default=100)
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix='workout-bench-')
+    primary = os.path.join(directory, 'primary.db')
+    app = create_app('production', {'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + primary})
+    with app.app_context():
+        db.create_all()
+        seed_scale(args.workouts, args.exercises)
+        db.session.remove()
+        db.engine.dispose()
+    urls = []
+    for number in range(args.replicas):
+        path = os.path.join(directory, f'replica-{number}.db')
+        shutil.copy(primary, path)
+        urls.append('sqlite:///' + path)
+    urls.append('sqlite:///' + os.path.join(directory, 'missing', 'replica.db'))
+
+    app = create_app('production', {
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + primary, 'RESPONSE_CACHE_TTL': 0,
+        'REPLICA_DATABASE_URLS': urls, 'REPLICA_STICKY_SECONDS': 2,
+    })
+    pool = app.extensions['replicas']
+    counts = Counter()
+    with app.app_context():
+        count_selects(db.engine, 'primary', counts)
+    for replica in pool.replicas:
+        count_selects(replica.engine, os.path.basename(replica.url.database), counts)
+
+    reader, writer = app.test_client(), app.test_client()
+    start = time.perf_counter()
+    for number in range(args.reads):
+        reader.get(READS[number % len(READS)])
+    elapsed = time.perf_counter() - start
+    print(f"{args.reads} reads in {elapsed:.2f}s, SELECTs per database:")
+    for name, count in sorted(counts.items()):
+        print(f"  {name:<16} {count:8,}")
+
+    failures = []
+    if any(replica.healthy for replica in pool.replicas if 'missing' in replica.url.database):
+        failures.append("the missing replica is still marked healthy")
+    created = writer.post('/workouts', json={'date': date.today().isoformat(), 'duration_minutes': 30}).get_json()
+    if writer.get(f"/workouts/{created['id']}").status_code != 200:
+        failures.append("the writer did not read its own write")
+    if reader.get(f"/workouts/{created['id']}").status_code != 404:
+        failures.append("another client's read went to the primary")
+    time.sleep(2.1)
+    if writer.get(f"/workouts/{created['id']}").status_code != 404:
+        failures.append("the writer still reads the primary after REPLICA_STICKY_SECONDS")
+    print(f"Stickiness and failover: {'; '.join(failures) or 'ok'}")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+from app import create_app
+from models import db
+from seed import seed_scale
+from benchmarks import load
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every API route and report latency as JSON")
+    parser.add_argument('--database-url', help="Database to benchmark; a fresh SQLite file is created when omitted")
+    parser.add_argument('--skip-seed', action='store_true', help="Use the data already in --database-url")
+    parser.add_argument('--exercises', type=int, help="Default: workouts / 100, at most 10000")
+    parser.add_argument('--workouts', type=int, default=20000)
+    parser.add_argument('--links-per-workout', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--mode', choices=['client', 'wsgi'], default='client',
+                        help="Flask test client, or real HTTP against a WSGI server")
+    parser.add_argument('--url', help="In wsgi mode, benchmark this already running server instead of starting one")
+    parser.add_argument('--only', action='append', help="Only run endpoints whose name contains this text")
+    parser.add_argument('--output', help="Write the JSON report here instead of stdout")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    database_url = args.database_url
+    if not database_url:
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='workout-bench-'), 'bench.db')
+
+    app = create_app('production', {'SQLALCHEMY_DATABASE_URI': database_url})
+    seeded = None
+    if not args.skip_seed:
+        with app.app_context():
+            db.drop_all()
+            db.create_all()
+            print(f"Seeding {database_url} ...", file=sys.stderr)
+            timings = seed_scale(args.workouts, args.exercises, args.links_per_workout, args.seed)
+            seeded = {name: rows for name, (rows, _) in timings.items() if name != 'indexes'}
+
+    scenarios = load.build_scenarios(app, args.requests)
+    if args.only:
+        scenarios = {name: reqs for name, reqs in scenarios.items() if any(o in name for o in args.only)}
+
+    server = None
+    if args.mode == 'client':
+        driver = load.ClientDriver(app)
+    else:
+        base_url = args.url
+        if not base_url:
+            server, base_url = load.start_server(app)
+        driver = load.HTTPDriver(base_url)
+
+    endpoints = {}
+    try:
+        for name, reqs in scenarios.items():
+            print(f"  {name}", file=sys.stderr)
+            # The first request runs alone so its statement count is not mixed
+            # up with concurrent traffic; the rest are timed under load.
+            statements = None if args.url else load.statement_count(app, *reqs[0])
+            result = load.run_scenario(driver, reqs[1:], args.concurrency)
+            result['sql_statements'] = statements
+            endpoints[name] = result
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'database': app.config['SQLALCHEMY_DATABASE_URI'].split('://')[0],
+            'mode': args.mode,
+            'concurrency': args.concurrency,
+            'requests_per_endpoint': args.requests,
+            'seeded': seeded,
+        },
+        'endpoints': endpoints,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
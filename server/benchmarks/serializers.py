@@ -0,0 +1,99 @@
+"""Time the fast-path serializers against the marshmallow schemas.
+
+    python -m benchmarks.serializers --workouts 5000 --sample 500
+
+tests/test_serializers.py checks that their output is the same.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app import create_app
+from models import db, Exercise, Workout, WorkoutExercise
+from schemas import workouts_schema
+from seed import seed_scale
+from serializers import (
+    WORKOUT_COLUMNS, LINK_COLUMNS,
+    dump_workouts, workouts_from_rows,
+)
+
+WORKOUT_LOAD_OPTIONS = (
+    selectinload(Workout.exercises),
+    selectinload(Workout.workout_exercises).joinedload(WorkoutExercise.exercise),
+)
+
+def best_of(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def link_rows(workout_ids):
+    return db.session.execute(
+        select(*LINK_COLUMNS)
+        .join(Exercise, Exercise.id == WorkoutExercise.exercise_id)
+        .where(WorkoutExercise.workout_id.in_(workout_ids))
+        .order_by(WorkoutExercise.id)
+    ).all()
+
+def benchmark(sample, repeat):
+    workouts = Workout.query.options(*WORKOUT_LOAD_OPTIONS).order_by(Workout.id).limit(sample).all()
+    ids = [w.id for w in workouts]
+    workout_rows = db.session.execute(select(*WORKOUT_COLUMNS).where(Workout.id.in_(ids)).order_by(Workout.id)).all()
+    links = link_rows(ids)
+
+    timings = {
+        'workouts_schema.dump': best_of(lambda: workouts_schema.dump(workouts), repeat),
+        'dump_workouts': best_of(lambda: dump_workouts(workouts), repeat),
+        'workouts_from_rows': best_of(lambda: workouts_from_rows(workout_rows, links), repeat),
+    }
+
+    # End to end: fetch + serialize a page, as the list endpoint does
+    def orm_path():
+        db.session.expunge_all()
+        page = Workout.query.options(*WORKOUT_LOAD_OPTIONS).where(Workout.id.in_(ids)).all()
+        workouts_schema.dump(page)
+
+    def row_path():
+        rows = db.session.execute(select(*WORKOUT_COLUMNS).where(Workout.id.in_(ids))).all()
+        workouts_from_rows(rows, link_rows(ids))
+
+    timings['orm query + workouts_schema.dump'] = best_of(orm_path, repeat)
+    timings['row query + workouts_from_rows'] = best_of(row_path, repeat)
+    return timings
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', help="Use existing data instead of seeding a fresh SQLite file")
+    parser.add_argument('--workouts', type=int, default=5000, help="Workouts to seed")
+    parser.add_argument('--sample', type=int, default=500, help="Workouts serialized per run")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    database_url = args.database_url
+    if not database_url:
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='workout-bench-'), 'bench.db')
+    app = create_app('production', {'SQLALCHEMY_DATABASE_URI': database_url})
+    with app.app_context():
+        if not args.database_url:
+            db.create_all()
+            seed_scale(args.workouts)
+
+        timings = benchmark(args.sample, args.repeat)
+        baseline = timings['workouts_schema.dump']
+        end_to_end = timings['orm query + workouts_schema.dump']
+        print(f"Serializing {args.sample} workouts (best of {args.repeat}):")
+        for name, seconds in timings.items():
+            reference = end_to_end if name.startswith(('orm', 'row')) else baseline
+            print(f"  {name:<36} {seconds * 1000:9.2f} ms  ({reference / seconds:.1f}x)")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
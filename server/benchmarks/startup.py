@@ -0,0 +1,157 @@
+"""Measure how long each worker takes to start serving, with and without preloading.
+
+    python -m benchmarks.startup --workers 4
+
+cold: every worker is a fresh interpreter that imports and builds the app
+the way wsgi.py does, then serves its first requests (gunicorn without
+--preload). preload: one master imports, builds and warms the app, then
+forks the workers, which only serve their first requests (gunicorn
+--preload). On Linux it also reports the memory each worker has written
+to (Private_Dirty) instead of sharing with the master.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PHASES = ('interpreter', 'import', 'create_app', 'warm_up', 'fork', 'first requests')
+
+def private_dirty_kb():
+    """Private_Dirty of this process in kB, or None where /proc has no smaps_rollup"""
+    try:
+        with open('/proc/self/smaps_rollup') as smaps:
+            for line in smaps:
+                if line.startswith('Private_Dirty:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def first_requests(app):
+    """Serve the first requests a new worker sees; returns the elapsed seconds"""
+    client = app.test_client()
+    start = time.perf_counter()
+    for url in ('/workouts?limit=20', '/workouts/1', '/exercises?limit=20', '/exercises/1'):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {url} returned {response.status_code}")
+    return time.perf_counter() - start
+
+def build(database_url):
+    """Import, build and warm the app as wsgi.py does, timing each phase"""
+    timings = {}
+    start = time.perf_counter()
+    from app import create_app, warm_up
+    timings['import'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    app = create_app('production', {'SQLALCHEMY_DATABASE_URI': database_url, 'LOAD_MIGRATIONS': False})
+    timings['create_app'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    warm_up(app)
+    timings['warm_up'] = time.perf_counter() - start
+    return app, timings
+
+def cold_worker(database_url):
+    """Runs in a fresh interpreter; prints this worker's timings as JSON"""
+    import gc
+    app, timings = build(database_url)
+    gc.freeze()
+    timings['first requests'] = first_requests(app)
+    print(json.dumps({'timings': timings, 'private_dirty_kb': private_dirty_kb()}))
+
+def preload_master(database_url, workers):
+    """Runs in a fresh interpreter; builds the app once, forks `workers` workers and prints their timings as JSON"""
+    import gc
+    app, master = build(database_url)
+    gc.freeze()
+
+    results = []
+    for _ in range(workers):
+        read_end, write_end = os.pipe()
+        forked = time.perf_counter()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_end)
+            timings = {'fork': time.perf_counter() - forked, 'first requests': first_requests(app)}
+            with os.fdopen(write_end, 'w') as pipe:
+                json.dump({'timings': timings, 'private_dirty_kb': private_dirty_kb()}, pipe)
+            os._exit(0)
+        os.close(write_end)
+        with os.fdopen(read_end) as pipe:
+            results.append(json.load(pipe))
+        os.waitpid(pid, 0)
+    print(json.dumps({'master': master, 'workers': results}))
+
+def run_role(role, database_url, workers=1):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.startup', '--role', role,
+         '--database-url', database_url, '--workers', str(workers)],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout), time.perf_counter() - start
+
+def seed(database_url, workouts):
+    from app import create_app
+    from models import db
+    from seed import seed_scale
+
+    app = create_app('production', {'SQLALCHEMY_DATABASE_URI': database_url})
+    with app.app_context():
+        db.create_all()
+        seed_scale(workouts)
+
+def report(name, workers, master=None):
+    print(f"  {name}")
+    if master:
+        for phase, seconds in master.items():
+            print(f"    {'master ' + phase:<28} {seconds * 1000:9.1f} ms")
+    for phase in PHASES:
+        samples = [worker['timings'][phase] for worker in workers if phase in worker['timings']]
+        if samples:
+            print(f"    {'worker ' + phase:<28} {statistics.median(samples) * 1000:9.1f} ms")
+    total = statistics.median(sum(worker['timings'].values()) for worker in workers)
+    print(f"    {'worker cold start':<28} {total * 1000:9.1f} ms")
+    memory = [worker['private_dirty_kb'] for worker in workers if worker['private_dirty_kb'] is not None]
+    if memory:
+        print(f"    {'worker private memory':<28} {statistics.median(memory) / 1024:9.1f} MB")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', help="Use existing data instead of seeding a fresh SQLite file")
+    parser.add_argument('--workouts', type=int, default=2000, help="Workouts to seed")
+    parser.add_argument('--workers', type=int, default=4, help="Workers started in each mode")
+    parser.add_argument('--role', choices=['cold', 'preload'], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.role == 'cold':
+        return cold_worker(args.database_url)
+    if args.role == 'preload':
+        return preload_master(args.database_url, args.workers)
+
+    database_url = args.database_url
+    if not database_url:
+        database_url = 'sqlite:///' + os.path.join(tempfile.mkdtemp(prefix='workout-bench-'), 'bench.db')
+        seed(database_url, args.workouts)
+
+    cold = []
+    for _ in range(args.workers):
+        worker, elapsed = run_role('cold', database_url)
+        # Whatever the process spent outside the measured phases: interpreter startup and exit
+        worker['timings']['interpreter'] = elapsed - sum(worker['timings'].values())
+        cold.append(worker)
+    preload, _ = run_role('preload', database_url, args.workers)
+
+    print(f"Median of {args.workers} workers:")
+    report('cold (no --preload)', cold)
+    report('preload', preload['workers'], preload['master'])
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""Time schema loading and model construction, with and without the model-layer validation.
+
+    python -m benchmarks.validation --items 10000
+
+Loads generated request payloads with the schemas, then builds models from
+the loaded data twice: once through the @validates hooks, and once with
+rules.build_trusted(), as the write routes do. Exits non-zero if the two
+ever build different models. Needs no database.
+"""
+import argparse
+import random
+import sys
+from datetime import date, timedelta
+
+from models import Exercise, Workout, WorkoutExercise
+from rules import EXERCISE_CATEGORIES, EXERCISE_RULES, WORKOUT_RULES, WORKOUT_EXERCISE_RULES, build_trusted
+from schemas import ExerciseSchema, WorkoutSchema, WorkoutExerciseSchema
+from benchmarks.serializers import best_of
+
+def payloads(count, seed):
+    rng = random.Random(seed)
+    today = date.today()
+    exercises = [
+        {'name': f"  exercise {''.join(rng.choices('abcdefgh', k=8))} ", 'category': rng.choice(EXERCISE_CATEGORIES),
+         'equipment_needed': rng.random() < 0.5}
+        for _ in range(count)
+    ]
+    workouts = [
+        {'date': (today - timedelta(days=rng.randrange(600))).isoformat(), 'duration_minutes': rng.randint(10, 120),
+         'notes': rng.choice(["Leg day", "Quick cardio session", "Felt tired, kept it light", ""])}
+        for _ in range(count)
+    ]
+    workout_exercises = [
+        {'workout_id': rng.randint(1, count), 'exercise_id': rng.randint(1, count),
+         'reps': rng.randint(1, 20), 'sets': rng.randint(1, 5), 'duration_seconds': None}
+        for _ in range(count)
+    ]
+    return {
+        'Exercise': (Exercise, EXERCISE_RULES, ExerciseSchema(many=True), exercises),
+        'Workout': (Workout, WORKOUT_RULES, WorkoutSchema(many=True), workouts),
+        'WorkoutExercise': (WorkoutExercise, WORKOUT_EXERCISE_RULES, WorkoutExerciseSchema(many=True), workout_exercises),
+    }
+
+def build(model, loaded):
+    return [model(**data) for data in loaded]
+
+def build_all_trusted(model, rules, loaded):
+    return [build_trusted(model, rules, data) for data in loaded]
+
+def columns(model, instance):
+    return tuple(getattr(instance, column.key) for column in model.__table__.columns)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=10000, help="Payloads per model")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args(argv)
+
+    failures = []
+    print(f"{args.items} items per model (best of {args.repeat}):")
+    for name, (model, rules, schema, items) in payloads(args.items, args.seed).items():
+        loaded = schema.load(items)
+        validated = [columns(model, instance) for instance in build(model, loaded)]
+        if validated != [columns(model, instance) for instance in build_all_trusted(model, rules, loaded)]:
+            failures.append(f"trusted {name} models differ from validated ones")
+
+        load = best_of(lambda: schema.load(items), args.repeat)
+        construct = best_of(lambda: build(model, loaded), args.repeat)
+        construct_trusted = best_of(lambda: build_all_trusted(model, rules, loaded), args.repeat)
+        print(f"  {name}")
+        for label, seconds in (
+            ('schema load', load),
+            ('construct, validated', construct),
+            ('construct, trusted', construct_trusted),
+            ('load + construct, validated', load + construct),
+            ('load + construct, trusted', load + construct_trusted),
+        ):
+            print(f"    {label:<30} {seconds * 1000:9.2f} ms  {args.items / seconds:12,.0f} items/s")
+        print(f"    {'speedup (load + construct)':<30} {(load + construct) / (load + construct_trusted):9.2f}x")
+
+    for failure in failures:
+        print(f"MISMATCH: {failure}")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
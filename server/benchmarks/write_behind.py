@@ -0,0 +1,108 @@
+"""Compare writes per second of single workout-exercise adds, direct versus write-behind.
+
+    python -m benchmarks.write_behind --writes 5000 --clients 16
+
+Every mode starts from a copy of the same seeded SQLite file (workouts
+and exercises, no links yet) and has --clients threads POST
+/workouts/<id>/exercises/<id>/workout_exercises until --writes rows are
+added: directly (one commit per request), and through the write-behind
+queue with sync and with async acks. The async time runs until the queue
+has flushed every row. Exits non-zero if a mode loses or rejects writes.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import delete, func, select
+
+from app import create_app
+from models import db, ExerciseVolume, PersonalRecord, WorkoutExercise
+from seed import seed_scale
+from benchmarks.load import percentile
+
+MODES = {
+    'direct': {'WRITE_BEHIND': False},
+    'write-behind, sync ack': {'WRITE_BEHIND': True, 'WRITE_BEHIND_ACK': 'sync'},
+    'write-behind, async ack': {'WRITE_BEHIND': True, 'WRITE_BEHIND_ACK': 'async'},
+}
+
+def seed(path, workouts, exercises):
+    app = create_app('production', {'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path})
+    with app.app_context():
+        db.create_all()
+        seed_scale(workouts, exercises)
+        for model in (PersonalRecord, ExerciseVolume, WorkoutExercise):
+            db.session.execute(delete(model))
+        db.session.commit()
+        db.session.remove()
+        db.engine.dispose()
+
+def run_mode(path, overrides, pairs, clients):
+    """POST every (workout_id, exercise_id) pair; returns (seconds, sorted latencies in ms, statuses, rows stored)"""
+    app = create_app('production', dict(overrides, SQLALCHEMY_DATABASE_URI='sqlite:///' + path))
+
+    def post(pair):
+        client = app.test_client()
+        start = time.perf_counter()
+        response = client.post(f'/workouts/{pair[0]}/exercises/{pair[1]}/workout_exercises', json={'reps': 8, 'sets': 3})
+        return (time.perf_counter() - start) * 1000, response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as executor:
+        results = list(executor.map(post, pairs))
+    if 'write_behind' in app.extensions:
+        app.extensions['write_behind'].close()
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        rows = db.session.scalar(select(func.count()).select_from(WorkoutExercise))
+        db.session.remove()
+        db.engine.dispose()
+    return elapsed, sorted(latency for latency, _ in results), [status for _, status in results], rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--writes', type=int, default=5000)
+    parser.add_argument('--clients', type=int, default=16, help="Concurrent writers")
+    parser.add_argument('--workouts', type=int, default=1000)
+    parser.add_argument('--exercises', type=int, default=100)
+    parser.add_argument('--synchronous', choices=['OFF', 'NORMAL', 'FULL'], default='NORMAL',
+                        help="SQLite synchronous pragma; FULL fsyncs on every commit")
+    args = parser.parse_args(argv)
+    if args.writes > args.workouts * args.exercises:
+        parser.error("--writes cannot exceed --workouts x --exercises")
+
+    directory = tempfile.mkdtemp(prefix='workout-bench-')
+    base = os.path.join(directory, 'base.db')
+    seed(base, args.workouts, args.exercises)
+    # Spread the writes over every workout, as concurrent live sessions would
+    pairs = [(workout_id, exercise_id) for exercise_id in range(1, args.exercises + 1)
+             for workout_id in range(1, args.workouts + 1)][:args.writes]
+
+    failures = []
+    baseline = None
+    print(f"{args.writes} writes from {args.clients} clients, synchronous={args.synchronous}:")
+    for number, (name, overrides) in enumerate(MODES.items()):
+        path = os.path.join(directory, f'mode-{number}.db')
+        shutil.copy(base, path)
+        elapsed, latencies, statuses, rows = run_mode(
+            path, dict(overrides, SQLITE_SYNCHRONOUS=args.synchronous), pairs, args.clients
+        )
+        rate = args.writes / elapsed
+        baseline = baseline or rate
+        print(f"  {name:<26} {rate:10,.0f} writes/s ({rate / baseline:4.1f}x)"
+              f"  p50 {percentile(latencies, 50):7.2f} ms  p99 {percentile(latencies, 99):7.2f} ms")
+        rejected = sum(status >= 400 for status in statuses)
+        if rejected or rows != args.writes:
+            failures.append(f"{name}: {rejected} writes rejected, {rows} of {args.writes} rows stored")
+
+    for failure in failures:
+        print(f"FAILED: {failure}")
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,196 @@
+import base64
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, current_app, g, has_app_context, request
+
+from encoders import negotiate_mimetype, representation_tag
+
+class LRUCache:
+    """In-process cache backend: bounded LRU with a per-entry TTL.
+
+    Version counters live outside the LRU so they are never evicted. Each
+    process gets its own random generation, so ETags issued by one worker
+    never validate against another worker's (possibly stale) entries;
+    forked workers call after_fork() to stop sharing their parent's.
+    """
+
+    # Invalidations reach this process only
+    shared = False
+
+    def __init__(self, max_entries=1024, ttl=300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.after_fork()
+
+    def after_fork(self):
+        """Start empty, with a new generation and a lock no other thread can hold"""
+        self.generation = uuid.uuid4().hex[:8]
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def version(self, name):
+        with self._lock:
+            return f'{self.generation}.{self._versions.get(name, 0)}'
+
+    def bump(self, name):
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+
+
+class SharedCache:
+    """Cache backend shared by every worker, on a Redis-compatible client.
+
+    Versions are prefixed with a random generation stored next to them, as
+    LRUCache's are with its per-process one. If the server loses its data
+    (a flush or a restart without persistence) the counters restart at 0,
+    but under a new generation, so ETags issued before never match again.
+
+    Only get/set/mget/incr are used, so any client with the redis-py
+    interface (for example fakeredis in local runs) can stand in for a
+    real server.
+    """
+
+    # Invalidations reach every process using the same server
+    shared = True
+
+    def __init__(self, client, ttl=300, prefix='workout-api:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.generation_key = f'{prefix}generation'
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, value, ex=self.ttl)
+
+    def version(self, name):
+        generation, count = self.client.mget(self.generation_key, f'{self.prefix}version:{name}')
+        if generation is None:
+            # First use, or the data is gone: start a generation (unless another worker just did)
+            self.client.set(self.generation_key, uuid.uuid4().hex[:8], nx=True)
+            generation, count = self.client.mget(self.generation_key, f'{self.prefix}version:{name}')
+        return f'{_text(generation)}.{_text(count or 0)}'
+
+    def bump(self, name):
+        self.client.incr(f'{self.prefix}version:{name}')
+
+    def after_fork(self):
+        # redis-py's connection pool notices the new pid and reconnects on its own
+        pass
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def create_backend(url=None, ttl=300, max_entries=1024):
+    """Build a SharedCache for a redis:// URL, or an LRUCache when url is empty"""
+    if not url:
+        return LRUCache(max_entries=max_entries, ttl=ttl)
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError("The redis package is required to use a shared response cache")
+    return SharedCache(redis.Redis.from_url(url), ttl=ttl)
+
+
+class ResponseCache:
+    """Read-through cache for GET responses, keyed on named data versions.
+
+    A view decorated with @cached('exercises') is served from the cache
+    until invalidate('exercises') is called. Its ETag is derived from the
+    versions and the negotiated response type alone, so If-None-Match is
+    answered with a 304 without running the view or touching the database.
+    """
+
+    # Response headers that are stored alongside the body
+    CACHED_HEADERS = ('Link', 'X-Next-Cursor')
+
+    def __init__(self, backend=None):
+        self.default_backend = backend or LRUCache()
+
+    def init_app(self, app):
+        """Pick the app's backend from RESPONSE_CACHE_URL / RESPONSE_CACHE_TTL"""
+        app.extensions['response_cache'] = create_backend(
+            app.config.get('RESPONSE_CACHE_URL'), ttl=app.config.get('RESPONSE_CACHE_TTL', 300)
+        )
+
+    @property
+    def backend(self):
+        if has_app_context():
+            return current_app.extensions.get('response_cache', self.default_backend)
+        return self.default_backend
+
+    def etag(self, names, mimetype):
+        versions = '-'.join(f'{name}.{self.backend.version(name)}' for name in names)
+        return f'"{versions}-{representation_tag(mimetype)}"'
+
+    def invalidate(self, *names):
+        for name in names:
+            self.backend.bump(name)
+
+    def cached(self, *names):
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                # Responses are negotiated (JSON or MessagePack), so the ETag includes the type
+                etag = self.etag(names, negotiate_mimetype())
+                if etag.strip('"') in request.if_none_match:
+                    response = Response(status=304, headers={'ETag': etag})
+                    response.vary.add('Accept')
+                    return response
+
+                key = f'{etag}:{request.full_path}'
+                hit = self.backend.get(key)
+                if hit is not None:
+                    entry = json.loads(hit)
+                    response = Response(
+                        base64.b64decode(entry['body']), mimetype=entry['mimetype'], headers=entry['headers']
+                    )
+                    response.vary.add('Accept')
+                else:
+                    # Tells replicas.py to read from the primary: this response is served to every client
+                    g.response_cache_fill = True
+                    try:
+                        response = view(*args, **kwargs)
+                    finally:
+                        g.pop('response_cache_fill', None)
+                    if response.status_code != 200:
+                        return response
+                    headers = {h: response.headers[h] for h in self.CACHED_HEADERS if h in response.headers}
+                    self.backend.set(key, json.dumps({
+                        'body': base64.b64encode(response.get_data()).decode(),
+                        'mimetype': response.mimetype,
+                        'headers': headers,
+                    }))
+                response.headers['ETag'] = etag
+                return response
+            return wrapper
+        return decorator
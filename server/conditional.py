@@ -0,0 +1,81 @@
+"""Conditional requests for single workouts.
+
+Every workout carries a version, bumped together with updated_at whenever
+the workout or its WorkoutExercises change (touch_workouts). Both go into
+the strong ETag of GET /workouts/<id>, and updated_at is its Last-Modified,
+so If-None-Match / If-Modified-Since are answered from one primary-key
+lookup of those two columns, without building the body. updated_at is
+needed in the ETag too: SQLite gives a deleted workout's id to the next
+new one, which starts again at version 1. JSON and MessagePack bodies
+differ byte for byte, so each gets its own ETag and responses carry
+Vary: Accept.
+
+Writes honour If-Match: the expected versions go into the WHERE clause of
+the write itself, so a concurrent change makes it match no rows instead of
+being overwritten. A version's ETag in either format satisfies it.
+"""
+import re
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, false, or_, select, update
+from werkzeug.http import http_date, is_resource_modified, quote_etag
+
+from encoders import representation_tag
+from models import db, Workout
+
+def workout_version_query(id):
+    return select(Workout.version, Workout.updated_at).where(Workout.id == id)
+
+# updated_at (naive UTC) appears in ETags as microseconds since this
+EPOCH = datetime(1970, 1, 1)
+
+def workout_etag(id, version, updated_at, mimetype):
+    """Unquoted ETag of a workout version, as a mimetype response"""
+    stamp = (updated_at - EPOCH) // timedelta(microseconds=1)
+    return f'w{id}.{version}.{stamp}.{representation_tag(mimetype)}'
+
+def validator_headers(id, version, updated_at, mimetype):
+    """ETag and Last-Modified headers for a workout sent as mimetype"""
+    return {
+        'ETag': quote_etag(workout_etag(id, version, updated_at, mimetype)),
+        'Last-Modified': http_date(updated_at.replace(tzinfo=timezone.utc)),
+    }
+
+def is_modified(environ, id, version, updated_at, mimetype):
+    """False when the request's If-None-Match / If-Modified-Since still match the workout"""
+    return is_resource_modified(
+        environ, etag=workout_etag(id, version, updated_at, mimetype), last_modified=updated_at.replace(tzinfo=timezone.utc)
+    )
+
+def expected_versions(if_match, id):
+    """(version, updated_at) pairs of workout `id` named by an If-Match header (werkzeug ETags).
+
+    None means no precondition (no header, or '*', which any existing
+    workout satisfies). An empty list means no version can match, as for
+    ETags issued before they carried updated_at.
+    """
+    if not if_match or if_match.star_tag:
+        return None
+    versions = []
+    for etag in if_match.as_set():
+        match = re.fullmatch(r'w(\d+)\.(\d+)\.(\d+)\.[\w-]+', etag)
+        if match and int(match.group(1)) == id:
+            versions.append((int(match.group(2)), EPOCH + timedelta(microseconds=int(match.group(3)))))
+    return versions
+
+def version_condition(id, versions):
+    """WHERE criteria selecting workout `id` if it is at one of `versions` (None: any version)"""
+    criteria = [Workout.id == id]
+    if versions is not None:
+        criteria.append(or_(false(), *(
+            and_(Workout.version == version, Workout.updated_at == updated_at) for version, updated_at in versions
+        )))
+    return criteria
+
+def touch_workouts(*criteria):
+    """Bump the version and updated_at of the matching workouts; returns how many matched"""
+    result = db.session.execute(
+        update(Workout).where(*criteria).values(version=Workout.version + 1, updated_at=datetime.utcnow()),
+        execution_options={'synchronize_session': False},
+    )
+    return result.rowcount
@@ -0,0 +1,125 @@
+import os
+
+def env_bool(name, default):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+def normalize_database_url(url):
+    # Some hosts still hand out the postgres:// scheme, which SQLAlchemy rejects
+    if url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+class Config:
+    """Base configuration, overridable through environment variables"""
+    SQLALCHEMY_DATABASE_URI = normalize_database_url(os.environ.get('DATABASE_URL', 'sqlite:///app.db'))
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # SQLite: WAL lets readers run alongside a writer; busy_timeout makes
+    # concurrent writers wait for the lock instead of failing immediately
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    # SQLite only enforces foreign keys when asked to, per connection
+    SQLITE_FOREIGN_KEYS = env_bool('SQLITE_FOREIGN_KEYS', True)
+
+    # PostgreSQL connection pool
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = env_bool('DB_POOL_PRE_PING', True)
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))
+
+    # Log statements slower than this many milliseconds, with their parameters
+    SLOW_QUERY_MS = float(os.environ['SLOW_QUERY_MS']) if os.environ.get('SLOW_QUERY_MS') else None
+
+    # redis:// URL for a response cache shared by all workers; in-process LRU when unset.
+    # CLI commands that change data (archive-workouts) can only invalidate the
+    # workers' cached responses through a shared cache.
+    RESPONSE_CACHE_URL = os.environ.get('RESPONSE_CACHE_URL')
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 300))
+
+    # Register Flask-Migrate (the `flask db` commands). Serving workers can
+    # turn it off to skip importing alembic at startup.
+    LOAD_MIGRATIONS = env_bool('LOAD_MIGRATIONS', True)
+
+    # Read replicas of the primary for the GET views (replicas.py), comma separated
+    REPLICA_DATABASE_URLS = [
+        normalize_database_url(url.strip()) for url in os.environ.get('REPLICA_DATABASE_URLS', '').split(',') if url.strip()
+    ]
+    # How long a client reads from the primary after a write; keep it above the replicas' lag
+    REPLICA_STICKY_SECONDS = float(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+    # How often an unhealthy (or idle) replica is checked again, in seconds
+    REPLICA_CHECK_INTERVAL = float(os.environ.get('REPLICA_CHECK_INTERVAL', 5))
+
+    # Write-behind for POST /workouts/<id>/exercises/<id>/workout_exercises:
+    # queue the rows and write them in group commits of up to
+    # WRITE_BEHIND_MAX_ROWS, at most WRITE_BEHIND_INTERVAL_MS after the oldest
+    WRITE_BEHIND = env_bool('WRITE_BEHIND', False)
+    WRITE_BEHIND_MAX_ROWS = int(os.environ.get('WRITE_BEHIND_MAX_ROWS', 500))
+    WRITE_BEHIND_INTERVAL_MS = float(os.environ.get('WRITE_BEHIND_INTERVAL_MS', 5))
+    WRITE_BEHIND_QUEUE_SIZE = int(os.environ.get('WRITE_BEHIND_QUEUE_SIZE', 10000))
+    # How long a request waits for room in a full queue before getting a 503
+    WRITE_BEHIND_ENQUEUE_TIMEOUT_MS = float(os.environ.get('WRITE_BEHIND_ENQUEUE_TIMEOUT_MS', 100))
+    # sync: respond once the row is committed; async: respond 202 once it is queued
+    WRITE_BEHIND_ACK = os.environ.get('WRITE_BEHIND_ACK', 'sync')
+    # How long a sync-ack request waits for its row's commit before getting a 503
+    WRITE_BEHIND_ACK_TIMEOUT_MS = float(os.environ.get('WRITE_BEHIND_ACK_TIMEOUT_MS', 10000))
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+
+
+class ProductionConfig(Config):
+    pass
+
+
+class TestingConfig(Config):
+    TESTING = True
+    # Point at a disposable Postgres to test against it; in-memory SQLite otherwise
+    SQLALCHEMY_DATABASE_URI = normalize_database_url(os.environ.get('TEST_DATABASE_URL', 'sqlite://'))
+
+
+config_by_name = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig,
+}
+
+def get_config(name=None):
+    """Look up a config class by name, defaulting to the APP_CONFIG variable"""
+    name = name or os.environ.get('APP_CONFIG', 'development')
+    try:
+        return config_by_name[name]
+    except KeyError:
+        raise ValueError(f"Unknown config {name!r}; expected one of: {', '.join(config_by_name)}")
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database backend"""
+    url = config['SQLALCHEMY_DATABASE_URI']
+    if url.startswith('sqlite'):
+        return {'connect_args': {'timeout': config['SQLITE_BUSY_TIMEOUT_MS'] / 1000}}
+    options = {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+    if url.startswith('postgresql'):
+        options['connect_args'] = {'options': f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"}
+    return options
+
+def set_sqlite_pragmas(config):
+    """Build a 'connect' event listener applying the SQLite pragmas from config"""
+    def listener(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}")
+        cursor.execute(f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}")
+        cursor.execute(f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}")
+        cursor.execute(f"PRAGMA foreign_keys={'ON' if config['SQLITE_FOREIGN_KEYS'] else 'OFF'}")
+        cursor.close()
+    return listener
@@ -0,0 +1,96 @@
+"""Response encoding: a fast JSON provider and MessagePack content negotiation.
+
+orjson and msgpack are optional. Without orjson the provider falls back
+to the standard library with the same output rules; without msgpack every
+client gets JSON.
+"""
+from datetime import date
+
+from flask import current_app, request
+from flask.json.provider import DefaultJSONProvider, _default as flask_default
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+
+def default(o):
+    """Encode values JSON has no type for; dates become ISO 8601 strings"""
+    if isinstance(o, date):
+        return o.isoformat()
+    return flask_default(o)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, with native date support"""
+
+    default = staticmethod(default)
+
+    def _orjson_option(self, sort_keys, indent):
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        option = self._orjson_option(kwargs.get('sort_keys', self.sort_keys), kwargs.get('indent'))
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        option = self._orjson_option(self.sort_keys, indent) | orjson.OPT_APPEND_NEWLINE
+        return self._app.response_class(orjson.dumps(obj, default=self.default, option=option), mimetype=self.mimetype)
+
+
+def best_mimetype(accept_mimetypes):
+    """The response type an Accept header prefers: MessagePack if asked for (and installed), else JSON"""
+    if msgpack is None:
+        return JSON_MIMETYPE
+    return accept_mimetypes.best_match((JSON_MIMETYPE,) + MSGPACK_MIMETYPES, default=JSON_MIMETYPE)
+
+def representation_tag(mimetype):
+    """Short name of a response type for ETags, so each representation gets its own"""
+    return mimetype.rsplit('/', 1)[-1]
+
+def negotiate_mimetype():
+    """The response type the current request prefers"""
+    return best_mimetype(request.accept_mimetypes)
+
+def encode_body(data, mimetype, json_provider):
+    """Serialize data as mimetype, outside of any request; JSON uses the app's provider"""
+    if mimetype in MSGPACK_MIMETYPES:
+        return msgpack.packb(data, default=default, use_bin_type=True)
+    return json_provider.dumps(data).encode() + b'\n'
+
+def encode_response(data, status_code=200):
+    """Build a response for data in the negotiated format"""
+    mimetype = negotiate_mimetype()
+    if mimetype in MSGPACK_MIMETYPES:
+        response = current_app.response_class(
+            msgpack.packb(data, default=default, use_bin_type=True), mimetype=mimetype
+        )
+    else:
+        response = current_app.json.response(data)
+    response.status_code = status_code
+    response.vary.add('Accept')
+    return response
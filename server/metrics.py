@@ -0,0 +1,167 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from flask import Response, current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+slow_query_logger = logging.getLogger('workout_api.slow_query')
+
+# Histogram buckets, in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+
+class RequestMetrics:
+    """Timings collected while handling one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = defaultdict(float)
+        self.active = set()
+        self.queries = 0
+
+
+@contextmanager
+def timed(phase):
+    """Add the time spent in the block to the current request's phase.
+
+    Nested blocks for the same phase (e.g. a nested schema dump) are only
+    counted once, by the outermost block.
+    """
+    current = g.get('request_metrics') if has_request_context() else None
+    if current is None or phase in current.active:
+        yield
+        return
+    current.active.add(phase)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        current.phases[phase] += time.perf_counter() - start
+        current.active.discard(phase)
+
+
+# Listening on the Engine class rather than db.engine, so statements sent to a
+# read replica (replicas.py) are timed and counted like those to the primary.
+# Start times are kept per cursor: a failed statement never reaches
+# after_cursor_execute, and handle_error drops its entry instead.
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start', {})[id(cursor)] = time.perf_counter()
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_start'].pop(id(cursor))
+    if has_request_context() and 'request_metrics' in g:
+        g.request_metrics.phases['sql'] += elapsed
+        g.request_metrics.queries += 1
+    slow_query_ms = current_app.config.get('SLOW_QUERY_MS') if has_app_context() else None
+    if slow_query_ms is not None and elapsed * 1000 >= slow_query_ms:
+        slow_query_logger.warning(
+            "Slow query (%.1f ms): %s | parameters: %r", elapsed * 1000, statement, parameters
+        )
+
+@event.listens_for(Engine, 'handle_error')
+def _handle_error(context):
+    if context.connection is not None and context.execution_context is not None:
+        context.connection.info.get('query_start', {}).pop(id(context.execution_context.cursor), None)
+
+
+def format_labels(labels):
+    return ','.join(f'{key}="{value}"' for key, value in labels)
+
+
+class Metrics:
+    """Per-route request/phase histograms, query counters and a /metrics endpoint.
+
+    Metrics are kept per process; scrape every worker, or run one worker
+    per metrics target.
+    """
+
+    def __init__(self, app=None):
+        self.after_fork()
+        if app is not None:
+            self.init_app(app)
+
+    def after_fork(self):
+        """Start a forked worker from zero, with a lock no other thread can hold"""
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.durations = defaultdict(Histogram)
+        self.phases = defaultdict(Histogram)
+        self.requests = defaultdict(int)
+        self.queries = defaultdict(int)
+
+    def init_app(self, app):
+        app.config.setdefault('SLOW_QUERY_MS', None)
+
+        app.before_request(self.before_request)
+        app.after_request(self.after_request)
+        app.add_url_rule('/metrics', 'metrics', self.render, methods=['GET'])
+
+
+    def before_request(self):
+        if request.endpoint != 'metrics':
+            g.request_metrics = RequestMetrics()
+
+    def after_request(self, response):
+        current = g.pop('request_metrics', None)
+        if current is None:
+            return response
+        elapsed = time.perf_counter() - current.started
+        endpoint = request.endpoint or 'unmatched'
+        key = (('endpoint', endpoint), ('method', request.method))
+        with self.lock:
+            self.durations[key].observe(elapsed)
+            self.requests[key + (('status', response.status_code),)] += 1
+            self.queries[key] += current.queries
+            for phase, seconds in current.phases.items():
+                self.phases[key + (('phase', phase),)].observe(seconds)
+        return response
+
+    def render(self):
+        """Prometheus text exposition of everything collected so far"""
+        lines = []
+        with self.lock:
+            for name, help_text, histograms in (
+                ('http_request_duration_seconds', 'Time to handle a request, by route', self.durations),
+                ('http_request_phase_seconds', 'Time spent per request in sql, serialize, deserialize and encode', self.phases),
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for labels, histogram in sorted(histograms.items()):
+                    base = format_labels(labels)
+                    for bound, count in zip(BUCKETS, histogram.counts):
+                        lines.append(f'{name}_bucket{{{base},le="{bound}"}} {count}')
+                    lines.append(f'{name}_bucket{{{base},le="+Inf"}} {histogram.count}')
+                    lines.append(f'{name}_sum{{{base}}} {histogram.total}')
+                    lines.append(f'{name}_count{{{base}}} {histogram.count}')
+            for name, help_text, counters in (
+                ('http_requests_total', 'Requests handled, by route and status', self.requests),
+                ('db_queries_total', 'SQL statements executed, by route', self.queries),
+            ):
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for labels, value in sorted(counters.items()):
+                    lines.append(f'{name}{{{format_labels(labels)}}} {value}')
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
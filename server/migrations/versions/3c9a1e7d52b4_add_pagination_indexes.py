@@ -0,0 +1,31 @@
+"""Add pagination indexes
+
+Revision ID: 3c9a1e7d52b4
+Revises: fbaf0ccf3b39
+Create Date: 2026-10-18 09:12:41.530417
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9a1e7d52b4'
+down_revision = 'fbaf0ccf3b39'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('exercises', schema=None) as batch_op:
+        batch_op.create_index('ix_exercises_category_id', ['category', 'id'], unique=False)
+
+    with op.batch_alter_table('workouts', schema=None) as batch_op:
+        batch_op.create_index('ix_workouts_date_id', ['date', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('workouts', schema=None) as batch_op:
+        batch_op.drop_index('ix_workouts_date_id')
+
+    with op.batch_alter_table('exercises', schema=None) as batch_op:
+        batch_op.drop_index('ix_exercises_category_id')
@@ -0,0 +1,47 @@
+"""Add exercise volume rollup
+
+Revision ID: 8d4f0b6a21c7
+Revises: 3c9a1e7d52b4
+Create Date: 2026-10-18 11:47:05.118934
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d4f0b6a21c7'
+down_revision = '3c9a1e7d52b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('exercise_volume',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('exercise_id', sa.Integer(), nullable=False),
+    sa.Column('workout_count', sa.Integer(), nullable=False),
+    sa.Column('total_sets', sa.Integer(), nullable=False),
+    sa.Column('total_reps', sa.Integer(), nullable=False),
+    sa.Column('total_duration_seconds', sa.Integer(), nullable=False),
+    sa.Column('workout_minutes', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['exercise_id'], ['exercises.id'], ),
+    sa.PrimaryKeyConstraint('day', 'exercise_id')
+    )
+
+    # Backfill from existing history
+    op.execute("""
+        INSERT INTO exercise_volume
+            (day, exercise_id, workout_count, total_sets, total_reps, total_duration_seconds, workout_minutes)
+        SELECT w.date, we.exercise_id, COUNT(*),
+               SUM(COALESCE(we.sets, 1)),
+               SUM(COALESCE(we.sets, 1) * COALESCE(we.reps, 0)),
+               SUM(COALESCE(we.sets, 1) * COALESCE(we.duration_seconds, 0)),
+               SUM(w.duration_minutes)
+        FROM workouts w JOIN workout_exercises we ON we.workout_id = w.id
+        GROUP BY w.date, we.exercise_id
+    """)
+
+
+def downgrade():
+    op.drop_table('exercise_volume')
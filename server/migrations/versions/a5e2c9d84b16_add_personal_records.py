@@ -0,0 +1,63 @@
+"""Add personal records
+
+Revision ID: a5e2c9d84b16
+Revises: e93b5f0c7d18
+Create Date: 2026-10-18 17:25:13.402871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5e2c9d84b16'
+down_revision = 'e93b5f0c7d18'
+branch_labels = None
+depends_on = None
+
+# metric -> value of one workout_exercises row (records.PR_METRICS)
+METRICS = {
+    'max_reps': 'we.reps',
+    'max_volume': 'COALESCE(we.sets, 1) * we.reps',
+    'max_duration': 'COALESCE(we.sets, 1) * we.duration_seconds',
+}
+
+
+def upgrade():
+    op.create_table('personal_records',
+    sa.Column('exercise_id', sa.Integer(), nullable=False),
+    sa.Column('metric', sa.String(length=20), nullable=False),
+    sa.Column('value', sa.Integer(), nullable=False),
+    sa.Column('workout_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('reps', sa.Integer(), nullable=True),
+    sa.Column('sets', sa.Integer(), nullable=True),
+    sa.Column('duration_seconds', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['exercise_id'], ['exercises.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['workout_id'], ['workouts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('exercise_id', 'metric')
+    )
+    with op.batch_alter_table('personal_records', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_personal_records_workout_id'), ['workout_id'], unique=False)
+
+    # Backfill: each exercise's best set per metric, earliest first on ties
+    for metric, value in METRICS.items():
+        op.execute(f"""
+            INSERT INTO personal_records (exercise_id, metric, value, workout_id, day, reps, sets, duration_seconds)
+            SELECT exercise_id, '{metric}', value, workout_id, day, reps, sets, duration_seconds
+            FROM (
+                SELECT we.exercise_id, {value} AS value, w.id AS workout_id, w.date AS day,
+                       we.reps, we.sets, we.duration_seconds,
+                       ROW_NUMBER() OVER (PARTITION BY we.exercise_id ORDER BY {value} DESC, w.date, w.id) AS position
+                FROM workout_exercises we JOIN workouts w ON w.id = we.workout_id
+                WHERE {value} > 0
+            ) ranked
+            WHERE position = 1
+        """)
+
+
+def downgrade():
+    with op.batch_alter_table('personal_records', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_personal_records_workout_id'))
+
+    op.drop_table('personal_records')
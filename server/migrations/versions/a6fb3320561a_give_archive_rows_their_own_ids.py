@@ -0,0 +1,129 @@
+"""Give archive rows their own ids
+
+Revision ID: a6fb3320561a
+Revises: f6b3d9e2a471
+Create Date: 2026-10-18 21:14:36.207915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6fb3320561a'
+down_revision = 'f6b3d9e2a471'
+branch_labels = None
+depends_on = None
+
+# SQLite reuses the id of a deleted workout, so the same workout id can be
+# archived twice. Both tables are rebuilt: the rows are copied aside, the
+# tables recreated (child first, so no ON DELETE CASCADE fires) and the
+# rows copied back.
+
+
+def copy_aside():
+    op.execute('CREATE TABLE _workouts_archive_old AS SELECT * FROM workouts_archive')
+    op.execute('CREATE TABLE _workout_exercises_archive_old AS SELECT * FROM workout_exercises_archive')
+
+
+def drop_copies():
+    op.drop_table('_workout_exercises_archive_old')
+    op.drop_table('_workouts_archive_old')
+
+
+def reset_sequences():
+    # Ids were copied in explicitly; PostgreSQL's sequences do not see them
+    if op.get_bind().dialect.name == 'postgresql':
+        for table in ('workouts_archive', 'workout_exercises_archive'):
+            op.execute(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM {table}")
+
+
+def upgrade():
+    copy_aside()
+    op.drop_index('ix_workout_exercises_archive_workout_id', table_name='workout_exercises_archive')
+    op.drop_table('workout_exercises_archive')
+    op.drop_index('ix_workouts_archive_date', table_name='workouts_archive')
+    op.drop_table('workouts_archive')
+
+    op.create_table('workouts_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('workout_id', sa.Integer(), nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('duration_minutes', sa.Integer(), nullable=False),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sqlite_autoincrement=True
+    )
+    op.create_index('ix_workouts_archive_date', 'workouts_archive', ['date'])
+    op.create_index('ix_workouts_archive_workout_id', 'workouts_archive', ['workout_id'])
+    op.create_table('workout_exercises_archive',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('workout_exercise_id', sa.Integer(), nullable=False),
+    sa.Column('workout_archive_id', sa.Integer(), nullable=False),
+    sa.Column('exercise_id', sa.Integer(), nullable=False),
+    sa.Column('reps', sa.Integer(), nullable=True),
+    sa.Column('sets', sa.Integer(), nullable=True),
+    sa.Column('duration_seconds', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['workout_archive_id'], ['workouts_archive.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sqlite_autoincrement=True
+    )
+    op.create_index('ix_workout_exercises_archive_workout_archive_id', 'workout_exercises_archive', ['workout_archive_id'])
+
+    # Until now an archive row's id was its workout's (or workout exercise's) id
+    op.execute("""
+        INSERT INTO workouts_archive (id, workout_id, date, duration_minutes, notes, archived_at)
+        SELECT id, id, date, duration_minutes, notes, archived_at FROM _workouts_archive_old
+    """)
+    op.execute("""
+        INSERT INTO workout_exercises_archive (id, workout_exercise_id, workout_archive_id, exercise_id, reps, sets, duration_seconds)
+        SELECT id, id, workout_id, exercise_id, reps, sets, duration_seconds FROM _workout_exercises_archive_old
+    """)
+    drop_copies()
+    reset_sequences()
+
+
+def downgrade():
+    copy_aside()
+    op.drop_index('ix_workout_exercises_archive_workout_archive_id', table_name='workout_exercises_archive')
+    op.drop_table('workout_exercises_archive')
+    op.drop_index('ix_workouts_archive_workout_id', table_name='workouts_archive')
+    op.drop_index('ix_workouts_archive_date', table_name='workouts_archive')
+    op.drop_table('workouts_archive')
+
+    op.create_table('workouts_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('duration_minutes', sa.Integer(), nullable=False),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_workouts_archive_date', 'workouts_archive', ['date'])
+    op.create_table('workout_exercises_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('workout_id', sa.Integer(), nullable=False),
+    sa.Column('exercise_id', sa.Integer(), nullable=False),
+    sa.Column('reps', sa.Integer(), nullable=True),
+    sa.Column('sets', sa.Integer(), nullable=True),
+    sa.Column('duration_seconds', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['workout_id'], ['workouts_archive.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_workout_exercises_archive_workout_id', 'workout_exercises_archive', ['workout_id'])
+
+    # The old tables hold one row per workout id: only its latest archive is kept
+    op.execute("""
+        INSERT INTO workouts_archive (id, date, duration_minutes, notes, archived_at)
+        SELECT workout_id, date, duration_minutes, notes, archived_at FROM _workouts_archive_old
+        WHERE id IN (SELECT MAX(id) FROM _workouts_archive_old GROUP BY workout_id)
+    """)
+    op.execute("""
+        INSERT INTO workout_exercises_archive (id, workout_id, exercise_id, reps, sets, duration_seconds)
+        SELECT e.workout_exercise_id, w.workout_id, e.exercise_id, e.reps, e.sets, e.duration_seconds
+        FROM _workout_exercises_archive_old e JOIN _workouts_archive_old w ON w.id = e.workout_archive_id
+        WHERE e.id IN (SELECT MAX(id) FROM _workout_exercises_archive_old GROUP BY workout_exercise_id)
+        AND w.id IN (SELECT MAX(id) FROM _workouts_archive_old GROUP BY workout_id)
+    """)
+    drop_copies()
@@ -0,0 +1,77 @@
+"""Add full-text search
+
+Revision ID: b71e4c2a9f05
+Revises: 8d4f0b6a21c7
+Create Date: 2026-10-18 14:02:41.553170
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b71e4c2a9f05'
+down_revision = '8d4f0b6a21c7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(
+            "CREATE INDEX ix_workouts_notes_fts ON workouts "
+            "USING gin (to_tsvector('english', coalesce(notes, '')))"
+        )
+        op.execute("CREATE INDEX ix_exercises_name_trgm ON exercises USING gin (name gin_trgm_ops)")
+        return
+
+    # SQLite: FTS5 tables over the existing rows, kept in sync by triggers
+    op.execute(
+        "CREATE VIRTUAL TABLE workouts_fts USING fts5("
+        "notes, content='workouts', content_rowid='id', tokenize='porter unicode61')"
+    )
+    op.execute(
+        "CREATE TRIGGER workouts_fts_insert AFTER INSERT ON workouts BEGIN "
+        "INSERT INTO workouts_fts(rowid, notes) VALUES (new.id, new.notes); END"
+    )
+    op.execute(
+        "CREATE TRIGGER workouts_fts_delete AFTER DELETE ON workouts BEGIN "
+        "INSERT INTO workouts_fts(workouts_fts, rowid, notes) VALUES ('delete', old.id, old.notes); END"
+    )
+    op.execute(
+        "CREATE TRIGGER workouts_fts_update AFTER UPDATE OF notes ON workouts BEGIN "
+        "INSERT INTO workouts_fts(workouts_fts, rowid, notes) VALUES ('delete', old.id, old.notes); "
+        "INSERT INTO workouts_fts(rowid, notes) VALUES (new.id, new.notes); END"
+    )
+    op.execute(
+        "CREATE VIRTUAL TABLE exercises_fts USING fts5("
+        "name, content='exercises', content_rowid='id', tokenize='trigram')"
+    )
+    op.execute(
+        "CREATE TRIGGER exercises_fts_insert AFTER INSERT ON exercises BEGIN "
+        "INSERT INTO exercises_fts(rowid, name) VALUES (new.id, new.name); END"
+    )
+    op.execute(
+        "CREATE TRIGGER exercises_fts_delete AFTER DELETE ON exercises BEGIN "
+        "INSERT INTO exercises_fts(exercises_fts, rowid, name) VALUES ('delete', old.id, old.name); END"
+    )
+    op.execute(
+        "CREATE TRIGGER exercises_fts_update AFTER UPDATE OF name ON exercises BEGIN "
+        "INSERT INTO exercises_fts(exercises_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+        "INSERT INTO exercises_fts(rowid, name) VALUES (new.id, new.name); END"
+    )
+    op.execute("INSERT INTO workouts_fts(workouts_fts) VALUES ('rebuild')")
+    op.execute("INSERT INTO exercises_fts(exercises_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("DROP INDEX ix_exercises_name_trgm")
+        op.execute("DROP INDEX ix_workouts_notes_fts")
+        return
+
+    for trigger in ('insert', 'delete', 'update'):
+        op.execute(f"DROP TRIGGER workouts_fts_{trigger}")
+        op.execute(f"DROP TRIGGER exercises_fts_{trigger}")
+    op.execute("DROP TABLE workouts_fts")
+    op.execute("DROP TABLE exercises_fts")
@@ -0,0 +1,27 @@
+"""Store workout updated_at with microseconds
+
+Revision ID: c25fcc5fb723
+Revises: a6fb3320561a
+Create Date: 2026-10-18 21:52:08.614390
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c25fcc5fb723'
+down_revision = 'a6fb3320561a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # If-Match compares updated_at for equality (conditional.py). SQLite
+    # stores it as text, and rows stamped by CURRENT_TIMESTAMP in
+    # d2a7f4c81e39 lack the microseconds SQLAlchemy writes and compares with.
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("UPDATE workouts SET updated_at = updated_at || '.000000' WHERE length(updated_at) = 19")
+
+
+def downgrade():
+    pass
@@ -0,0 +1,70 @@
+"""Cascade deletes in the database and add archive tables
+
+Revision ID: c4d8e1f3a602
+Revises: b71e4c2a9f05
+Create Date: 2026-10-18 15:21:09.402817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d8e1f3a602'
+down_revision = 'b71e4c2a9f05'
+branch_labels = None
+depends_on = None
+
+# The original foreign keys were created without names. This convention
+# names them so SQLite batch mode can find them; PostgreSQL named them
+# <table>_<column>_fkey itself.
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+FOREIGN_KEYS = {
+    'workout_exercises': [('workout_id', 'workouts'), ('exercise_id', 'exercises')],
+    'exercise_volume': [('exercise_id', 'exercises')],
+}
+
+
+def replace_foreign_keys(ondelete):
+    postgres = op.get_bind().dialect.name == 'postgresql'
+    for table, foreign_keys in FOREIGN_KEYS.items():
+        with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+            for column, referred in foreign_keys:
+                name = f'{table}_{column}_fkey' if postgres else f'fk_{table}_{column}_{referred}'
+                batch_op.drop_constraint(name, type_='foreignkey')
+                batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    replace_foreign_keys('CASCADE')
+
+    op.create_table('workouts_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('duration_minutes', sa.Integer(), nullable=False),
+    sa.Column('notes', sa.Text(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_workouts_archive_date', 'workouts_archive', ['date'])
+    op.create_table('workout_exercises_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('workout_id', sa.Integer(), nullable=False),
+    sa.Column('exercise_id', sa.Integer(), nullable=False),
+    sa.Column('reps', sa.Integer(), nullable=True),
+    sa.Column('sets', sa.Integer(), nullable=True),
+    sa.Column('duration_seconds', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['workout_id'], ['workouts_archive.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_workout_exercises_archive_workout_id', 'workout_exercises_archive', ['workout_id'])
+
+
+def downgrade():
+    op.drop_index('ix_workout_exercises_archive_workout_id', table_name='workout_exercises_archive')
+    op.drop_table('workout_exercises_archive')
+    op.drop_index('ix_workouts_archive_date', table_name='workouts_archive')
+    op.drop_table('workouts_archive')
+
+    replace_foreign_keys(None)
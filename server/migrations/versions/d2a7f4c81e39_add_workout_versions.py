@@ -0,0 +1,35 @@
+"""Add workout version and updated_at
+
+Revision ID: d2a7f4c81e39
+Revises: a5e2c9d84b16
+Create Date: 2026-10-18 18:04:52.730166
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a7f4c81e39'
+down_revision = 'a5e2c9d84b16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Plain ADD COLUMN rather than batch mode: recreating workouts on SQLite
+    # would drop its full-text search triggers. SQLite only accepts constant
+    # defaults there, so existing rows are stamped afterwards.
+    op.add_column('workouts', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+    op.add_column('workouts', sa.Column('updated_at', sa.DateTime(), nullable=False, server_default='1970-01-01 00:00:00'))
+    # updated_at is naive UTC, like datetime.utcnow()
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute("UPDATE workouts SET updated_at = timezone('utc', now())")
+        op.alter_column('workouts', 'updated_at', server_default=None)
+    else:
+        op.execute("UPDATE workouts SET updated_at = CURRENT_TIMESTAMP")
+
+
+def downgrade():
+    op.drop_column('workouts', 'updated_at')
+    op.drop_column('workouts', 'version')
@@ -0,0 +1,40 @@
+"""Add reverse foreign key and covering date indexes
+
+Revision ID: e93b5f0c7d18
+Revises: c4d8e1f3a602
+Create Date: 2026-10-18 16:40:27.118203
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e93b5f0c7d18'
+down_revision = 'c4d8e1f3a602'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('workout_exercises', schema=None) as batch_op:
+        batch_op.create_index('ix_workout_exercises_exercise_id_workout_id', ['exercise_id', 'workout_id'], unique=False)
+
+    with op.batch_alter_table('exercise_volume', schema=None) as batch_op:
+        batch_op.create_index('ix_exercise_volume_exercise_id_day', ['exercise_id', 'day'], unique=False)
+
+    # PostgreSQL can make the date index covering (SQLite has no INCLUDE)
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_workouts_date_id', table_name='workouts')
+        op.create_index('ix_workouts_date_id', 'workouts', ['date', 'id'], postgresql_include=['duration_minutes', 'notes'])
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_workouts_date_id', table_name='workouts')
+        op.create_index('ix_workouts_date_id', 'workouts', ['date', 'id'])
+
+    with op.batch_alter_table('exercise_volume', schema=None) as batch_op:
+        batch_op.drop_index('ix_exercise_volume_exercise_id_day')
+
+    with op.batch_alter_table('workout_exercises', schema=None) as batch_op:
+        batch_op.drop_index('ix_workout_exercises_exercise_id_workout_id')
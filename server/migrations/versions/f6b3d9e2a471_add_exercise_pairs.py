@@ -0,0 +1,47 @@
+"""Add exercise co-occurrence pairs
+
+Revision ID: f6b3d9e2a471
+Revises: d2a7f4c81e39
+Create Date: 2026-10-18 19:02:47.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6b3d9e2a471'
+down_revision = 'd2a7f4c81e39'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('exercise_pairs',
+    sa.Column('exercise_id', sa.Integer(), nullable=False),
+    sa.Column('related_id', sa.Integer(), nullable=False),
+    sa.Column('workout_count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['exercise_id'], ['exercises.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['related_id'], ['exercises.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('exercise_id', 'related_id')
+    )
+
+    # Backfill before indexing: every ordered pair of exercises sharing a workout
+    op.execute("""
+        INSERT INTO exercise_pairs (exercise_id, related_id, workout_count)
+        SELECT a.exercise_id, b.exercise_id, COUNT(*)
+        FROM workout_exercises a JOIN workout_exercises b ON b.workout_id = a.workout_id
+        GROUP BY a.exercise_id, b.exercise_id
+    """)
+
+    with op.batch_alter_table('exercise_pairs', schema=None) as batch_op:
+        batch_op.create_index('ix_exercise_pairs_exercise_id_workout_count', ['exercise_id', 'workout_count', 'related_id'], unique=False)
+        batch_op.create_index('ix_exercise_pairs_related_id', ['related_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('exercise_pairs', schema=None) as batch_op:
+        batch_op.drop_index('ix_exercise_pairs_related_id')
+        batch_op.drop_index('ix_exercise_pairs_exercise_id_workout_count')
+
+    op.drop_table('exercise_pairs')
@@ -1,9 +1,42 @@
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.orm import validates
 from sqlalchemy import CheckConstraint
+from sqlalchemy.dialects import postgresql, sqlite
 from datetime import datetime
 
-db = SQLAlchemy()
+from replicas import RoutingSession
+from rules import EXERCISE_RULES, WORKOUT_RULES, model_validator
+
+# Reads of the @replicas.reads views can go to a replica (replicas.py)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# The dialects upsert() can write ON CONFLICT for; create_app() refuses any other database
+UPSERT_DIALECTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+def upsert(model, rows, index_elements, set_, where=None):
+    """INSERT rows into model's table, updating the row already at index_elements instead.
+
+    set_ and where are functions of the statement's excluded (proposed) row,
+    returning the ON CONFLICT DO UPDATE values and its optional condition.
+    """
+    stmt = UPSERT_DIALECTS[db.session.get_bind().dialect.name](model)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=index_elements,
+        set_=set_(stmt.excluded),
+        where=where(stmt.excluded) if where else None,
+    )
+    db.session.execute(stmt, rows)
+
+def begin_transaction():
+    """Open the session's transaction on the database before any savepoint.
+
+    pysqlite only sends BEGIN ahead of an INSERT, UPDATE or DELETE. A
+    SAVEPOINT issued first starts a transaction of its own, and releasing it
+    commits; after an explicit BEGIN, savepoints nest inside the session's
+    transaction and its rollback undoes them.
+    """
+    connection = db.session.connection()
+    if connection.dialect.name == 'sqlite' and not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN')
 
 class Exercise(db.Model):
     __tablename__ = 'exercises'
@@ -12,6 +45,8 @@ class Exercise(db.Model):
     __table_args__ = (
         CheckConstraint('length(name) >= 2', name='check_name_length'),
         CheckConstraint("category IN ('strength', 'cardio', 'flexibility', 'sports')", name='check_valid_category'),
+        # Supports category filtering with keyset pagination on id
+        db.Index('ix_exercises_category_id', 'category', 'id'),
     )
     
     id = db.Column(db.Integer, primary_key=True)
@@ -20,22 +55,15 @@ class Exercise(db.Model):
     equipment_needed = db.Column(db.Boolean, nullable=False, default=False)
     
     # Relationships
-    workout_exercises = db.relationship('WorkoutExercise', back_populates='exercise', cascade='all, delete-orphan')
-    workouts = db.relationship('Workout', secondary='workout_exercises', back_populates='exercises', overlaps="workout_exercises")
+    # The database cascades deletes to workout_exercises (ON DELETE CASCADE),
+    # so the ORM does not load them just to delete them one by one
+    workout_exercises = db.relationship('WorkoutExercise', back_populates='exercise', cascade='all, delete-orphan', passive_deletes=True)
+    # Read-only shortcut; add exercises to workouts through WorkoutExercise
+    workouts = db.relationship('Workout', secondary='workout_exercises', back_populates='exercises', viewonly=True)
     
-    # Model validations
-    @validates('name')
-    def validate_name(self, key, name):
-        if not name or len(name.strip()) < 2:
-            raise ValueError("Exercise name must be at least 2 characters long")
-        return name.strip().title()
-    
-    @validates('category')
-    def validate_category(self, key, category):
-        valid_categories = ['strength', 'cardio', 'flexibility', 'sports']
-        if category.lower() not in valid_categories:
-            raise ValueError(f"Category must be one of: {', '.join(valid_categories)}")
-        return category.lower()
+    # Model validations (skipped by rules.build_trusted())
+    validate_name = model_validator(EXERCISE_RULES, 'name')
+    validate_category = model_validator(EXERCISE_RULES, 'category')
     
     def __repr__(self):
         return f'<Exercise {self.name}>'
@@ -47,31 +75,27 @@ class Workout(db.Model):
     # Table constraints
     __table_args__ = (
         CheckConstraint('duration_minutes > 0', name='check_positive_duration'),
+        # Supports date-range filtering with keyset pagination on (date, id).
+        # On PostgreSQL it also carries the remaining columns, so a page of
+        # workouts is read from the index alone.
+        db.Index('ix_workouts_date_id', 'date', 'id', postgresql_include=['duration_minutes', 'notes']),
     )
     
     id = db.Column(db.Integer, primary_key=True)
     date = db.Column(db.Date, nullable=False, default=datetime.utcnow().date)
     duration_minutes = db.Column(db.Integer, nullable=False)
     notes = db.Column(db.Text)
+    # Bumped whenever the workout or its WorkoutExercises change (conditional.touch_workouts)
+    version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     
     # Relationships
-    workout_exercises = db.relationship('WorkoutExercise', back_populates='workout', cascade='all, delete-orphan', overlaps="workouts")
-    exercises = db.relationship('Exercise', secondary='workout_exercises', back_populates='workouts', overlaps="workout_exercises")
-    
-    # Model validations
-    @validates('duration_minutes')
-    def validate_duration(self, key, duration):
-        if duration is None or duration <= 0:
-            raise ValueError("Duration must be a positive number")
-        if duration > 480:  # 8 hours max
-            raise ValueError("Duration cannot exceed 480 minutes (8 hours)")
-        return duration
+    workout_exercises = db.relationship('WorkoutExercise', back_populates='workout', cascade='all, delete-orphan', passive_deletes=True)
+    exercises = db.relationship('Exercise', secondary='workout_exercises', back_populates='workouts', viewonly=True)
     
-    @validates('notes')
-    def validate_notes(self, key, notes):
-        if notes and len(notes) > 500:
-            raise ValueError("Notes cannot exceed 500 characters")
-        return notes
+    # Model validations (skipped by rules.build_trusted())
+    validate_duration = model_validator(WORKOUT_RULES, 'duration_minutes')
+    validate_notes = model_validator(WORKOUT_RULES, 'notes')
     
     def __repr__(self):
         return f'<Workout {self.id} on {self.date}>'
@@ -81,20 +105,129 @@ class WorkoutExercise(db.Model):
     __tablename__ = 'workout_exercises'
     
     id = db.Column(db.Integer, primary_key=True)
-    workout_id = db.Column(db.Integer, db.ForeignKey('workouts.id'), nullable=False)
-    exercise_id = db.Column(db.Integer, db.ForeignKey('exercises.id'), nullable=False)
+    workout_id = db.Column(db.Integer, db.ForeignKey('workouts.id', ondelete='CASCADE'), nullable=False)
+    exercise_id = db.Column(db.Integer, db.ForeignKey('exercises.id', ondelete='CASCADE'), nullable=False)
     reps = db.Column(db.Integer)
     sets = db.Column(db.Integer)
     duration_seconds = db.Column(db.Integer)
     
     # Relationships
-    workout = db.relationship('Workout', back_populates='workout_exercises', overlaps="exercises,workouts")
-    exercise = db.relationship('Exercise', back_populates='workout_exercises', overlaps="exercises,workouts")
+    workout = db.relationship('Workout', back_populates='workout_exercises')
+    exercise = db.relationship('Exercise', back_populates='workout_exercises')
     
     # Ensure unique workout-exercise combinations
     __table_args__ = (
         db.UniqueConstraint('workout_id', 'exercise_id', name='unique_workout_exercise'),
+        # The unique constraint serves lookups by workout; this one serves
+        # lookups (and cascaded deletes) by exercise
+        db.Index('ix_workout_exercises_exercise_id_workout_id', 'exercise_id', 'workout_id'),
     )
     
     def __repr__(self):
-        return f'<WorkoutExercise workout:{self.workout_id} exercise:{self.exercise_id}>'
\ No newline at end of file
+        return f'<WorkoutExercise workout:{self.workout_id} exercise:{self.exercise_id}>'
+
+class ExerciseVolume(db.Model):
+    """Daily training volume per exercise, kept up to date as workouts change.
+
+    Lets the stats endpoints read one row per day and exercise instead of
+    scanning every WorkoutExercise. workout_minutes is the length of the
+    workouts the exercise appeared in.
+    """
+    __tablename__ = 'exercise_volume'
+    __table_args__ = (
+        # Per-exercise stats over a date range, and cascaded exercise deletes
+        db.Index('ix_exercise_volume_exercise_id_day', 'exercise_id', 'day'),
+    )
+
+    day = db.Column(db.Date, primary_key=True)
+    exercise_id = db.Column(db.Integer, db.ForeignKey('exercises.id', ondelete='CASCADE'), primary_key=True)
+    workout_count = db.Column(db.Integer, nullable=False, default=0)
+    total_sets = db.Column(db.Integer, nullable=False, default=0)
+    total_reps = db.Column(db.Integer, nullable=False, default=0)
+    total_duration_seconds = db.Column(db.Integer, nullable=False, default=0)
+    workout_minutes = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ExerciseVolume {self.day} exercise:{self.exercise_id}>'
+
+
+class ExercisePair(db.Model):
+    """How many workouts each pair of exercises appears in together, kept up to date as workouts change.
+
+    Both orders of a pair are stored, so an exercise's partners are one
+    index range. The diagonal (related_id == exercise_id) is the number of
+    workouts the exercise appears in at all, the largest count in its range.
+    """
+    __tablename__ = 'exercise_pairs'
+    __table_args__ = (
+        # An exercise's most frequent partners, read from the index alone
+        db.Index('ix_exercise_pairs_exercise_id_workout_count', 'exercise_id', 'workout_count', 'related_id'),
+        # Cascaded deletes of the related exercise
+        db.Index('ix_exercise_pairs_related_id', 'related_id'),
+    )
+
+    exercise_id = db.Column(db.Integer, db.ForeignKey('exercises.id', ondelete='CASCADE'), primary_key=True)
+    related_id = db.Column(db.Integer, db.ForeignKey('exercises.id', ondelete='CASCADE'), primary_key=True)
+    workout_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ExercisePair exercise:{self.exercise_id} related:{self.related_id} x{self.workout_count}>'
+
+
+class PersonalRecord(db.Model):
+    """Each exercise's best set per metric (records.PR_METRICS), kept up to date as workouts change.
+
+    Deleting the workout a record came from deletes the record; records.py
+    recomputes it from the remaining history.
+    """
+    __tablename__ = 'personal_records'
+
+    exercise_id = db.Column(db.Integer, db.ForeignKey('exercises.id', ondelete='CASCADE'), primary_key=True)
+    metric = db.Column(db.String(20), primary_key=True)
+    value = db.Column(db.Integer, nullable=False)
+    workout_id = db.Column(db.Integer, db.ForeignKey('workouts.id', ondelete='CASCADE'), nullable=False, index=True)
+    day = db.Column(db.Date, nullable=False)
+    reps = db.Column(db.Integer)
+    sets = db.Column(db.Integer)
+    duration_seconds = db.Column(db.Integer)
+
+    def __repr__(self):
+        return f'<PersonalRecord exercise:{self.exercise_id} {self.metric}={self.value}>'
+
+
+class WorkoutArchive(db.Model):
+    """Workouts moved out of the live tables by the archive job (archive.py).
+
+    SQLite hands a deleted workout's id to the next new workout, so one
+    workout_id can be archived more than once; rows get their own id.
+    """
+    __tablename__ = 'workouts_archive'
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    workout_id = db.Column(db.Integer, nullable=False, index=True)
+    date = db.Column(db.Date, nullable=False, index=True)
+    duration_minutes = db.Column(db.Integer, nullable=False)
+    notes = db.Column(db.Text)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<WorkoutArchive {self.id} of workout {self.workout_id} on {self.date}>'
+
+
+class WorkoutExerciseArchive(db.Model):
+    """WorkoutExercises of archived workouts. exercise_id is kept as a plain
+    value so exercises can still be deleted after their workouts are archived."""
+    __tablename__ = 'workout_exercises_archive'
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    id = db.Column(db.Integer, primary_key=True)
+    workout_exercise_id = db.Column(db.Integer, nullable=False)
+    workout_archive_id = db.Column(db.Integer, db.ForeignKey('workouts_archive.id', ondelete='CASCADE'), nullable=False, index=True)
+    exercise_id = db.Column(db.Integer, nullable=False)
+    reps = db.Column(db.Integer)
+    sets = db.Column(db.Integer)
+    duration_seconds = db.Column(db.Integer)
+
+    def __repr__(self):
+        return f'<WorkoutExerciseArchive archive:{self.workout_archive_id} exercise:{self.exercise_id}>'
@@ -0,0 +1,66 @@
+import base64
+import json
+from datetime import date
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def parse_limit(value):
+    """Parse the ?limit= query parameter, capped at MAX_PAGE_SIZE"""
+    if value is None:
+        return DEFAULT_PAGE_SIZE
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be an integer")
+    if limit < 1:
+        raise ValueError("limit must be a positive number")
+    return min(limit, MAX_PAGE_SIZE)
+
+def parse_int(value, name):
+    """Parse an optional integer query parameter"""
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+
+def parse_date(value, name):
+    """Parse an optional YYYY-MM-DD query parameter"""
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a date in YYYY-MM-DD format")
+
+def encode_cursor(*values):
+    """Encode the sort key of the last row on a page into an opaque cursor"""
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor, size):
+    """Decode a cursor produced by encode_cursor into its sort key values"""
+    if cursor is None:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+def paginate(query, limit, execute=None):
+    """Fetch one page from a keyset-ordered query.
+
+    Reads limit + 1 rows so we know whether another page exists without
+    a separate COUNT query. query is an ORM Query, or a select() when an
+    execute function (such as db.session.execute) is given. Returns
+    (rows, has_more).
+    """
+    query = query.limit(limit + 1)
+    rows = execute(query).all() if execute else query.all()
+    return rows[:limit], len(rows) > limit
@@ -0,0 +1,138 @@
+"""SELECT statements for the read endpoints.
+
+Shared by the Flask views in app.py and the async views in async_app.py,
+so both serving modes run exactly the same SQL.
+"""
+from sqlalchemy import select, tuple_
+
+from models import Exercise, Workout, WorkoutExercise
+from pagination import parse_limit, parse_date, decode_cursor
+from serializers import EXERCISE_COLUMNS, WORKOUT_COLUMNS, LINK_COLUMNS
+
+# ?fields= names and the columns they select; ?include= names of embedded collections
+WORKOUT_FIELDS = {column.key: column for column in WORKOUT_COLUMNS}
+EXERCISE_FIELDS = {column.key: column for column in EXERCISE_COLUMNS}
+WORKOUT_INCLUDES = ('exercises', 'workout_exercises')
+EXERCISE_INCLUDES = ('workouts',)
+
+def _names(value, allowed, param):
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in allowed]
+    if unknown and not allowed:
+        raise ValueError(f"{param} is not supported here")
+    if unknown:
+        raise ValueError(f"Unknown {param}: {', '.join(unknown)} (expected any of: {', '.join(allowed)})")
+    return tuple(dict.fromkeys(names))
+
+def parse_fieldset(args, fields, includes):
+    """?fields= and ?include= as (fields, includes); raises ValueError with a client-facing message.
+
+    (None, None) when neither is given, meaning the full body. Otherwise
+    fields defaults to every field and includes to none, so embedded
+    collections are only queried and built when asked for.
+    """
+    if args.get('fields') is None and args.get('include') is None:
+        return None, None
+    selected = tuple(fields)
+    if args.get('fields') is not None:
+        selected = _names(args['fields'], fields, 'fields')
+        if not selected:
+            raise ValueError("fields cannot be empty")
+    return selected, _names(args.get('include', ''), includes, 'include')
+
+def _columns(available, fields, required=('id',)):
+    """The columns of the requested fields, plus those the view needs (ids, cursors)"""
+    return [column for name, column in available.items() if name in fields or name in required]
+
+def parse_workout_list_args(args):
+    """Validate GET /workouts query params; raises ValueError with a client-facing message"""
+    try:
+        cursor = decode_cursor(args.get('cursor'), 2)
+        if cursor:
+            cursor = (parse_date(cursor[0], 'cursor'), int(cursor[1]))
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+    category = args.get('category')
+    fields, include = parse_fieldset(args, WORKOUT_FIELDS, WORKOUT_INCLUDES)
+    return {
+        'limit': parse_limit(args.get('limit')),
+        'start_date': parse_date(args.get('start_date'), 'start_date'),
+        'end_date': parse_date(args.get('end_date'), 'end_date'),
+        'category': category.lower() if category else None,
+        'cursor': cursor,
+        'fields': fields,
+        'include': include,
+    }
+
+def parse_exercise_list_args(args):
+    """Validate GET /exercises query params; raises ValueError with a client-facing message"""
+    try:
+        cursor = decode_cursor(args.get('cursor'), 1)
+        if cursor:
+            cursor = int(cursor[0])
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+    category = args.get('category')
+    fields, _ = parse_fieldset(args, EXERCISE_FIELDS, ())
+    return {
+        'limit': parse_limit(args.get('limit')),
+        'category': category.lower() if category else None,
+        'cursor': cursor,
+        'fields': fields,
+    }
+
+def workouts_page_query(start_date=None, end_date=None, category=None, cursor=None, fields=None, **_):
+    """Workouts newest first, after the (date, id) cursor; apply the limit with paginate()"""
+    query = select(*(WORKOUT_COLUMNS if fields is None else _columns(WORKOUT_FIELDS, fields, ('id', 'date'))))
+    if start_date:
+        query = query.where(Workout.date >= start_date)
+    if end_date:
+        query = query.where(Workout.date <= end_date)
+    if category:
+        query = query.where(Workout.workout_exercises.any(
+            WorkoutExercise.exercise.has(Exercise.category == category)
+        ))
+    if cursor:
+        query = query.where(tuple_(Workout.date, Workout.id) < cursor)
+    return query.order_by(Workout.date.desc(), Workout.id.desc())
+
+def exercises_page_query(category=None, cursor=None, fields=None, **_):
+    """Exercises by id, after the id cursor; apply the limit with paginate()"""
+    query = select(*(EXERCISE_COLUMNS if fields is None else _columns(EXERCISE_FIELDS, fields)))
+    if category:
+        query = query.where(Exercise.category == category)
+    if cursor:
+        query = query.where(Exercise.id > cursor)
+    return query.order_by(Exercise.id)
+
+def workout_query(id, fields=None):
+    """The workout's WORKOUT_COLUMNS (or ?fields= columns), then its version and updated_at for the validator headers"""
+    columns = WORKOUT_COLUMNS if fields is None else _columns(WORKOUT_FIELDS, fields)
+    return select(*columns, Workout.version, Workout.updated_at).where(Workout.id == id)
+
+def exercise_query(id, fields=None):
+    return select(*(EXERCISE_COLUMNS if fields is None else _columns(EXERCISE_FIELDS, fields))).where(Exercise.id == id)
+
+def workout_links_query(workout_ids):
+    """Every WorkoutExercise (joined to its exercise) of the given workouts"""
+    return (
+        select(*LINK_COLUMNS)
+        .join(Exercise, Exercise.id == WorkoutExercise.exercise_id)
+        .where(WorkoutExercise.workout_id.in_(workout_ids))
+        .order_by(WorkoutExercise.id)
+    )
+
+def exercise_workouts_query(exercise_id):
+    """The workouts an exercise appears in"""
+    return (
+        select(*WORKOUT_COLUMNS)
+        .join(WorkoutExercise, WorkoutExercise.workout_id == Workout.id)
+        .where(WorkoutExercise.exercise_id == exercise_id)
+        .order_by(WorkoutExercise.id)
+    )
+
+def workout_cursor(row):
+    return (row.date.isoformat(), row.id)
+
+def exercise_cursor(row):
+    return (row.id,)
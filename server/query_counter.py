@@ -0,0 +1,100 @@
+from contextlib import contextmanager
+
+from flask import has_app_context
+from sqlalchemy import event
+
+from models import db, Exercise, Workout
+from search import search_terms
+
+# Maximum SQL statements each read endpoint may issue. These must not grow
+# with the number of rows returned; a higher count means an N+1 regression.
+QUERY_BUDGETS = {
+    '/workouts': 2,
+    '/workouts?fields=id,date': 1,
+    '/workouts/<id>': 2,
+    '/exercises': 1,
+    '/exercises/<id>': 2,
+    '/exercises/<id>/progression': 3,
+    '/exercises/<id>/related': 2,
+    '/workouts/<id>/suggestions': 2,
+    '/search': 2,
+}
+
+class QueryCounter:
+    """Collects every statement sent to the database while attached to an engine"""
+
+    def __init__(self):
+        self.statements = []
+        self.parameters = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+        self.parameters.append(None if executemany else parameters)
+
+@contextmanager
+def count_queries(engine):
+    """Count the statements executed on engine inside the with block"""
+    counter = QueryCounter()
+    event.listen(engine, 'before_cursor_execute', counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter)
+
+def budget_urls(app):
+    """The URL requested for each QUERY_BUDGETS route, or None when there is no row to request"""
+    with app.app_context():
+        workout = Workout.query.first()
+        exercise = Exercise.query.first()
+        terms = search_terms(workout.notes or '') if workout else []
+    return {
+        '/workouts': '/workouts',
+        '/workouts?fields=id,date': '/workouts?fields=id,date',
+        '/workouts/<id>': f'/workouts/{workout.id}' if workout else None,
+        '/exercises': '/exercises',
+        '/exercises/<id>': f'/exercises/{exercise.id}' if exercise else None,
+        '/exercises/<id>/progression': f'/exercises/{exercise.id}/progression' if exercise else None,
+        '/exercises/<id>/related': f'/exercises/{exercise.id}/related' if exercise else None,
+        '/workouts/<id>/suggestions': f'/workouts/{workout.id}/suggestions' if workout else None,
+        '/search': f'/search?q={terms[0]}' if terms else None,
+    }
+
+def count_request_queries(app, url):
+    """The QueryCounter of one GET of url"""
+    with app.app_context():
+        engine = db.engine
+    if has_app_context():
+        # The CLI shares one app context (and session) across requests, so
+        # start every request from an empty identity map
+        db.session.remove()
+    with count_queries(engine) as counter:
+        app.test_client().get(url).get_data()
+    return counter
+
+def check_query_budgets(app):
+    """Request each read endpoint and compare its statement count to QUERY_BUDGETS.
+
+    Runs against whatever data is in the configured database, so seed it with
+    several workouts and exercises first. Returns True when every endpoint is
+    within budget. tests/test_query_budgets.py runs the same check on a
+    seeded fixture database.
+    """
+    urls = budget_urls(app)
+    ok = True
+    for route, budget in QUERY_BUDGETS.items():
+        url = urls[route]
+        if url is None:
+            print(f"SKIP {route}: no rows to request")
+            continue
+        counter = count_request_queries(app, url)
+        status = 'ok' if counter.count <= budget else 'OVER BUDGET'
+        print(f"{route}: {counter.count} statements (budget {budget}) {status}")
+        if counter.count > budget:
+            ok = False
+            for statement in counter.statements:
+                print(f"    {statement}")
+    return ok
@@ -0,0 +1,117 @@
+"""Query-plan check: EXPLAIN every statement the read endpoints issue and
+report full table scans.
+
+Plans depend on table sizes and statistics, so run it against realistic
+data (seed.py --scale 100000) rather than the sample seed.
+"""
+import re
+from datetime import date, timedelta
+
+from flask import has_app_context
+
+from models import db, Exercise, Workout
+from query_counter import count_queries
+from search import search_terms
+
+# SQLite: "SCAN workouts" or "SCAN workouts USING INDEX ..." read the
+# whole table or index; "SEARCH ..." seeks to the rows it needs
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?(?: USING (?:COVERING )?INDEX \w+)?$')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+def plan_urls(workout, exercise):
+    """The requests to check; every workout query is time-bounded, as clients send them"""
+    today = date.today()
+    week_ago = (today - timedelta(days=7)).isoformat()
+    month_ago = (today - timedelta(days=30)).isoformat()
+    urls = [
+        '/workouts',
+        f'/workouts?start_date={week_ago}',
+        f'/workouts?start_date={month_ago}&end_date={today.isoformat()}',
+        f'/workouts?start_date={month_ago}&category=strength',
+        f'/workouts/export?start_date={week_ago}',
+        '/exercises',
+        '/exercises?category=strength',
+        f'/stats/volume?start_date={month_ago}',
+        f'/stats/volume?start_date={month_ago}&group_by=category&category=strength',
+    ]
+    if workout:
+        urls.append(f'/workouts/{workout.id}')
+        urls.append(f'/workouts/{workout.id}/suggestions')
+        terms = search_terms(workout.notes or '')
+        if terms:
+            urls.append(f'/search?q={terms[0]}')
+    if exercise:
+        urls += [
+            f'/exercises/{exercise.id}',
+            f'/exercises/{exercise.id}/progression?start_date={month_ago}',
+            f'/exercises/{exercise.id}/related',
+            f'/stats/volume?start_date={month_ago}&exercise_id={exercise.id}',
+            f'/search?q={search_terms(exercise.name)[0]}&type=exercises',
+        ]
+    return urls
+
+def explain(connection, statement, parameters):
+    """The plan of one statement as a list of text lines"""
+    if connection.dialect.name == 'postgresql':
+        return [row[0] for row in connection.exec_driver_sql('EXPLAIN ' + statement, parameters)]
+    return [row[3] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)]
+
+def full_scans(dialect, statement, plan):
+    """Tables the plan reads in full.
+
+    A scan that returns rows already in the requested order and is cut
+    off by a LIMIT only reads as far as the page it returns, so it does
+    not count.
+    """
+    text = '\n'.join(plan)
+    if dialect == 'postgresql':
+        stops_early = plan[0].lstrip().startswith('Limit') and 'Sort' not in text
+        return [] if stops_early else POSTGRES_SCAN.findall(text)
+    scans = [match.group(1) for match in map(SQLITE_SCAN.match, plan) if match]
+    stops_early = ' LIMIT ' in f' {statement.upper()} ' and 'USE TEMP B-TREE' not in text
+    return [] if stops_early else scans
+
+def plan_problems(app, url):
+    """GET url and EXPLAIN its SELECTs; returns [(statement, plan, scanned tables)] for those scanning a whole table"""
+    with app.app_context():
+        engine = db.engine
+    if has_app_context():
+        # The CLI shares one app context (and session) across requests
+        db.session.remove()
+    with count_queries(engine) as counter:
+        app.test_client().get(url).get_data()
+
+    problems = []
+    with engine.connect() as connection:
+        for statement, parameters in zip(counter.statements, counter.parameters):
+            if parameters is None or not statement.lstrip().upper().startswith('SELECT'):
+                continue
+            plan = explain(connection, statement, parameters)
+            scans = full_scans(connection.dialect.name, statement, plan)
+            if scans:
+                problems.append((statement, plan, scans))
+    return problems
+
+def endpoint_urls(app):
+    """plan_urls() for the newest workout and the first exercise"""
+    with app.app_context():
+        workout = Workout.query.order_by(Workout.date.desc()).first()
+        exercise = Exercise.query.first()
+        return plan_urls(workout, exercise)
+
+def check_query_plans(app):
+    """Request each endpoint and EXPLAIN its statements; returns True if none scans a whole table.
+
+    tests/test_query_plans.py runs the same check on a seeded fixture database.
+    """
+    ok = True
+    for url in endpoint_urls(app):
+        problems = plan_problems(app, url)
+        tables = {table for _, _, scans in problems for table in scans}
+        print(f"{url}: {'FULL SCAN of ' + ', '.join(sorted(tables)) if tables else 'ok'}")
+        for statement, plan, _ in problems:
+            ok = False
+            print(f"    {' '.join(statement.split())}")
+            for line in plan:
+                print(f"      {line}")
+    return ok
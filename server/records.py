@@ -0,0 +1,197 @@
+"""Personal records and per-exercise progression.
+
+personal_records holds each exercise's best set for every metric in
+PR_METRICS. New WorkoutExercises only ever raise a record, so writes
+update the table with a conditional upsert and never look at history.
+Deleting the workout a record came from cascades the record away, and
+refresh_personal_records recomputes just the affected exercises.
+
+The progression time series is read from the exercise_volume rollup, one
+row per training day. Its rolling averages use prefix sums, so each
+point costs the same however long the window or history is.
+"""
+from bisect import bisect_left
+from datetime import timedelta
+from itertools import accumulate
+
+from sqlalchemy import delete, func, literal, select, union_all
+
+from models import db, upsert, ExerciseVolume, PersonalRecord, Workout, WorkoutExercise
+
+def _sets(sets):
+    return sets or 1
+
+# metric -> value of one WorkoutExercise, from its (sets, reps, duration_seconds)
+PR_METRICS = {
+    'max_reps': lambda sets, reps, duration_seconds: reps,
+    'max_volume': lambda sets, reps, duration_seconds: reps and _sets(sets) * reps,
+    'max_duration': lambda sets, reps, duration_seconds: duration_seconds and _sets(sets) * duration_seconds,
+}
+
+# The same metrics as SQL expressions, for rebuilding from history
+def _metric_columns():
+    sets = func.coalesce(WorkoutExercise.sets, 1)
+    return {
+        'max_reps': WorkoutExercise.reps,
+        'max_volume': sets * WorkoutExercise.reps,
+        'max_duration': sets * WorkoutExercise.duration_seconds,
+    }
+
+RECORD_FIELDS = ('value', 'workout_id', 'day', 'reps', 'sets', 'duration_seconds')
+
+def estimated_1rm(reps):
+    """Epley estimate of the one-rep max, as a multiple of the load lifted for `reps` reps.
+
+    Workouts record reps but no weight, so the estimate is relative: 1.33
+    means the one-rep max is about 1.33 times the working weight.
+    """
+    if not reps:
+        return None
+    return round(1 + reps / 30, 3)
+
+def _upsert_records(rows):
+    """Insert records, replacing an existing one only when the new value is higher"""
+    upsert(
+        PersonalRecord, rows,
+        index_elements=['exercise_id', 'metric'],
+        set_=lambda excluded: {field: getattr(excluded, field) for field in RECORD_FIELDS},
+        where=lambda excluded: excluded.value > PersonalRecord.value,
+    )
+
+def record_personal_records(entries):
+    """Raise records for new workout exercises, within the caller's transaction.
+
+    entries: iterable of (day, exercise_id, workout_id, sets, reps, duration_seconds).
+    """
+    best = {}
+    for day, exercise_id, workout_id, sets, reps, duration_seconds in entries:
+        for metric, value_of in PR_METRICS.items():
+            value = value_of(sets, reps, duration_seconds)
+            current = best.get((exercise_id, metric))
+            # Ties go to the earlier workout, as in _insert_best_from_history
+            if value and (current is None or value > current['value']
+                          or (value == current['value'] and (day, workout_id) < (current['day'], current['workout_id']))):
+                best[(exercise_id, metric)] = {
+                    'exercise_id': exercise_id, 'metric': metric, 'value': value, 'workout_id': workout_id,
+                    'day': day, 'reps': reps, 'sets': sets, 'duration_seconds': duration_seconds,
+                }
+    if best:
+        _upsert_records(list(best.values()))
+
+def _insert_best_from_history(exercise_ids=None):
+    """INSERT ... SELECT every exercise's best set per metric (all exercises when exercise_ids is None)"""
+    ranked = []
+    for metric, value in _metric_columns().items():
+        stmt = (
+            select(
+                WorkoutExercise.exercise_id, literal(metric).label('metric'), value.label('value'),
+                Workout.id.label('workout_id'), Workout.date.label('day'),
+                WorkoutExercise.reps, WorkoutExercise.sets, WorkoutExercise.duration_seconds,
+                func.row_number().over(
+                    partition_by=WorkoutExercise.exercise_id,
+                    order_by=(value.desc(), Workout.date, Workout.id),
+                ).label('position'),
+            )
+            .join(Workout, Workout.id == WorkoutExercise.workout_id)
+            .where(value > 0)
+        )
+        if exercise_ids is not None:
+            stmt = stmt.where(WorkoutExercise.exercise_id.in_(exercise_ids))
+        ranked.append(stmt)
+    ranked = union_all(*ranked).subquery()
+    columns = ['exercise_id', 'metric', *RECORD_FIELDS]
+    db.session.execute(PersonalRecord.__table__.insert().from_select(
+        columns, select(*(ranked.c[name] for name in columns)).where(ranked.c.position == 1)
+    ))
+
+def records_from_workouts(workout_ids):
+    """Exercises holding a record set in one of these workouts; refresh them after deleting the workouts"""
+    return db.session.scalars(
+        select(PersonalRecord.exercise_id.distinct()).where(PersonalRecord.workout_id.in_(workout_ids))
+    ).all()
+
+def refresh_personal_records(exercise_ids):
+    """Recompute the records of the given exercises from their history"""
+    exercise_ids = list(exercise_ids)
+    if not exercise_ids:
+        return
+    db.session.execute(delete(PersonalRecord).where(PersonalRecord.exercise_id.in_(exercise_ids)))
+    _insert_best_from_history(exercise_ids)
+
+def rebuild_personal_records():
+    """Recompute every record from all workout history"""
+    db.session.execute(delete(PersonalRecord))
+    _insert_best_from_history()
+
+def _rolling_mean(ordinals, values, window):
+    """Mean of values over the training days in the trailing `window` days ending at each point"""
+    prefix = list(accumulate(values, initial=0))
+    return [
+        (prefix[i + 1] - prefix[start]) / (i + 1 - start)
+        for i, start in enumerate(bisect_left(ordinals, ordinal - window + 1) for ordinal in ordinals)
+    ]
+
+def _rolling_ratio(ordinals, numerators, denominators, window):
+    """sum(numerators) / sum(denominators) over the trailing `window` days ending at each point"""
+    top = list(accumulate(numerators, initial=0))
+    bottom = list(accumulate(denominators, initial=0))
+    ratios = []
+    for i, ordinal in enumerate(ordinals):
+        start = bisect_left(ordinals, ordinal - window + 1)
+        total = bottom[i + 1] - bottom[start]
+        ratios.append((top[i + 1] - top[start]) / total if total else 0)
+    return ratios
+
+def progression(exercise_id, start_date=None, end_date=None, window=28):
+    """Personal records plus a daily series with `window`-day rolling averages"""
+    records = {
+        record.metric: {
+            'value': record.value,
+            'day': record.day.isoformat(),
+            'workout_id': record.workout_id,
+            'reps': record.reps,
+            'sets': record.sets,
+            'duration_seconds': record.duration_seconds,
+        }
+        for record in db.session.scalars(select(PersonalRecord).where(PersonalRecord.exercise_id == exercise_id))
+    }
+    if 'max_reps' in records:
+        records['estimated_1rm'] = dict(records['max_reps'], value=estimated_1rm(records['max_reps']['value']))
+
+    # Read a window's worth of days before start_date so its first averages are complete
+    stmt = (
+        select(ExerciseVolume.day, ExerciseVolume.workout_count, ExerciseVolume.total_sets,
+               ExerciseVolume.total_reps, ExerciseVolume.total_duration_seconds)
+        .where(ExerciseVolume.exercise_id == exercise_id)
+        .order_by(ExerciseVolume.day)
+    )
+    if start_date:
+        stmt = stmt.where(ExerciseVolume.day > start_date - timedelta(days=window))
+    if end_date:
+        stmt = stmt.where(ExerciseVolume.day <= end_date)
+    rows = db.session.execute(stmt).all()
+    if not rows:
+        return {'personal_records': records, 'series': []}
+
+    days, workouts, sets, reps, durations = zip(*rows)
+    ordinals = [day.toordinal() for day in days]
+    rolling_reps = _rolling_mean(ordinals, reps, window)
+    rolling_durations = _rolling_mean(ordinals, durations, window)
+    rolling_reps_per_set = _rolling_ratio(ordinals, reps, sets, window)
+
+    first = bisect_left(ordinals, start_date.toordinal()) if start_date else 0
+    series = [
+        {
+            'day': days[i].isoformat(),
+            'workouts': workouts[i],
+            'sets': sets[i],
+            'reps': reps[i],
+            'duration_seconds': durations[i],
+            'estimated_1rm': estimated_1rm(reps[i] / sets[i] if sets[i] else 0),
+            'rolling_reps': round(rolling_reps[i], 2),
+            'rolling_duration_seconds': round(rolling_durations[i], 2),
+            'rolling_estimated_1rm': estimated_1rm(rolling_reps_per_set[i]),
+        }
+        for i in range(first, len(rows))
+    ]
+    return {'personal_records': records, 'series': series}
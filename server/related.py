@@ -0,0 +1,150 @@
+"""Exercise co-occurrence: related exercises and workout suggestions.
+
+exercise_pairs is a sparse, symmetric co-occurrence matrix over
+workout_exercises: one row per ordered pair of exercises that share a
+workout, counting those workouts. Writes apply just the pairs they add or
+remove, in the same transaction, so the matrix never needs a rebuild.
+
+An exercise's partners are one range of the (exercise_id, workout_count,
+related_id) index, so the top k are its last k entries, read without
+touching the table. The diagonal count, the number of workouts the
+exercise is in, is the largest in the range, which makes it the first
+row read and gives each partner's confidence, P(partner | exercise).
+"""
+from collections import Counter, defaultdict
+
+from sqlalchemy import delete, func, select, union_all
+from sqlalchemy.orm import aliased
+
+from models import db, upsert, Exercise, ExercisePair, Workout, WorkoutExercise
+from serializers import EXERCISE_COLUMNS, exercises_from_rows
+
+# Partners read per exercise of a workout when ranking suggestions
+SUGGESTION_CANDIDATES = 50
+# Exercises of a workout that suggestions are based on, most recently added first
+SUGGESTION_MAX_SEEDS = 50
+
+def record_pairs(workouts, sign=1):
+    """Apply workouts' exercise pairs to exercise_pairs, within the caller's transaction.
+
+    workouts: iterable of (exercise_ids, new_exercise_ids), one per workout:
+    every exercise now in it and the ones just added; only pairs with a new
+    exercise are counted. For deleted workouts pass every exercise as new,
+    with sign=-1.
+    """
+    counts = Counter()
+    for exercise_ids, new_exercise_ids in workouts:
+        exercise_ids, new_exercise_ids = set(exercise_ids), set(new_exercise_ids)
+        for new_id in new_exercise_ids:
+            for exercise_id in exercise_ids:
+                counts[(new_id, exercise_id)] += sign
+                if exercise_id not in new_exercise_ids:
+                    counts[(exercise_id, new_id)] += sign
+    if not counts:
+        return
+
+    # Add each row's workout_count onto the existing pair, creating it if needed
+    upsert(
+        ExercisePair,
+        [{'exercise_id': exercise_id, 'related_id': related_id, 'workout_count': count}
+         for (exercise_id, related_id), count in counts.items()],
+        index_elements=['exercise_id', 'related_id'],
+        set_=lambda excluded: {'workout_count': ExercisePair.workout_count + excluded.workout_count},
+    )
+    if sign < 0:
+        db.session.execute(delete(ExercisePair).where(
+            ExercisePair.exercise_id.in_({exercise_id for exercise_id, _ in counts}),
+            ExercisePair.workout_count <= 0,
+        ))
+
+def workout_pair_entries(workout_ids):
+    """record_pairs() entries for the given workouts' exercises, all counted as new"""
+    exercises = defaultdict(list)
+    for workout_id, exercise_id in db.session.execute(
+        select(WorkoutExercise.workout_id, WorkoutExercise.exercise_id).where(WorkoutExercise.workout_id.in_(workout_ids))
+    ):
+        exercises[workout_id].append(exercise_id)
+    return [(ids, ids) for ids in exercises.values()]
+
+def rebuild_pairs():
+    """Recompute the whole matrix from workout_exercises with one self-join"""
+    other = aliased(WorkoutExercise)
+    db.session.execute(delete(ExercisePair))
+    db.session.execute(ExercisePair.__table__.insert().from_select(
+        ['exercise_id', 'related_id', 'workout_count'],
+        select(WorkoutExercise.exercise_id, other.exercise_id, func.count())
+        .join(other, other.workout_id == WorkoutExercise.workout_id)
+        .group_by(WorkoutExercise.exercise_id, other.exercise_id)
+    ))
+
+def _partners_query(exercise_id, limit):
+    """The `limit` pairs of an exercise with the highest counts (its diagonal first), with the partner's columns"""
+    return (
+        select(ExercisePair.exercise_id, ExercisePair.workout_count, *EXERCISE_COLUMNS)
+        .join(Exercise, Exercise.id == ExercisePair.related_id)
+        .where(ExercisePair.exercise_id == exercise_id)
+        .order_by(ExercisePair.workout_count.desc(), ExercisePair.related_id.desc())
+        .limit(limit)
+    )
+
+def related_exercises(exercise_id, limit=10):
+    """The exercises most often in the same workouts as this one.
+
+    confidence is the share of this exercise's workouts that include the
+    related exercise too.
+    """
+    # One more row than asked for, since the exercise itself comes back too
+    rows = db.session.execute(_partners_query(exercise_id, limit + 1)).all()
+    workout_count = rows[0].workout_count if rows else 0
+    related = [
+        {
+            'exercise': exercise,
+            'workouts_together': row.workout_count,
+            'confidence': round(row.workout_count / workout_count, 4),
+        }
+        for row, exercise in zip(rows, exercises_from_rows([row[2:] for row in rows]))
+        if exercise['id'] != exercise_id
+    ]
+    return {'workout_count': workout_count, 'related': related[:limit]}
+
+def suggested_exercises(workout_id, limit=10):
+    """Exercises to add to a workout, or None if there is no such workout.
+
+    Each exercise's score is the sum, over the workout's exercises, of its
+    confidence given that exercise: how often it is trained alongside what
+    the workout already has. Candidates are the SUGGESTION_CANDIDATES top
+    partners of each of the workout's SUGGESTION_MAX_SEEDS newest exercises.
+    """
+    members = db.session.execute(
+        select(Workout.id, WorkoutExercise.exercise_id)
+        .outerjoin(WorkoutExercise, WorkoutExercise.workout_id == Workout.id)
+        .where(Workout.id == workout_id)
+        .order_by(WorkoutExercise.id.desc())
+    ).all()
+    if not members:
+        return None
+    exercise_ids = [exercise_id for _, exercise_id in members if exercise_id is not None]
+    if not exercise_ids:
+        return []
+
+    partners = [_partners_query(id, SUGGESTION_CANDIDATES + 1).subquery() for id in exercise_ids[:SUGGESTION_MAX_SEEDS]]
+    rows = db.session.execute(union_all(*(select(partner) for partner in partners))).all()
+
+    # Each seed's diagonal is its largest count
+    seed_counts = defaultdict(int)
+    for row in rows:
+        seed_counts[row.exercise_id] = max(seed_counts[row.exercise_id], row.workout_count)
+    in_workout = set(exercise_ids)
+    scores = defaultdict(float)
+    exercises = {}
+    for row in rows:
+        related_id = row[2]
+        if related_id not in in_workout:
+            scores[related_id] += row.workout_count / seed_counts[row.exercise_id]
+            exercises[related_id] = row[2:]
+
+    ranked = sorted(scores, key=lambda id: (-scores[id], id))[:limit]
+    return [
+        {'exercise': exercise, 'score': round(scores[exercise['id']], 4)}
+        for exercise in exercises_from_rows([exercises[id] for id in ranked])
+    ]
@@ -0,0 +1,176 @@
+"""Read replicas: send the read views' queries to replica databases.
+
+REPLICA_DATABASE_URLS lists copies of the primary database
+(SQLALCHEMY_DATABASE_URI) kept up to date by the database's own
+replication. Views decorated with @replicas.reads run their SELECTs on a
+healthy replica, picked round-robin; every other statement, and every
+other view, uses the primary.
+
+- Read-your-writes: a successful POST, PUT, PATCH or DELETE sets a cookie
+  that sends that client's reads to the primary for REPLICA_STICKY_SECONDS,
+  longer than the replicas are expected to lag.
+- Health: when a replica is picked and its last check is older than
+  REPLICA_CHECK_INTERVAL, a background thread checks it with SELECT 1.
+  Requests go by the last known state meanwhile, so a slow or unreachable
+  replica never adds its connect time to a request. A replica whose query
+  fails is taken out until a check passes, and the request is retried on
+  the primary. With no healthy replica, reads go to the primary.
+- Response cache fills read the primary: a cached response is served to
+  every client until the next write, so it must not come from a replica
+  that has not seen that write yet.
+
+Locally, point REPLICA_DATABASE_URLS at copies of the SQLite file.
+"""
+import itertools
+import math
+import os
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_app_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
+
+from config import engine_options, set_sqlite_pragmas
+
+STICKY_COOKIE = 'read_primary_until'
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+class RoutingSession(Session):
+    """Session that runs SELECTs on the replica the current view was given, if any"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and getattr(clause, 'is_select', False) and has_app_context():
+            replica = g.get('read_replica')
+            if replica is not None:
+                return replica.engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class Replica:
+    def __init__(self, url, config, instance_path):
+        url = make_url(url)
+        # Relative SQLite paths resolve against the instance folder, as for the primary
+        if url.get_backend_name() == 'sqlite' and url.database and url.database != ':memory:' and not os.path.isabs(url.database):
+            url = url.set(database=os.path.join(instance_path, url.database))
+        self.url = url
+        self.engine = create_engine(url, **engine_options(dict(config, SQLALCHEMY_DATABASE_URI=str(url))))
+        if self.engine.dialect.name == 'sqlite':
+            event.listen(self.engine, 'connect', set_sqlite_pragmas(config))
+        self.healthy = True
+        self.checked_at = 0.0
+        self.checking = False
+
+    def check(self):
+        """SELECT 1 on the replica; returns whether it answered"""
+        try:
+            with self.engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+            self.healthy = True
+        except DBAPIError:
+            self.healthy = False
+        self.checked_at = time.monotonic()
+        return self.healthy
+
+    def mark_down(self):
+        self.healthy = False
+        self.checked_at = time.monotonic()
+
+
+class ReplicaPool:
+    """One app's replicas, with round-robin picking and health checks"""
+
+    def __init__(self, app):
+        config = app.config
+        self.replicas = [Replica(url, config, app.instance_path) for url in config['REPLICA_DATABASE_URLS']]
+        self.sticky_seconds = math.ceil(config['REPLICA_STICKY_SECONDS'])
+        self.check_interval = config['REPLICA_CHECK_INTERVAL']
+        self.after_fork()
+
+    def after_fork(self):
+        """Give a forked worker its own replica connections"""
+        self._lock = threading.Lock()
+        self._next = itertools.count()
+        for replica in self.replicas:
+            replica.engine.dispose(close=False)
+            # The parent's check threads do not exist here
+            replica.checking = False
+
+    def pick(self):
+        """A healthy replica for this request, or None to read from the primary"""
+        if g.get('response_cache_fill'):
+            return None
+        try:
+            if float(request.cookies.get(STICKY_COOKIE, 0)) > time.time():
+                return None
+        except ValueError:
+            pass
+        with self._lock:
+            start = next(self._next)
+        now = time.monotonic()
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if now - replica.checked_at >= self.check_interval:
+                self._check_in_background(replica)
+            if replica.healthy:
+                return replica
+        return None
+
+    def _check_in_background(self, replica):
+        with self._lock:
+            if replica.checking:
+                return
+            replica.checking = True
+        threading.Thread(target=self._check, args=(replica,), name='replica-check', daemon=True).start()
+
+    def _check(self, replica):
+        try:
+            replica.check()
+        finally:
+            replica.checking = False
+
+    def after_request(self, response):
+        if request.method in WRITE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                STICKY_COOKIE, f'{time.time() + self.sticky_seconds:.3f}',
+                max_age=self.sticky_seconds, httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class ReplicaRouter:
+    """Routes the @reads views to the app's ReplicaPool; see the module docstring"""
+
+    def __init__(self, app=None, db=None):
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        """Set up a ReplicaPool when REPLICA_DATABASE_URLS lists any replicas"""
+        self.db = db
+        if app.config['REPLICA_DATABASE_URLS']:
+            pool = app.extensions['replicas'] = ReplicaPool(app)
+            app.after_request(pool.after_request)
+
+    def reads(self, view):
+        """Decorator running a read-only view's SELECTs on a replica"""
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            pool = current_app.extensions.get('replicas')
+            g.read_replica = pool.pick() if pool else None
+            try:
+                return view(*args, **kwargs)
+            except DBAPIError as e:
+                replica = g.pop('read_replica', None)
+                if replica is None:
+                    raise
+                current_app.logger.warning("Replica %s failed, retrying on the primary: %s", replica.url, e.orig)
+                replica.mark_down()
+                self.db.session.rollback()
+                return view(*args, **kwargs)
+            finally:
+                g.pop('read_replica', None)
+        return wrapper
@@ -0,0 +1,171 @@
+"""Validation rules for every writable field, declared once.
+
+Each Rule has an optional normalizer, checks that every stored value must
+pass, and validators that only apply to API input. A check takes the
+normalized value and returns an error message, or None when it passes.
+Validators are marshmallow validators. From the same Rule:
+
+- models.py gets its SQLAlchemy @validates hooks (model_validator), which
+  normalize and run the checks on every write: API, seed, CLI and archive,
+- schemas.py gets marshmallow validators (Rule.schema_validator), which
+  run the request validators and then the checks.
+
+Data loaded by a schema has already passed these rules, so build_trusted()
+makes models from it without running the @validates hooks again.
+"""
+import re
+from datetime import date
+
+from marshmallow import ValidationError, validate
+from sqlalchemy import inspect
+from sqlalchemy.orm import configure_mappers, validates
+from sqlalchemy.orm.attributes import set_committed_value
+
+EXERCISE_CATEGORIES = ('strength', 'cardio', 'flexibility', 'sports')
+
+def build_trusted(model, rules, data):
+    """A new `model` from column values a schema has already loaded with `rules`.
+
+    Applies the rules' normalizers, as the @validates hooks would, but not
+    their checks. Values are set with set_committed_value(), which fires no
+    attribute events and so no @validates hooks; the flush still inserts
+    them. Relationships must be set normally.
+    """
+    configure_mappers()
+    instance = inspect(model).class_manager.new_instance()
+    for key, value in data.items():
+        rule = rules.get(key)
+        if rule is not None:
+            value = rule.normalized(value)
+        set_committed_value(instance, key, value)
+    return instance
+
+
+class Rule:
+    """One field's normalizer, checks and request validators. None always
+    passes; nullability is left to the schema fields and the columns."""
+
+    def __init__(self, *checks, validators=(), normalize=None):
+        self.checks = checks
+        self.validators = validators
+        self.normalize = normalize
+
+    def normalized(self, value):
+        if self.normalize and isinstance(value, str):
+            return self.normalize(value)
+        return value
+
+    def error(self, value):
+        """The first failing check's message for an already-normalized value, or None"""
+        if value is None:
+            return None
+        for check in self.checks:
+            message = check(value)
+            if message:
+                return message
+        return None
+
+    def schema_validator(self, value):
+        """Validate API input: the request validators in order, then the checks on the normalized value"""
+        if value is None:
+            return
+        for validator in self.validators:
+            validator(value)
+        message = self.error(self.normalized(value))
+        if message:
+            raise ValidationError(message)
+
+
+def model_validator(rules, field):
+    """A @validates hook enforcing rules[field]; define it in the model's class body"""
+    rule = rules[field]
+
+    def validate(self, key, value):
+        value = rule.normalized(value)
+        message = rule.error(value)
+        if message:
+            raise ValueError(message)
+        return value
+    validate.__name__ = f'validate_{field}'
+    return validates(field)(validate)
+
+# Checks (stored values)
+
+def min_stripped_length(low, message):
+    return lambda value: message if len(value.strip()) < low else None
+
+def between(low, high, too_low, too_high):
+    def check(value):
+        if value < low:
+            return too_low
+        if value > high:
+            return too_high
+        return None
+    return check
+
+def max_length(high, message):
+    return lambda value: message if len(value) > high else None
+
+def one_of(choices, message):
+    return lambda value: message if value not in choices else None
+
+# Request validators (API input only)
+
+def _not_blank(value):
+    if not value.strip():
+        raise ValidationError("Name cannot be empty or just whitespace")
+
+_DIGIT = re.compile(r'\d')
+
+def _no_digits(value):
+    if _DIGIT.search(value):
+        raise ValidationError("Exercise name should not contain numbers")
+
+def _lowercase(value):
+    if not value.islower():
+        raise ValidationError("Category must be lowercase")
+
+def _stripped(value):
+    if value.strip() != value:
+        raise ValidationError("Notes should not have leading or trailing whitespace")
+
+def _recent_date(value):
+    today = date.today()
+    if value > today:
+        raise ValidationError("Workout date cannot be in the future")
+    # Don't allow workouts older than 2 years
+    if value < date(today.year - 2, 1, 1):
+        raise ValidationError("Workout date cannot be more than 2 years old")
+
+# Rule sets, by model field
+
+EXERCISE_RULES = {
+    'name': Rule(
+        min_stripped_length(2, "Exercise name must be at least 2 characters long"),
+        validators=(validate.Length(min=2, max=100), _not_blank, _no_digits),
+        normalize=lambda name: name.strip().title(),
+    ),
+    'category': Rule(
+        one_of(EXERCISE_CATEGORIES, f"Category must be one of: {', '.join(EXERCISE_CATEGORIES)}"),
+        validators=(validate.OneOf(EXERCISE_CATEGORIES), _lowercase),
+        normalize=str.lower,
+    ),
+}
+
+WORKOUT_RULES = {
+    'date': Rule(validators=(_recent_date,)),
+    'duration_minutes': Rule(
+        between(1, 480, "Duration must be a positive number", "Duration cannot exceed 480 minutes (8 hours)"),
+        validators=(validate.Range(min=1, max=480),),
+    ),
+    'notes': Rule(
+        max_length(500, "Notes cannot exceed 500 characters"),
+        validators=(validate.Length(max=500), _stripped),
+    ),
+}
+
+WORKOUT_EXERCISE_RULES = {
+    'reps': Rule(validators=(validate.Range(min=1, max=1000),)),
+    'sets': Rule(validators=(validate.Range(min=1, max=50),)),
+    'duration_seconds': Rule(validators=(validate.Range(min=1, max=7200),)),  # Max 2 hours
+}
@@ -0,0 +1,170 @@
+"""Full-text search over workout notes and exercise names.
+
+SQLite: FTS5 external-content tables (workouts_fts with the porter stemmer,
+exercises_fts with the trigram tokenizer for fuzzy name matching), kept in
+sync with their source tables by triggers.
+
+PostgreSQL: a GIN index on to_tsvector('english', notes) and a pg_trgm GIN
+index on exercise names. Both are expression indexes, so there is nothing
+to keep in sync.
+
+The migration creates these for migrated databases; the DDL below is also
+attached to db.metadata so db.create_all() builds them too.
+"""
+import re
+
+from sqlalchemy import DDL, column, event, func, literal, insert, literal_column, select, table, tuple_
+
+from models import db, Exercise, Workout
+from serializers import EXERCISE_COLUMNS, WORKOUT_COLUMNS
+
+SEARCH_TYPES = ('workouts', 'exercises')
+
+# Workout searches rank only the most recent this-many matches. Ranking
+# costs the same for every match, so a common word across a million
+# workouts would otherwise be scored hundreds of thousands of times.
+SEARCH_CANDIDATES = 10000
+
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS workouts_fts USING fts5("
+    "notes, content='workouts', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS workouts_fts_insert AFTER INSERT ON workouts BEGIN "
+    "INSERT INTO workouts_fts(rowid, notes) VALUES (new.id, new.notes); END",
+    "CREATE TRIGGER IF NOT EXISTS workouts_fts_delete AFTER DELETE ON workouts BEGIN "
+    "INSERT INTO workouts_fts(workouts_fts, rowid, notes) VALUES ('delete', old.id, old.notes); END",
+    "CREATE TRIGGER IF NOT EXISTS workouts_fts_update AFTER UPDATE OF notes ON workouts BEGIN "
+    "INSERT INTO workouts_fts(workouts_fts, rowid, notes) VALUES ('delete', old.id, old.notes); "
+    "INSERT INTO workouts_fts(rowid, notes) VALUES (new.id, new.notes); END",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS exercises_fts USING fts5("
+    "name, content='exercises', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS exercises_fts_insert AFTER INSERT ON exercises BEGIN "
+    "INSERT INTO exercises_fts(rowid, name) VALUES (new.id, new.name); END",
+    "CREATE TRIGGER IF NOT EXISTS exercises_fts_delete AFTER DELETE ON exercises BEGIN "
+    "INSERT INTO exercises_fts(exercises_fts, rowid, name) VALUES ('delete', old.id, old.name); END",
+    "CREATE TRIGGER IF NOT EXISTS exercises_fts_update AFTER UPDATE OF name ON exercises BEGIN "
+    "INSERT INTO exercises_fts(exercises_fts, rowid, name) VALUES ('delete', old.id, old.name); "
+    "INSERT INTO exercises_fts(rowid, name) VALUES (new.id, new.name); END",
+)
+SQLITE_DROP_DDL = (
+    "DROP TABLE IF EXISTS workouts_fts",
+    "DROP TABLE IF EXISTS exercises_fts",
+)
+POSTGRES_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_workouts_notes_fts ON workouts "
+    "USING gin (to_tsvector('english', coalesce(notes, '')))",
+    "CREATE INDEX IF NOT EXISTS ix_exercises_name_trgm ON exercises USING gin (name gin_trgm_ops)",
+)
+
+# What the DDL above creates outside the models. migrations/env.py keeps
+# these out of autogenerate, which would otherwise drop them.
+SEARCH_TABLES = ('workouts_fts', 'exercises_fts')
+SEARCH_INDEXES = ('ix_workouts_notes_fts', 'ix_exercises_name_trgm')
+
+def is_search_object(name, type_):
+    """True for the search tables (with their FTS5 shadow tables) and indexes"""
+    if type_ == 'table':
+        return any(name == table or name.startswith(table + '_') for table in SEARCH_TABLES)
+    return type_ == 'index' and name in SEARCH_INDEXES
+
+for statement in SQLITE_DDL:
+    event.listen(db.metadata, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+for statement in SQLITE_DROP_DDL:
+    event.listen(db.metadata, 'before_drop', DDL(statement).execute_if(dialect='sqlite'))
+for statement in POSTGRES_DDL:
+    event.listen(db.metadata, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+
+# The hidden column named after the table takes FTS5 commands such as 'rebuild'
+workouts_fts = table('workouts_fts', column('rowid'), column('rank'), column('workouts_fts'))
+exercises_fts = table('exercises_fts', column('rowid'), column('rank'), column('exercises_fts'))
+
+def search_terms(q):
+    """Lowercased words of a search string"""
+    return re.findall(r'\w+', q.lower())
+
+def _quoted(token):
+    # FTS5 string literal: the token is matched as-is, never parsed as syntax
+    return '"' + token.replace('"', '""') + '"'
+
+def workout_match(terms):
+    """FTS5 query matching workouts whose notes contain every term"""
+    return ' '.join(_quoted(term) for term in terms)
+
+def exercise_match(terms):
+    """FTS5 trigram query matching names sharing any three-letter run with the terms.
+
+    More shared trigrams rank higher, so near-misses and typos still match.
+    """
+    trigrams = dict.fromkeys(term[i:i + 3] for term in terms for i in range(len(term) - 2))
+    return ' OR '.join(_quoted(trigram) for trigram in trigrams)
+
+def _fts_match(fts_table, match):
+    return literal_column(fts_table.name).op('MATCH')(match)
+
+def _recent_candidates(id_column, condition):
+    """Condition limiting a match to the SEARCH_CANDIDATES newest matching ids"""
+    floor = (
+        select(id_column).where(condition).order_by(id_column.desc())
+        .offset(SEARCH_CANDIDATES - 1).limit(1).correlate(None).scalar_subquery()
+    )
+    return id_column >= func.coalesce(floor, 0)
+
+def _ranked(query, rank, id_column, cursor):
+    # Best match first (lowest rank), then id, after the (rank, id) cursor
+    if cursor:
+        query = query.where(tuple_(rank, id_column) > cursor)
+    return query.order_by(rank, id_column)
+
+def workout_search_query(q, cursor=None):
+    """Rows of WORKOUT_COLUMNS + rank for workouts whose notes match q, or None if q has no terms"""
+    terms = search_terms(q)
+    if not terms:
+        return None
+    if db.session.get_bind().dialect.name == 'postgresql':
+        vector = func.to_tsvector('english', func.coalesce(Workout.notes, ''))
+        tsquery = func.plainto_tsquery('english', ' '.join(terms))
+        rank = -func.ts_rank(vector, tsquery)
+        matches = vector.op('@@')(tsquery)
+        query = (
+            select(*WORKOUT_COLUMNS, rank.label('rank'))
+            .where(matches, _recent_candidates(Workout.id, matches))
+        )
+        return _ranked(query, rank, Workout.id, cursor)
+
+    matches = _fts_match(workouts_fts, workout_match(terms))
+    query = (
+        select(*WORKOUT_COLUMNS, workouts_fts.c.rank)
+        .select_from(workouts_fts)
+        .join(Workout, Workout.id == workouts_fts.c.rowid)
+        .where(matches, _recent_candidates(workouts_fts.c.rowid, matches))
+    )
+    return _ranked(query, workouts_fts.c.rank, Workout.id, cursor)
+
+def exercise_search_query(q, cursor=None):
+    """Rows of EXERCISE_COLUMNS + rank for exercises whose names resemble q, or None if q is too short"""
+    terms = search_terms(q)
+    if db.session.get_bind().dialect.name == 'postgresql':
+        if not terms:
+            return None
+        words = literal(' '.join(terms))
+        rank = -func.word_similarity(words, Exercise.name)
+        query = select(*EXERCISE_COLUMNS, rank.label('rank')).where(words.op('<%')(Exercise.name))
+        return _ranked(query, rank, Exercise.id, cursor)
+
+    match = exercise_match(terms)
+    if not match:
+        return None
+    query = (
+        select(*EXERCISE_COLUMNS, exercises_fts.c.rank)
+        .select_from(exercises_fts)
+        .join(Exercise, Exercise.id == exercises_fts.c.rowid)
+        .where(_fts_match(exercises_fts, match))
+    )
+    return _ranked(query, exercises_fts.c.rank, Exercise.id, cursor)
+
+def rebuild_search_index():
+    """Re-index every workout and exercise (SQLite; the PostgreSQL indexes maintain themselves)"""
+    if db.session.get_bind().dialect.name != 'sqlite':
+        return
+    for fts_table in (workouts_fts, exercises_fts):
+        db.session.execute(insert(fts_table).values({fts_table.name: 'rebuild'}))
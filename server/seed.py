@@ -1,12 +1,45 @@
 #!/usr/bin/env python3
 
-from app import app
-from models import db, Exercise, Workout, WorkoutExercise
+import argparse
+import random
+import string
+import time
+
+from app import create_app
+from models import (
+    db, Exercise, ExercisePair, Workout, WorkoutExercise, ExerciseVolume, PersonalRecord, WorkoutArchive, WorkoutExerciseArchive
+)
+from records import rebuild_personal_records
+from related import rebuild_pairs
+from stats import rebuild_volume
 from datetime import date, timedelta
 
+# Templates for --scale mode: (name, category, equipment_needed)
+EXERCISE_TEMPLATES = [
+    ("push-ups", "strength", False), ("squats", "strength", False), ("deadlifts", "strength", True),
+    ("bench press", "strength", True), ("lunges", "strength", False), ("plank", "strength", False),
+    ("running", "cardio", False), ("cycling", "cardio", True), ("swimming", "cardio", False),
+    ("burpees", "cardio", False), ("rowing", "cardio", True), ("yoga flow", "flexibility", False),
+    ("stretching", "flexibility", False), ("basketball", "sports", True), ("tennis", "sports", True),
+]
+VARIATIONS = [
+    "", "incline", "decline", "tempo", "paused", "single-arm", "wide-grip",
+    "close-grip", "banded", "weighted", "explosive", "isometric",
+]
+NOTE_TEMPLATES = [
+    "Great upper body workout", "Leg day - felt strong", "Quick cardio session",
+    "Full body workout", "Morning flexibility routine", "Felt tired, kept it light",
+    "New personal best", "Recovery session", None, None,
+]
+
 def clear_data():
     """Clear all existing data from tables"""
     print("Clearing existing data...")
+    WorkoutExerciseArchive.query.delete()
+    WorkoutArchive.query.delete()
+    PersonalRecord.query.delete()
+    ExercisePair.query.delete()
+    ExerciseVolume.query.delete()
     WorkoutExercise.query.delete()
     Workout.query.delete()
     Exercise.query.delete()
@@ -137,9 +170,167 @@ def seed_workout_exercises(exercises, workouts):
     db.session.commit()
     print(f"Added {len(workout_exercises)} workout-exercise relationships")
 
+def letters(n):
+    """Spell n in base 26 with lowercase letters (exercise names may not contain digits)"""
+    out = ''
+    while True:
+        n, r = divmod(n, 26)
+        out = string.ascii_lowercase[r] + out
+        if n == 0:
+            return out
+
+def scaled_exercises(count, rng):
+    """Yield unique exercise rows built from the templates and variations"""
+    per_round = len(EXERCISE_TEMPLATES) * len(VARIATIONS)
+    for i in range(count):
+        name, category, equipment = EXERCISE_TEMPLATES[i % len(EXERCISE_TEMPLATES)]
+        variation = VARIATIONS[(i // len(EXERCISE_TEMPLATES)) % len(VARIATIONS)]
+        suffix = letters(i // per_round - 1) if i >= per_round else ''
+        yield {
+            'id': i + 1,
+            'name': ' '.join(part for part in (variation, name, suffix) if part).title(),
+            'category': category,
+            'equipment_needed': equipment,
+        }
+
+def scaled_workouts(count, rng):
+    """Yield workouts spread over the last two years"""
+    today = date.today()
+    for i in range(count):
+        yield {
+            'id': i + 1,
+            'date': today - timedelta(days=rng.randrange(730)),
+            'duration_minutes': min(480, max(10, int(rng.gauss(50, 20)))),
+            'notes': rng.choice(NOTE_TEMPLATES),
+        }
+
+def scaled_workout_exercises(workouts, exercises, links_per_workout, rng):
+    """Yield links with reps/sets or durations that fit each exercise's category"""
+    categories = [EXERCISE_TEMPLATES[i % len(EXERCISE_TEMPLATES)][1] for i in range(exercises)]
+    exercise_ids = range(1, exercises + 1)
+    link_id = 0
+    for workout_id in range(1, workouts + 1):
+        count = min(exercises, max(1, rng.randint(links_per_workout - 2, links_per_workout + 2)))
+        for exercise_id in rng.sample(exercise_ids, count):
+            link_id += 1
+            row = {'id': link_id, 'workout_id': workout_id, 'exercise_id': exercise_id,
+                   'reps': None, 'sets': None, 'duration_seconds': None}
+            category = categories[exercise_id - 1]
+            if category == 'strength':
+                row['reps'] = rng.randint(5, 15)
+                row['sets'] = rng.randint(2, 5)
+            elif category == 'flexibility':
+                row['duration_seconds'] = rng.randint(30, 300)
+                row['sets'] = rng.randint(1, 3)
+            else:
+                row['duration_seconds'] = rng.randint(300, 3600)
+            yield row
+
+def insert_chunked(connection, table, rows, chunk_size):
+    """executemany INSERTs of chunk_size rows at a time; returns the row count"""
+    total = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            connection.execute(table.insert(), batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        connection.execute(table.insert(), batch)
+        total += len(batch)
+    return total
+
+def seed_scale(workouts, exercises=None, links_per_workout=5, seed=42, chunk_size=10000):
+    """Replace all data with a deterministic synthetic dataset, in one transaction.
+
+    Secondary indexes are dropped for the load and rebuilt afterwards, which
+    is much cheaper than maintaining them row by row. Returns
+    {table: (rows, seconds)}.
+    """
+    if exercises is None:
+        exercises = min(10000, max(len(EXERCISE_TEMPLATES), workouts // 100))
+    rng = random.Random(seed)
+    connection = db.session.connection()
+    tables = [Exercise.__table__, Workout.__table__, WorkoutExercise.__table__]
+    indexes = [index for table in tables for index in table.indexes]
+    timings = {}
+
+    for model in (WorkoutExerciseArchive, WorkoutArchive, PersonalRecord, ExercisePair, ExerciseVolume, WorkoutExercise, Workout, Exercise):
+        connection.execute(model.__table__.delete())
+    for index in indexes:
+        index.drop(connection, checkfirst=True)
+
+    loads = [
+        (Exercise.__table__, scaled_exercises(exercises, rng)),
+        (Workout.__table__, scaled_workouts(workouts, rng)),
+        (WorkoutExercise.__table__, scaled_workout_exercises(workouts, exercises, links_per_workout, rng)),
+    ]
+    for table, rows in loads:
+        start = time.perf_counter()
+        timings[table.name] = (insert_chunked(connection, table, rows, chunk_size), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for index in indexes:
+        index.create(connection)
+    timings['indexes'] = (len(indexes), time.perf_counter() - start)
+
+    # Ids were given explicitly, so move Postgres sequences past them
+    if connection.dialect.name == 'postgresql':
+        for table in tables:
+            connection.exec_driver_sql(
+                f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                f"COALESCE((SELECT MAX(id) FROM {table.name}), 1))"
+            )
+
+    start = time.perf_counter()
+    rebuild_volume()
+    timings['exercise_volume'] = (db.session.query(ExerciseVolume).count(), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    rebuild_personal_records()
+    timings['personal_records'] = (db.session.query(PersonalRecord).count(), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    rebuild_pairs()
+    timings['exercise_pairs'] = (db.session.query(ExercisePair).count(), time.perf_counter() - start)
+    db.session.commit()
+    return timings
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Reset the database and load seed data")
+    parser.add_argument('--scale', type=int, metavar='N',
+                        help="Load N synthetic workouts in bulk instead of the sample data")
+    parser.add_argument('--exercises', type=int, help="Exercises to generate (default N/100, max 10000)")
+    parser.add_argument('--links-per-workout', type=int, default=5, help="Average exercises per workout")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed, for reproducible data")
+    parser.add_argument('--chunk-size', type=int, default=10000, help="Rows per INSERT batch")
+    return parser.parse_args(argv)
+
+def main_scale(args):
+    """Bulk seeding for large synthetic datasets"""
+    with create_app().app_context():
+        print(f"Seeding {args.scale} workouts (seed {args.seed})...")
+        start = time.perf_counter()
+        timings = seed_scale(args.scale, args.exercises, args.links_per_workout, args.seed, args.chunk_size)
+        elapsed = time.perf_counter() - start
+
+        for name, (rows, seconds) in timings.items():
+            if name == 'indexes':
+                print(f"  indexes: rebuilt {rows} in {seconds:.2f}s")
+                continue
+            rate = rows / seconds if seconds else 0
+            print(f"  {name}: {rows} rows in {seconds:.2f}s ({rate:,.0f} rows/s)")
+        total = sum(rows for name, (rows, _) in timings.items() if name != 'indexes')
+        print(f"\nLoaded {total} rows in {elapsed:.2f}s ({total / elapsed:,.0f} rows/s)")
+
 def main():
     """Main seeding function"""
-    with app.app_context():
+    args = parse_args()
+    if args.scale:
+        return main_scale(args)
+
+    with create_app().app_context():
         print("Starting database seeding...")
         
         # Clear existing data
@@ -150,6 +341,12 @@ def main():
         workouts = seed_workouts()
         seed_workout_exercises(exercises, workouts)
         
+        # Seed rows bypass the API, so build the volume rollup, records and pairs from scratch
+        rebuild_volume()
+        rebuild_personal_records()
+        rebuild_pairs()
+        db.session.commit()
+        
         print("\nDatabase seeding completed successfully!")
         print(f"Total exercises: {Exercise.query.count()}")
         print(f"Total workouts: {Workout.query.count()}")
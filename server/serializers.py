@@ -0,0 +1,227 @@
+"""Fast-path serializers for the hot read endpoints.
+
+These build exactly the dicts ExerciseSchema, WorkoutSchema and
+WorkoutExerciseSchema would dump, without marshmallow's per-field
+dispatch. The *_from_rows functions go one step further and work on plain
+SQL row tuples, so list responses never hydrate ORM objects.
+tests/test_serializers.py checks them against the schemas.
+"""
+from collections import defaultdict
+
+from metrics import timed
+from models import Exercise, Workout, WorkoutExercise
+
+# Column order expected by the *_from_rows functions
+EXERCISE_COLUMNS = (Exercise.id, Exercise.name, Exercise.category, Exercise.equipment_needed)
+WORKOUT_COLUMNS = (Workout.id, Workout.date, Workout.duration_minutes, Workout.notes)
+LINK_COLUMNS = (
+    WorkoutExercise.workout_id, WorkoutExercise.id, WorkoutExercise.reps,
+    WorkoutExercise.sets, WorkoutExercise.duration_seconds,
+) + EXERCISE_COLUMNS
+
+def _int(value):
+    return None if value is None else int(value)
+
+def _str(value):
+    return None if value is None else str(value)
+
+def _date(value):
+    return None if value is None else value.isoformat()
+
+def _bool(value):
+    return None if value is None else bool(value)
+
+# Field name -> converter, for the ?fields= projections
+EXERCISE_FIELD_TYPES = {'category': _str, 'equipment_needed': _bool, 'id': _int, 'name': _str}
+WORKOUT_FIELD_TYPES = {'date': _date, 'duration_minutes': _int, 'id': _int, 'notes': _str}
+
+def exercise_row(id, name, category, equipment_needed):
+    return {
+        'category': _str(category),
+        'equipment_needed': _bool(equipment_needed),
+        'id': _int(id),
+        'name': _str(name),
+    }
+
+def workout_summary_row(id, date, duration_minutes, notes, exercises):
+    """WorkoutSchema without workout_exercises, as nested inside a WorkoutExercise"""
+    return {
+        'date': _date(date),
+        'duration_minutes': _int(duration_minutes),
+        'exercises': exercises,
+        'id': _int(id),
+        'notes': _str(notes),
+    }
+
+def workout_exercise_row(id, workout_id, exercise_id, reps, sets, duration_seconds, exercise, workout):
+    return {
+        'duration_seconds': _int(duration_seconds),
+        'exercise': exercise,
+        'exercise_id': _int(exercise_id),
+        'id': _int(id),
+        'reps': _int(reps),
+        'sets': _int(sets),
+        'workout': workout,
+        'workout_id': _int(workout_id),
+    }
+
+def _full_workout(summary, workout_exercises):
+    return dict(summary, workout_exercises=workout_exercises)
+
+# ORM objects
+
+def dump_exercise(exercise):
+    """Same output as exercise_schema.dump(exercise)"""
+    with timed('serialize'):
+        return exercise_row(exercise.id, exercise.name, exercise.category, exercise.equipment_needed)
+
+def dump_exercises(exercises):
+    with timed('serialize'):
+        return [exercise_row(e.id, e.name, e.category, e.equipment_needed) for e in exercises]
+
+def dump_workout(workout, _exercise_cache=None):
+    """Same output as workout_schema.dump(workout)"""
+    with timed('serialize'):
+        cache = {} if _exercise_cache is None else _exercise_cache
+
+        def exercise(e):
+            data = cache.get(e.id)
+            if data is None:
+                data = cache[e.id] = exercise_row(e.id, e.name, e.category, e.equipment_needed)
+            return data
+
+        summary = workout_summary_row(
+            workout.id, workout.date, workout.duration_minutes, workout.notes,
+            [exercise(e) for e in workout.exercises],
+        )
+        return _full_workout(summary, [
+            workout_exercise_row(
+                we.id, we.workout_id, we.exercise_id, we.reps, we.sets, we.duration_seconds,
+                exercise(we.exercise), summary,
+            )
+            for we in workout.workout_exercises
+        ])
+
+def dump_workouts(workouts):
+    """Same output as workouts_schema.dump(workouts)"""
+    with timed('serialize'):
+        cache = {}
+        return [dump_workout(w, cache) for w in workouts]
+
+# SQL rows
+
+def exercises_from_rows(rows):
+    """Rows of EXERCISE_COLUMNS -> exercises_schema.dump output"""
+    with timed('serialize'):
+        return [exercise_row(*row) for row in rows]
+
+def _group_links(link_rows):
+    """LINK_COLUMNS rows -> ({exercise_id: exercise body}, {workout_id: [(link_id, exercise_id, reps, sets, duration_seconds)]})"""
+    exercises = {}
+    links_by_workout = defaultdict(list)
+    for workout_id, link_id, reps, sets, duration_seconds, *exercise in link_rows:
+        exercise_id = exercise[0]
+        if exercise_id not in exercises:
+            exercises[exercise_id] = exercise_row(*exercise)
+        links_by_workout[workout_id].append((link_id, exercise_id, reps, sets, duration_seconds))
+    return exercises, links_by_workout
+
+def workouts_from_rows(workout_rows, link_rows):
+    """Rows starting with WORKOUT_COLUMNS plus their LINK_COLUMNS rows -> workouts_schema.dump output.
+
+    link_rows should be ordered by WorkoutExercise.id to match the ORM
+    relationship order.
+    """
+    with timed('serialize'):
+        exercises, links_by_workout = _group_links(link_rows)
+        results = []
+        for id, date, duration_minutes, notes, *_ in workout_rows:
+            links = links_by_workout.get(id, ())
+            summary = workout_summary_row(
+                id, date, duration_minutes, notes, [exercises[link[1]] for link in links]
+            )
+            results.append(_full_workout(summary, [
+                workout_exercise_row(link_id, id, exercise_id, reps, sets, duration_seconds,
+                                     exercises[exercise_id], summary)
+                for link_id, exercise_id, reps, sets, duration_seconds in links
+            ]))
+        return results
+
+def workout_detail_from_rows(workout_row, link_rows):
+    """GET /workouts/<id> body: the workout with flattened workout_exercises"""
+    with timed('serialize'):
+        data = workouts_from_rows([workout_row], [])[0]
+        exercises = [exercise_row(*exercise) for _, _, _, _, _, *exercise in link_rows]
+        data['exercises'] = exercises
+        data['workout_exercises'] = [
+            {
+                'id': _int(link_id),
+                'exercise': exercise,
+                'reps': _int(reps),
+                'sets': _int(sets),
+                'duration_seconds': _int(duration_seconds),
+            }
+            for (_, link_id, reps, sets, duration_seconds, *_), exercise in zip(link_rows, exercises)
+        ]
+        return data
+
+def exercise_detail_from_rows(exercise, workout_rows):
+    """GET /exercises/<id> body: the exercise with its workouts (rows of WORKOUT_COLUMNS)"""
+    with timed('serialize'):
+        data = exercise_row(*exercise)
+        data['workouts'] = [
+            {
+                'id': _int(id),
+                'date': _date(date),
+                'duration_minutes': _int(duration_minutes),
+                'notes': _str(notes),
+            }
+            for id, date, duration_minutes, notes in workout_rows
+        ]
+        return data
+
+# Sparse fieldsets (?fields= / ?include=)
+
+def _project(row, fields, types):
+    return {name: types[name](getattr(row, name)) for name in fields}
+
+def sparse_exercises_from_rows(rows, fields):
+    """Rows with the ?fields= columns -> exercises with only those fields"""
+    with timed('serialize'):
+        return [_project(row, fields, EXERCISE_FIELD_TYPES) for row in rows]
+
+def sparse_workouts_from_rows(workout_rows, link_rows, fields, include):
+    """Rows with the ?fields= columns, plus their LINK_COLUMNS rows -> workouts with only those fields and embeds.
+
+    Embedded workout_exercises take the compact GET /workouts/<id> shape,
+    without a copy of their parent workout.
+    """
+    with timed('serialize'):
+        exercises, links_by_workout = _group_links(link_rows)
+        results = []
+        for row in workout_rows:
+            data = _project(row, fields, WORKOUT_FIELD_TYPES)
+            links = links_by_workout.get(row.id, ())
+            if 'exercises' in include:
+                data['exercises'] = [exercises[exercise_id] for _, exercise_id, _, _, _ in links]
+            if 'workout_exercises' in include:
+                data['workout_exercises'] = [
+                    {
+                        'duration_seconds': _int(duration_seconds),
+                        'exercise': exercises[exercise_id],
+                        'id': _int(link_id),
+                        'reps': _int(reps),
+                        'sets': _int(sets),
+                    }
+                    for link_id, exercise_id, reps, sets, duration_seconds in links
+                ]
+            results.append(data)
+        return results
+
+def sparse_exercise_detail_from_rows(exercise, workout_rows, fields, include):
+    """GET /exercises/<id> body with only the ?fields= fields, and its workouts if included"""
+    with timed('serialize'):
+        data = _project(exercise, fields, EXERCISE_FIELD_TYPES)
+        if 'workouts' in include:
+            data['workouts'] = [_project(row, WORKOUT_FIELD_TYPES, WORKOUT_FIELD_TYPES) for row in workout_rows]
+        return data
@@ -0,0 +1,121 @@
+from collections import defaultdict
+
+from sqlalchemy import delete, func, select
+
+from models import db, upsert, Exercise, ExerciseVolume, Workout, WorkoutExercise
+
+VOLUME_FIELDS = ('workout_count', 'total_sets', 'total_reps', 'total_duration_seconds', 'workout_minutes')
+
+def volume_of(sets, reps, duration_seconds):
+    """Return (sets, reps, duration_seconds) totals for one workout exercise.
+
+    A missing set count means a single set, so reps and duration are
+    multiplied by the number of sets performed.
+    """
+    sets = sets or 1
+    return sets, sets * (reps or 0), sets * (duration_seconds or 0)
+
+def record_volume(entries, sign=1):
+    """Apply workout exercises to the daily rollup, within the caller's transaction.
+
+    entries: iterable of (day, exercise_id, workout_minutes, sets, reps, duration_seconds).
+    Use sign=-1 to remove entries that are being deleted.
+    """
+    totals = defaultdict(lambda: [0] * len(VOLUME_FIELDS))
+    for day, exercise_id, workout_minutes, sets, reps, duration_seconds in entries:
+        row = totals[(day, exercise_id)]
+        for i, value in enumerate((1, *volume_of(sets, reps, duration_seconds), workout_minutes)):
+            row[i] += sign * value
+    if not totals:
+        return
+
+    # Add each row's counters onto the existing ExerciseVolume row, creating it if needed
+    upsert(
+        ExerciseVolume,
+        [dict(zip(VOLUME_FIELDS, values), day=day, exercise_id=exercise_id) for (day, exercise_id), values in totals.items()],
+        index_elements=['day', 'exercise_id'],
+        set_=lambda excluded: {field: getattr(ExerciseVolume, field) + getattr(excluded, field) for field in VOLUME_FIELDS},
+    )
+    if sign < 0:
+        # Only rows just decremented can have emptied. Two IN lists rather than
+        # (day, exercise_id) pairs: SQLite seeks ix_exercise_volume_exercise_id_day
+        # on these, but scans the table for a row-value IN.
+        db.session.execute(delete(ExerciseVolume).where(
+            ExerciseVolume.exercise_id.in_({exercise_id for _, exercise_id in totals}),
+            ExerciseVolume.day.in_({day for day, _ in totals}),
+            ExerciseVolume.workout_count <= 0,
+        ))
+
+def workout_volume_entries(workout_ids):
+    """Select the rollup entries for the given workouts' exercises"""
+    return db.session.execute(
+        select(
+            Workout.date, WorkoutExercise.exercise_id, Workout.duration_minutes,
+            WorkoutExercise.sets, WorkoutExercise.reps, WorkoutExercise.duration_seconds,
+        )
+        .join(WorkoutExercise, WorkoutExercise.workout_id == Workout.id)
+        .where(Workout.id.in_(workout_ids))
+    ).all()
+
+def rebuild_volume():
+    """Recompute the whole rollup from workout_exercises with one GROUP BY"""
+    sets = func.coalesce(WorkoutExercise.sets, 1)
+    db.session.execute(delete(ExerciseVolume))
+    db.session.execute(
+        ExerciseVolume.__table__.insert().from_select(
+            ['day', 'exercise_id', *VOLUME_FIELDS],
+            select(
+                Workout.date, WorkoutExercise.exercise_id,
+                func.count(),
+                func.sum(sets),
+                func.sum(sets * func.coalesce(WorkoutExercise.reps, 0)),
+                func.sum(sets * func.coalesce(WorkoutExercise.duration_seconds, 0)),
+                func.sum(Workout.duration_minutes),
+            )
+            .join(WorkoutExercise, WorkoutExercise.workout_id == Workout.id)
+            .group_by(Workout.date, WorkoutExercise.exercise_id)
+        )
+    )
+
+def _period_start(period):
+    """SQL expression truncating ExerciseVolume.day to the start of its period"""
+    if period == 'day':
+        return ExerciseVolume.day
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.cast(func.date_trunc('week', ExerciseVolume.day), db.Date)
+    # SQLite: move forward to Sunday, then back to that week's Monday
+    return func.date(ExerciseVolume.day, 'weekday 0', '-6 days')
+
+def volume_stats(group_by='exercise', period='week', start_date=None, end_date=None, category=None, exercise_id=None):
+    """Aggregate the rollup per period and per exercise or category"""
+    period_start = _period_start(period).label('period_start')
+    if group_by == 'category':
+        keys = [Exercise.category]
+    else:
+        keys = [ExerciseVolume.exercise_id, Exercise.name.label('exercise_name'), Exercise.category]
+
+    stmt = (
+        select(
+            period_start, *keys,
+            *(func.sum(getattr(ExerciseVolume, field)).label(field) for field in VOLUME_FIELDS),
+        )
+        .join(Exercise, Exercise.id == ExerciseVolume.exercise_id)
+        .group_by(period_start, *keys)
+        .order_by(period_start, *keys)
+    )
+    if start_date:
+        stmt = stmt.where(ExerciseVolume.day >= start_date)
+    if end_date:
+        stmt = stmt.where(ExerciseVolume.day <= end_date)
+    if category:
+        stmt = stmt.where(Exercise.category == category)
+    if exercise_id:
+        stmt = stmt.where(ExerciseVolume.exercise_id == exercise_id)
+
+    results = []
+    for row in db.session.execute(stmt).mappings():
+        item = dict(row)
+        if not isinstance(item['period_start'], str):
+            item['period_start'] = item['period_start'].isoformat()
+        results.append(item)
+    return results
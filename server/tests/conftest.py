@@ -0,0 +1,107 @@
+import os
+import shutil
+
+import pytest
+from flask_migrate import upgrade
+
+from app import create_app
+from models import db
+from seed import seed_scale
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Enough rows that SQLite's planner picks the same indexes it would in production
+SEED_WORKOUTS = 2000
+
+class DictRedis:
+    """The slice of the redis-py client SharedCache uses, over a dict"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, *keys):
+        return [self.data.get(key) for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value.encode() if isinstance(value, str) else value
+        return True
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key, 0)) + 1).encode()
+        return int(self.data[key])
+
+    def flushall(self):
+        self.data.clear()
+
+
+def dispose(app):
+    """Stop an app's background work and close its connections"""
+    if 'write_behind' in app.extensions:
+        app.extensions['write_behind'].close()
+    if 'replicas' in app.extensions:
+        for replica in app.extensions['replicas'].replicas:
+            replica.engine.dispose()
+    with app.app_context():
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+@pytest.fixture(scope='session')
+def seeded_database(tmp_path_factory):
+    """A SQLite file built by the migrations (search tables and triggers included) and seed_scale()"""
+    path = str(tmp_path_factory.mktemp('seeded') / 'seeded.db')
+    app = create_app('testing', {'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + path})
+    with app.app_context():
+        upgrade(directory=os.path.join(SERVER_DIR, 'migrations'))
+        seed_scale(SEED_WORKOUTS)
+    dispose(app)
+    return path
+
+@pytest.fixture
+def database(seeded_database, tmp_path):
+    """Path of this test's own copy of the seeded database"""
+    path = str(tmp_path / 'app.db')
+    shutil.copy(seeded_database, path)
+    return path
+
+@pytest.fixture
+def replica_url(database, tmp_path):
+    """A copy of the test database, made before any write, as a lagging replica"""
+    path = str(tmp_path / 'replica.db')
+    shutil.copy(database, path)
+    return 'sqlite:///' + path
+
+@pytest.fixture
+def make_app(database):
+    """create_app() on this test's database; keyword arguments override the testing config.
+
+    Every app made in one test shares the database, as workers of one
+    deployment would.
+    """
+    apps = []
+
+    def make(**overrides):
+        app = create_app('testing', dict({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + database}, **overrides))
+        apps.append(app)
+        return app
+
+    yield make
+    for app in apps:
+        dispose(app)
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def redis_client():
+    """A DictRedis, standing in for the server behind RESPONSE_CACHE_URL"""
+    return DictRedis()
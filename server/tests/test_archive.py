@@ -0,0 +1,73 @@
+from datetime import date
+
+from sqlalchemy import func, insert, select
+
+from cache import SharedCache
+from models import db, Exercise, Workout, WorkoutArchive, WorkoutExercise, WorkoutExerciseArchive
+
+def oldest_workout(app):
+    with app.app_context():
+        return db.session.execute(select(Workout.id, Workout.date).order_by(Workout.date, Workout.id)).first()
+
+def test_archive_command_moves_old_workouts(app):
+    workout = oldest_workout(app)
+    next_day = workout.date.fromordinal(workout.date.toordinal() + 1).isoformat()
+    result = app.test_cli_runner().invoke(args=['archive-workouts', '--before', next_day])
+    assert result.exit_code == 0, result.output
+    with app.app_context():
+        assert db.session.get(Workout, workout.id) is None
+        archived = db.session.scalars(select(WorkoutArchive).where(WorkoutArchive.workout_id == workout.id)).one()
+        assert archived.date == workout.date
+        assert db.session.scalar(select(func.min(Workout.date))) >= workout.date
+
+def test_archive_command_invalidates_workers_through_the_shared_cache(make_app, redis_client):
+    worker, cli = make_app(), make_app()
+    for app in (worker, cli):
+        app.extensions['response_cache'] = SharedCache(redis_client)
+    workout = oldest_workout(worker)
+    url = f'/workouts/{workout.id}/suggestions'
+    etag = worker.test_client().get(url).headers['ETag']
+
+    next_day = workout.date.fromordinal(workout.date.toordinal() + 1).isoformat()
+    result = cli.test_cli_runner().invoke(args=['archive-workouts', '--before', next_day])
+    assert result.exit_code == 0, result.output
+    assert 'Warning' not in result.stderr
+
+    response = worker.test_client().get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 404
+
+def test_archive_command_warns_that_in_process_caches_stay_stale(app):
+    workout = oldest_workout(app)
+    next_day = workout.date.fromordinal(workout.date.toordinal() + 1).isoformat()
+    result = app.test_cli_runner().invoke(args=['archive-workouts', '--before', next_day])
+    assert result.exit_code == 0
+    assert 'RESPONSE_CACHE_URL is not set' in result.stderr
+
+def test_a_reused_workout_id_can_be_archived_again(app):
+    with app.app_context():
+        exercise_id = db.session.scalar(select(Exercise.id).order_by(Exercise.id))
+
+    # Older than every seeded workout, so each archive run moves only this one
+    archived = []
+    for reps in (5, 8):
+        with app.app_context():
+            workout_id = db.session.scalar(
+                insert(Workout).values(date=date(2000, 1, 1), duration_minutes=30).returning(Workout.id)
+            )
+            db.session.execute(insert(WorkoutExercise).values(workout_id=workout_id, exercise_id=exercise_id, reps=reps))
+            db.session.commit()
+        archived.append(workout_id)
+        result = app.test_cli_runner().invoke(args=['archive-workouts', '--before', '2000-01-02'])
+        assert result.exit_code == 0, result.output
+        assert result.stdout.startswith('Archived 1 workouts')
+    # SQLite handed the second workout the first one's id
+    assert archived[0] == archived[1]
+
+    with app.app_context():
+        rows = db.session.execute(
+            select(WorkoutArchive.workout_id, WorkoutExerciseArchive.reps)
+            .join(WorkoutExerciseArchive, WorkoutExerciseArchive.workout_archive_id == WorkoutArchive.id)
+            .where(WorkoutArchive.workout_id.in_(archived))
+            .order_by(WorkoutArchive.id)
+        ).all()
+    assert rows == [(archived[0], 5), (archived[0], 8)]
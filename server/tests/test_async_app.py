@@ -0,0 +1,67 @@
+import asyncio
+
+import msgpack
+import pytest
+
+from async_app import AsyncAPI
+
+@pytest.fixture
+def async_api(app):
+    return AsyncAPI(app)
+
+def serve(async_api, *requests):
+    """Send each (path, query, headers) through the ASGI app in one event loop; returns [(status, headers, body)]"""
+    async def call(path, query='', headers=None):
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': path, 'root_path': '',
+            'query_string': query.encode(),
+            'headers': [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        await async_api(scope, receive, send)
+        start, body = messages
+        return start['status'], {name.decode(): value.decode() for name, value in start['headers']}, body['body']
+
+    async def run():
+        # Disposed at the end, so the next serve() opens connections on its own loop
+        try:
+            return [await call(*request) for request in requests]
+        finally:
+            await async_api.engine.dispose()
+    return asyncio.run(run())
+
+def test_lists_match_the_flask_views(async_api, client):
+    (status, headers, body), = serve(async_api, ('/workouts', 'limit=5&include=exercises'))
+    flask_response = client.get('/workouts?limit=5&include=exercises')
+    assert status == 200
+    assert headers['content-type'] == 'application/json'
+    assert headers['vary'] == 'Accept'
+    assert headers['x-next-cursor'] == flask_response.headers['X-Next-Cursor']
+    assert client.application.json.loads(body) == flask_response.get_json()
+
+    (status, headers, body), = serve(async_api, ('/exercises', 'limit=3', {'Accept': 'application/msgpack'}))
+    assert headers['content-type'] == 'application/msgpack'
+    assert msgpack.unpackb(body) == client.get('/exercises?limit=3').get_json()
+
+def test_detail_sends_validators_and_answers_304(async_api, client):
+    (status, headers, body), = serve(async_api, ('/workouts/1',))
+    assert status == 200
+    assert headers['etag'] == client.get('/workouts/1').headers['ETag']
+
+    (status, _, body), (missing, _, _), (bad, _, error) = serve(
+        async_api,
+        ('/workouts/1', '', {'If-None-Match': headers['etag']}),
+        ('/exercises/0',),
+        ('/workouts', 'cursor=garbage'),
+    )
+    assert (status, body) == (304, b'')
+    assert missing == 404
+    assert bad == 400
+    assert client.application.json.loads(error) == {'error': 'Invalid cursor'}
@@ -0,0 +1,68 @@
+import json
+from datetime import date
+
+from sqlalchemy import func, select
+
+from models import db, Exercise, Workout, WorkoutExercise
+
+TODAY = date.today().isoformat()
+
+def workout_count(app):
+    with app.app_context():
+        return db.session.scalar(select(func.count()).select_from(Workout))
+
+def test_bulk_create_skips_invalid_items(app, client):
+    with app.app_context():
+        exercise_id = db.session.scalar(select(Exercise.id).order_by(Exercise.id))
+    before = workout_count(app)
+    response = client.post('/workouts/bulk', json=[
+        {'date': TODAY, 'duration_minutes': 30, 'workout_exercises': [{'exercise_id': exercise_id, 'reps': 10}]},
+        {'date': TODAY},
+        {'date': TODAY, 'duration_minutes': 20, 'workout_exercises': [{'exercise_id': 10 ** 9}]},
+        {'date': TODAY, 'duration_minutes': 45},
+    ])
+    assert response.status_code == 201
+    body = response.get_json()
+    assert len(body['created']) == 2
+    assert sorted(body['errors']) == ['1', '2']
+    assert 'duration_minutes' in body['errors']['1']
+    assert body['errors']['2'] == {'workout_exercises': [f'Exercise not found: {10 ** 9}']}
+
+    assert workout_count(app) == before + 2
+    with app.app_context():
+        links = db.session.scalars(select(WorkoutExercise.exercise_id).where(WorkoutExercise.workout_id == body['created'][0]))
+        assert list(links) == [exercise_id]
+
+def test_bulk_create_reports_bad_ndjson_lines(client):
+    lines = [json.dumps({'date': TODAY, 'duration_minutes': 30}), '{not json', json.dumps({'date': TODAY, 'duration_minutes': 40})]
+    response = client.post('/workouts/bulk', data='\n'.join(lines), content_type='application/x-ndjson')
+    assert response.status_code == 201
+    body = response.get_json()
+    assert len(body['created']) == 2
+    assert body['errors'] == {'1': ['Invalid JSON']}
+
+def test_bulk_create_with_only_invalid_items_is_a_400(app, client):
+    before = workout_count(app)
+    response = client.post('/workouts/bulk', json=[{'duration_minutes': 30}])
+    assert response.status_code == 400
+    assert response.get_json()['created'] == []
+    assert workout_count(app) == before
+
+def test_bulk_delete_removes_only_older_workouts(app, client):
+    with app.app_context():
+        dates = sorted(db.session.scalars(select(Workout.date).distinct()))
+    before = dates[len(dates) // 2]
+    with app.app_context():
+        older = db.session.scalar(select(func.count()).select_from(Workout).where(Workout.date < before))
+        total = db.session.scalar(select(func.count()).select_from(Workout))
+
+    response = client.delete(f'/workouts?before={before.isoformat()}')
+    assert response.status_code == 200
+    assert response.get_json() == {'deleted': older}
+    with app.app_context():
+        assert db.session.scalar(select(func.min(Workout.date))) == before
+    assert workout_count(app) == total - older
+
+def test_bulk_delete_requires_a_date(client):
+    assert client.delete('/workouts').status_code == 400
+    assert client.delete('/workouts?before=yesterday').status_code == 400
@@ -0,0 +1,59 @@
+import msgpack
+
+from app import response_cache
+from cache import SharedCache
+
+MSGPACK = {'Accept': 'application/msgpack'}
+
+def test_same_etag_is_answered_with_304(client):
+    first = client.get('/exercises')
+    assert first.status_code == 200
+
+    second = client.get('/exercises', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 304
+    assert second.headers['ETag'] == first.headers['ETag']
+    assert second.headers['Vary'] == 'Accept'
+    assert second.data == b''
+
+def test_invalidate_changes_the_etag(app, client):
+    before = client.get('/exercises').headers['ETag']
+    with app.app_context():
+        response_cache.invalidate('exercises')
+
+    after = client.get('/exercises', headers={'If-None-Match': before})
+    assert after.status_code == 200
+    assert after.headers['ETag'] != before
+
+def test_json_and_msgpack_are_cached_separately(client):
+    as_json = client.get('/exercises')
+    as_msgpack = client.get('/exercises', headers=MSGPACK)
+    assert as_msgpack.mimetype == 'application/msgpack'
+    assert msgpack.unpackb(as_msgpack.data) == as_json.get_json()
+    assert as_msgpack.headers['ETag'] != as_json.headers['ETag']
+
+    # Both are cache hits now, and each still gets its own format back
+    assert client.get('/exercises').data == as_json.data
+    assert client.get('/exercises', headers=MSGPACK).data == as_msgpack.data
+    # A JSON ETag does not validate the MessagePack representation
+    assert client.get('/exercises', headers=dict(MSGPACK, **{'If-None-Match': as_json.headers['ETag']})).status_code == 200
+
+def test_shared_cache_versions_do_not_repeat_after_a_flush(redis_client):
+    cache = SharedCache(redis_client)
+    cache.bump('exercises')
+    before = cache.version('exercises')
+    assert cache.version('exercises') == before
+
+    redis_client.flushall()
+    cache.bump('exercises')
+    assert cache.version('exercises') != before
+
+def test_shared_cache_is_seen_by_every_app(make_app, redis_client):
+    apps = [make_app(), make_app()]
+    for app in apps:
+        app.extensions['response_cache'] = SharedCache(redis_client)
+    etag = apps[0].test_client().get('/exercises').headers['ETag']
+    assert apps[1].test_client().get('/exercises', headers={'If-None-Match': etag}).status_code == 304
+
+    with apps[0].app_context():
+        response_cache.invalidate('exercises')
+    assert apps[1].test_client().get('/exercises', headers={'If-None-Match': etag}).status_code == 200
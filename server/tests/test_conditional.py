@@ -0,0 +1,100 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from models import db, Exercise, Workout, WorkoutExercise
+
+MSGPACK = {'Accept': 'application/msgpack'}
+
+@pytest.fixture
+def workout_id(app):
+    with app.app_context():
+        return db.session.scalar(select(Workout.id).order_by(Workout.id))
+
+@pytest.fixture
+def new_exercise_id(app, workout_id):
+    """An exercise not yet in the workout"""
+    with app.app_context():
+        return db.session.scalar(
+            select(Exercise.id)
+            .where(Exercise.id.not_in(select(WorkoutExercise.exercise_id).where(WorkoutExercise.workout_id == workout_id)))
+            .order_by(Exercise.id)
+        )
+
+def test_if_none_match_gets_a_304_with_the_same_etag(client, workout_id):
+    first = client.get(f'/workouts/{workout_id}')
+    assert first.status_code == 200
+    assert first.headers['Vary'] == 'Accept'
+
+    second = client.get(f'/workouts/{workout_id}', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 304
+    assert second.headers['ETag'] == first.headers['ETag']
+    assert second.headers['Vary'] == 'Accept'
+
+def test_if_modified_since_gets_a_304(client, workout_id):
+    first = client.get(f'/workouts/{workout_id}')
+    second = client.get(f'/workouts/{workout_id}', headers={'If-Modified-Since': first.headers['Last-Modified']})
+    assert second.status_code == 304
+
+def test_each_representation_has_its_own_etag(client, workout_id):
+    as_json = client.get(f'/workouts/{workout_id}')
+    as_msgpack = client.get(f'/workouts/{workout_id}', headers=MSGPACK)
+    assert as_msgpack.mimetype == 'application/msgpack'
+    assert as_msgpack.headers['ETag'] != as_json.headers['ETag']
+
+    # The JSON validator does not make the MessagePack body fresh, and vice versa
+    response = client.get(f'/workouts/{workout_id}', headers=dict(MSGPACK, **{'If-None-Match': as_json.headers['ETag']}))
+    assert response.status_code == 200
+    response = client.get(f'/workouts/{workout_id}', headers={'If-None-Match': as_msgpack.headers['ETag']})
+    assert response.status_code == 200
+    response = client.get(f'/workouts/{workout_id}', headers=dict(MSGPACK, **{'If-None-Match': as_msgpack.headers['ETag']}))
+    assert response.status_code == 304
+
+def test_a_write_changes_the_etag(client, workout_id, new_exercise_id):
+    etag = client.get(f'/workouts/{workout_id}').headers['ETag']
+    response = client.post(f'/workouts/{workout_id}/exercises/{new_exercise_id}/workout_exercises', json={'reps': 5})
+    assert response.status_code == 201
+    assert response.headers['ETag'] != etag
+
+    response = client.get(f'/workouts/{workout_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+
+def test_stale_if_match_is_refused_with_412(client, workout_id, new_exercise_id):
+    stale = client.get(f'/workouts/{workout_id}').headers['ETag']
+    current = client.post(f'/workouts/{workout_id}/exercises/{new_exercise_id}/workout_exercises', json={'reps': 5}).headers['ETag']
+
+    response = client.delete(f'/workouts/{workout_id}', headers={'If-Match': stale})
+    assert response.status_code == 412
+    assert response.headers['ETag'] == current
+    assert client.get(f'/workouts/{workout_id}').status_code == 200
+
+def test_current_if_match_in_either_format_is_accepted(client, workout_id, new_exercise_id):
+    etag = client.get(f'/workouts/{workout_id}', headers=MSGPACK).headers['ETag']
+    response = client.post(
+        f'/workouts/{workout_id}/exercises/{new_exercise_id}/workout_exercises',
+        json={'reps': 5}, headers={'If-Match': etag},
+    )
+    assert response.status_code == 201
+
+    etag = client.get(f'/workouts/{workout_id}').headers['ETag']
+    assert client.delete(f'/workouts/{workout_id}', headers={'If-Match': etag}).status_code == 200
+    assert client.get(f'/workouts/{workout_id}').status_code == 404
+
+def test_validators_of_a_deleted_workout_do_not_match_its_reused_id(client):
+    workout = {'date': date.today().isoformat(), 'duration_minutes': 30}
+    first = client.post('/workouts', json=workout)
+    id = first.get_json()['id']
+    etag = client.get(f'/workouts/{id}').headers['ETag']
+    assert client.delete(f'/workouts/{id}').status_code == 200
+
+    # SQLite gives the next workout the same id, at version 1 again
+    second = client.post('/workouts', json=dict(workout, duration_minutes=45))
+    assert second.get_json()['id'] == id
+    assert second.headers['ETag'] != etag
+
+    response = client.get(f'/workouts/{id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.get_json()['duration_minutes'] == 45
+    assert client.delete(f'/workouts/{id}', headers={'If-Match': etag}).status_code == 412
+    assert client.get(f'/workouts/{id}').status_code == 200
@@ -0,0 +1,52 @@
+import json
+from datetime import date
+
+import msgpack
+import pytest
+
+import encoders
+
+MSGPACK = {'Accept': 'application/msgpack'}
+
+@pytest.fixture
+def without_orjson(monkeypatch):
+    monkeypatch.setattr(encoders, 'orjson', None)
+
+@pytest.fixture
+def without_msgpack(monkeypatch):
+    monkeypatch.setattr(encoders, 'msgpack', None)
+
+def test_dates_are_encoded_the_same_with_and_without_orjson(app, monkeypatch):
+    data = {'date': date(2024, 1, 2), 'n': 1}
+    fast = app.json.dumps(data)
+    monkeypatch.setattr(encoders, 'orjson', None)
+    assert json.loads(app.json.dumps(data)) == json.loads(fast) == {'date': '2024-01-02', 'n': 1}
+
+@pytest.mark.parametrize('url', ['/workouts?limit=3', '/exercises', '/workouts/1'])
+def test_standard_library_fallback_gives_the_same_body(client, monkeypatch, url):
+    fast = client.get(url)
+    monkeypatch.setattr(encoders, 'orjson', None)
+    fallback = client.get(url)
+    assert fallback.status_code == fast.status_code == 200
+    assert fallback.mimetype == 'application/json'
+    assert fallback.get_json() == fast.get_json()
+
+def test_msgpack_is_served_when_asked_for(client):
+    response = client.get('/workouts?limit=3', headers=MSGPACK)
+    assert response.mimetype == 'application/msgpack'
+    assert msgpack.unpackb(response.data) == client.get('/workouts?limit=3').get_json()
+
+@pytest.mark.usefixtures('without_msgpack')
+@pytest.mark.parametrize('url', ['/workouts?limit=3', '/exercises', '/workouts/1'])
+def test_without_msgpack_every_client_gets_json(client, url):
+    response = client.get(url, headers=MSGPACK)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+    assert response.headers['Vary'] == 'Accept'
+    assert response.get_json() == client.get(url).get_json()
+
+@pytest.mark.usefixtures('without_orjson', 'without_msgpack')
+def test_request_bodies_still_parse_without_orjson(client):
+    response = client.post('/workouts', json={'date': date.today().isoformat(), 'duration_minutes': 30})
+    assert response.status_code == 201
+    assert response.get_json()['duration_minutes'] == 30
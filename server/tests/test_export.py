@@ -0,0 +1,54 @@
+import csv
+import io
+import json
+
+from sqlalchemy import func, select
+
+from models import db, Workout, WorkoutExercise
+
+def counts(app, start_date=None):
+    with app.app_context():
+        workouts = select(func.count()).select_from(Workout)
+        links = select(func.count()).select_from(WorkoutExercise).join(Workout)
+        if start_date:
+            workouts = workouts.where(Workout.date >= start_date)
+            links = links.where(Workout.date >= start_date)
+        return db.session.scalar(workouts), db.session.scalar(links)
+
+def test_ndjson_export_streams_one_line_per_workout(app, client):
+    response = client.get('/workouts/export')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.headers['Content-Disposition'] == 'attachment; filename=workouts.ndjson'
+
+    workouts = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    workout_count, link_count = counts(app)
+    assert len(workouts) == workout_count
+    assert sum(len(workout['workout_exercises']) for workout in workouts) == link_count
+    assert [w['date'] for w in workouts] == sorted(w['date'] for w in workouts)
+
+def test_csv_export_has_a_row_per_workout_exercise(app, client):
+    response = client.get('/workouts/export?format=csv')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'text/csv'
+
+    header, *rows = csv.reader(io.StringIO(response.get_data(as_text=True)))
+    assert header[:2] == ['workout_id', 'date']
+    workout_count, link_count = counts(app)
+    linked = [row for row in rows if row[header.index('workout_exercise_id')]]
+    assert len(linked) == link_count
+    assert len({row[0] for row in rows}) == workout_count
+
+def test_export_is_filtered_by_date(app, client):
+    with app.app_context():
+        start_date = db.session.scalar(select(func.max(Workout.date)))
+    response = client.get(f'/workouts/export?start_date={start_date.isoformat()}')
+    lines = response.get_data(as_text=True).splitlines()
+    assert len(lines) == counts(app, start_date)[0]
+
+def test_export_rejects_unknown_format(client):
+    response = client.get('/workouts/export?format=xml')
+    assert response.status_code == 400
+    assert client.get('/workouts/export?start_date=soon').status_code == 400
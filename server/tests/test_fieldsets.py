@@ -0,0 +1,47 @@
+import pytest
+
+from query_counter import count_request_queries
+
+def test_fields_keep_only_the_named_fields(client):
+    full = client.get('/workouts?limit=5').get_json()
+    sparse = client.get('/workouts?limit=5&fields=date,notes').get_json()
+    assert sparse == [{'date': w['date'], 'notes': w['notes']} for w in full]
+
+    full = client.get('/exercises?limit=5').get_json()
+    sparse = client.get('/exercises?limit=5&fields=name').get_json()
+    assert sparse == [{'name': e['name']} for e in full]
+
+def test_include_embeds_only_the_named_collections(client):
+    full = client.get('/workouts?limit=5').get_json()
+    sparse = client.get('/workouts?limit=5&fields=id&include=exercises').get_json()
+    assert sparse == [{'id': w['id'], 'exercises': w['exercises']} for w in full]
+
+    sparse = client.get('/workouts?limit=5&include=workout_exercises').get_json()
+    for workout, full_workout in zip(sparse, full):
+        assert 'exercises' not in workout
+        assert [we['id'] for we in workout['workout_exercises']] == [we['id'] for we in full_workout['workout_exercises']]
+
+def test_detail_fieldsets(client):
+    workout = client.get('/workouts/1').get_json()
+    sparse = client.get('/workouts/1?fields=duration_minutes&include=exercises').get_json()
+    assert sparse == {'duration_minutes': workout['duration_minutes'], 'exercises': workout['exercises']}
+
+    exercise = client.get('/exercises/1').get_json()
+    assert client.get('/exercises/1?fields=name').get_json() == {'name': exercise['name']}
+    sparse = client.get('/exercises/1?fields=id&include=workouts').get_json()
+    assert [w['id'] for w in sparse['workouts']] == [w['id'] for w in exercise['workouts']]
+
+def test_collections_are_not_queried_unless_included(app):
+    assert count_request_queries(app, '/workouts?fields=id,date').count == 1
+    assert count_request_queries(app, '/workouts?fields=id&include=exercises').count == 2
+
+@pytest.mark.parametrize('url, message', [
+    ('/workouts?fields=id,weight', 'Unknown fields: weight (expected any of: id, date, duration_minutes, notes)'),
+    ('/workouts?fields=', 'fields cannot be empty'),
+    ('/workouts/1?include=sets', 'Unknown include: sets (expected any of: exercises, workout_exercises)'),
+    ('/exercises?fields=id&include=workouts', 'include is not supported here'),
+])
+def test_unknown_names_are_a_400(client, url, message):
+    response = client.get(url)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': message}
@@ -0,0 +1,31 @@
+import gc
+import os
+import weakref
+
+import pytest
+
+import app as app_module
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs os.fork")
+def test_forked_child_resets_the_apps_state(app):
+    generation = app.extensions['response_cache'].generation
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(write, app.extensions['response_cache'].generation.encode())
+        os._exit(0)
+    os.close(write)
+    child_generation = os.read(read, 64).decode()
+    os.close(read)
+    os.waitpid(pid, 0)
+    assert child_generation and child_generation != generation
+    assert app.extensions['response_cache'].generation == generation
+
+def test_dropped_apps_are_not_kept_for_fork_resets(app):
+    extra = app_module.create_app('testing')
+    assert {app, extra} <= set(app_module._apps)
+    extra_ref = weakref.ref(extra)
+    del extra
+    gc.collect()
+    assert extra_ref() is None
+    assert app in app_module._apps
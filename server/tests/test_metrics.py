@@ -0,0 +1,57 @@
+import logging
+import re
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import metrics
+from models import db
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+
+def sample(client, name, **labels):
+    """The value of one sample on /metrics, or None if it is absent"""
+    response = client.get('/metrics')
+    assert response.mimetype == 'text/plain'
+    wanted = {f'{key}="{value}"' for key, value in labels.items()}
+    for line in response.get_data(as_text=True).splitlines():
+        match = re.fullmatch(rf'{name}\{{(.*)\}} (\S+)', line)
+        if match and wanted <= set(match.group(1).split(',')):
+            return float(match.group(2))
+    return None
+
+def test_requests_and_queries_are_counted_per_route(client):
+    assert client.get('/workouts?limit=5').status_code == 200
+    assert client.get('/workouts?limit=5').status_code == 200
+    assert client.get('/workouts/0').status_code == 404
+
+    route = {'endpoint': 'api.get_workouts', 'method': 'GET'}
+    assert sample(client, 'http_requests_total', status=200, **route) == 2
+    assert sample(client, 'http_request_duration_seconds_count', **route) == 2
+    assert sample(client, 'db_queries_total', **route) == 4
+    assert sample(client, 'http_request_phase_seconds_count', phase='sql', **route) == 2
+    assert sample(client, 'http_requests_total', endpoint='api.get_workout', status=404) == 1
+    # The scrape itself is not measured
+    assert sample(client, 'http_requests_total', endpoint='metrics') is None
+
+def test_replica_queries_are_counted(make_app, replica_url):
+    app = make_app(REPLICA_DATABASE_URLS=[replica_url])
+    client = app.test_client()
+    assert client.get('/workouts/1').status_code == 200
+    assert sample(client, 'db_queries_total', endpoint='api.get_workout') == 2
+
+def test_failed_statements_leave_no_start_time_behind(app):
+    with app.app_context():
+        connection = db.session.connection()
+        with pytest.raises(OperationalError):
+            connection.execute(text('SELECT * FROM no_such_table'))
+        assert connection.info['query_start'] == {}
+
+def test_slow_queries_are_logged(make_app, caplog):
+    client = make_app(SLOW_QUERY_MS=0).test_client()
+    with caplog.at_level(logging.WARNING, logger='workout_api.slow_query'):
+        client.get('/workouts?limit=1')
+    assert any(record.getMessage().startswith('Slow query') for record in caplog.records)
@@ -0,0 +1,19 @@
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+
+from models import db
+from search import SEARCH_TABLES, is_search_object
+
+def include_object(object, name, type_, reflected, compare_to):
+    # The same filter as migrations/env.py
+    return not is_search_object(name, type_)
+
+def schema_diff(app, **opts):
+    with app.app_context(), db.engine.connect() as connection:
+        return compare_metadata(MigrationContext.configure(connection, opts=opts), db.metadata)
+
+def test_search_tables_are_not_autogenerated_away(app):
+    removed = {diff[1].name for diff in schema_diff(app) if diff[0] == 'remove_table'}
+    assert set(SEARCH_TABLES) <= removed
+
+    assert schema_diff(app, include_object=include_object) == []
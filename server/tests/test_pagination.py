@@ -0,0 +1,25 @@
+import pytest
+
+from pagination import encode_cursor
+
+@pytest.mark.parametrize('url', [
+    '/workouts?cursor=' + encode_cursor('not-a-date', 1),
+    '/workouts?cursor=' + encode_cursor('2024-01-01', 'abc'),
+    '/workouts?cursor=' + encode_cursor('2024-01-01', None),
+    '/workouts?cursor=garbage',
+    '/exercises?cursor=' + encode_cursor('abc'),
+    '/exercises?cursor=' + encode_cursor([1]),
+    '/search?q=run&cursor=' + encode_cursor('best', 1),
+    '/search?q=run&cursor=' + encode_cursor(1.5, None),
+    '/search?q=run&cursor=garbage',
+])
+def test_malformed_cursor_is_a_400(client, url):
+    response = client.get(url)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'Invalid cursor'
+
+def test_pages_follow_the_cursor(client):
+    first = client.get('/workouts?limit=5')
+    second = client.get(f"/workouts?limit=5&cursor={first.headers['X-Next-Cursor']}")
+    ids = [workout['id'] for workout in first.get_json() + second.get_json()]
+    assert len(set(ids)) == 10
@@ -0,0 +1,14 @@
+import pytest
+
+from query_counter import QUERY_BUDGETS, budget_urls, count_request_queries
+
+@pytest.mark.parametrize('route', QUERY_BUDGETS)
+def test_read_endpoint_stays_within_query_budget(app, route):
+    url = budget_urls(app)[route]
+    assert url is not None, f"the fixture database has no rows to request {route} with"
+    counter = count_request_queries(app, url)
+    assert counter.count <= QUERY_BUDGETS[route], '\n'.join(counter.statements)
+
+def test_workout_list_query_count_does_not_grow_with_page_size(app):
+    counts = {limit: count_request_queries(app, f'/workouts?limit={limit}').count for limit in (1, 50)}
+    assert counts[1] == counts[50]
@@ -0,0 +1,14 @@
+from query_plans import endpoint_urls, plan_problems
+
+def test_read_endpoints_do_not_scan_whole_tables(app):
+    failures = []
+    for url in endpoint_urls(app):
+        for statement, plan, scans in plan_problems(app, url):
+            failures.append(f"{url}: FULL SCAN of {', '.join(scans)}\n    {' '.join(statement.split())}\n      "
+                            + '\n      '.join(plan))
+    assert not failures, '\n'.join(failures)
+
+def test_every_endpoint_is_checked(app):
+    urls = endpoint_urls(app)
+    for prefix in ('/workouts/', '/exercises/', '/search?', '/stats/volume?'):
+        assert any(url.startswith(prefix) for url in urls), prefix
@@ -0,0 +1,16 @@
+import pytest
+
+@pytest.mark.parametrize('window, message', [
+    ('abc', 'window must be an integer'),
+    ('1.5', 'window must be an integer'),
+    ('0', 'window must be between 1 and 366'),
+])
+def test_malformed_window_is_a_400(client, window, message):
+    response = client.get(f'/exercises/1/progression?window={window}')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': message}
+
+def test_progression_uses_the_given_window(client):
+    response = client.get('/exercises/1/progression?window=7')
+    assert response.status_code == 200
+    assert response.get_json()['exercise']['id'] == 1
@@ -0,0 +1,31 @@
+import pytest
+from sqlalchemy import select
+
+from models import db, Exercise, Workout
+
+@pytest.fixture
+def ids(app):
+    with app.app_context():
+        return db.session.scalar(select(Workout.id).order_by(Workout.id)), db.session.scalar(select(Exercise.id).order_by(Exercise.id))
+
+def urls(ids):
+    """Each related-exercise endpoint, with the key its list is under"""
+    workout_id, exercise_id = ids
+    return [(f'/workouts/{workout_id}/suggestions', 'suggestions'), (f'/exercises/{exercise_id}/related', 'related')]
+
+def test_limit_caps_the_results(client, ids):
+    for url, key in urls(ids):
+        response = client.get(url, query_string={'limit': 1})
+        assert response.status_code == 200
+        assert len(response.get_json()[key]) == 1
+
+@pytest.mark.parametrize('limit, message', [
+    ('abc', "limit must be an integer"),
+    ('', "limit must be an integer"),
+    ('0', "limit must be between 1 and"),
+])
+def test_bad_limit_is_a_400(client, ids, limit, message):
+    for url, _ in urls(ids):
+        response = client.get(url, query_string={'limit': limit})
+        assert response.status_code == 400
+        assert response.get_json()['error'].startswith(message)
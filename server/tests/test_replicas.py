@@ -0,0 +1,68 @@
+import os
+import threading
+import time
+from datetime import date
+
+import pytest
+
+from replicas import STICKY_COOKIE
+
+def wait_for_checks(pool):
+    while any(replica.checking for replica in pool.replicas):
+        time.sleep(0.01)
+
+def create_workout(client):
+    response = client.post('/workouts', json={'date': date.today().isoformat(), 'duration_minutes': 30})
+    assert response.status_code == 201
+    return response
+
+def test_reads_go_to_the_replica(make_app, replica_url):
+    app = make_app(REPLICA_DATABASE_URLS=[replica_url])
+    writer, reader = app.test_client(), app.test_client()
+    id = create_workout(writer).get_json()['id']
+    # The replica never sees the write
+    assert reader.get(f'/workouts/{id}').status_code == 404
+
+def test_writer_reads_its_own_writes_from_the_primary(make_app, replica_url):
+    app = make_app(REPLICA_DATABASE_URLS=[replica_url], REPLICA_STICKY_SECONDS=0.5)
+    client = app.test_client()
+    response = create_workout(client)
+    cookie = response.headers['Set-Cookie']
+    assert cookie.startswith(f'{STICKY_COOKIE}=')
+    assert 'Max-Age=1;' in cookie
+
+    id = response.get_json()['id']
+    assert client.get(f'/workouts/{id}').status_code == 200
+    # Once the cookie expires, reads go back to the replica
+    time.sleep(1.1)
+    assert client.get(f'/workouts/{id}').status_code == 404
+
+def test_failed_replica_falls_back_to_the_primary(make_app, replica_url, tmp_path):
+    missing = 'sqlite:///' + os.path.join(str(tmp_path), 'missing', 'replica.db')
+    app = make_app(REPLICA_DATABASE_URLS=[missing])
+    pool = app.extensions['replicas']
+
+    client = app.test_client()
+    assert client.get('/workouts').status_code == 200
+    assert client.get('/workouts/1').status_code == 200
+    wait_for_checks(pool)
+    assert not pool.replicas[0].healthy
+
+def test_health_checks_do_not_delay_requests(make_app, replica_url):
+    app = make_app(REPLICA_DATABASE_URLS=[replica_url])
+    replica = app.extensions['replicas'].replicas[0]
+    release = threading.Event()
+    check = replica.check
+
+    def slow_check():
+        release.wait(5)
+        return check()
+    replica.check = slow_check
+
+    start = time.perf_counter()
+    assert app.test_client().get('/workouts').status_code == 200
+    assert time.perf_counter() - start < 1
+    assert replica.checking
+    release.set()
+    wait_for_checks(app.extensions['replicas'])
+    assert replica.healthy
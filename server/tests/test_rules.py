@@ -0,0 +1,73 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from models import db, Exercise, Workout, WorkoutExercise
+from rules import EXERCISE_RULES, WORKOUT_RULES, build_trusted
+from schemas import ExerciseSchema, WorkoutSchema, WorkoutExerciseSchema
+
+@pytest.mark.parametrize('data, field, message', [
+    ({'name': 'A', 'category': 'strength'}, 'name', "Length must be between 2 and 100."),
+    ({'name': '   ', 'category': 'strength'}, 'name', "Name cannot be empty or just whitespace"),
+    ({'name': 'Squat 2', 'category': 'strength'}, 'name', "Exercise name should not contain numbers"),
+    ({'name': ' a ', 'category': 'strength'}, 'name', "Exercise name must be at least 2 characters long"),
+    ({'name': 'Squat', 'category': 'Strength'}, 'category', "Must be one of: strength, cardio, flexibility, sports."),
+])
+def test_exercise_rule_messages(data, field, message):
+    assert ExerciseSchema().validate(data) == {field: [message]}
+
+@pytest.mark.parametrize('data, field, message', [
+    ({'date': '2000-01-01', 'duration_minutes': 30}, 'date', "Workout date cannot be more than 2 years old"),
+    ({'date': '9999-01-01', 'duration_minutes': 30}, 'date', "Workout date cannot be in the future"),
+    ({'duration_minutes': 0}, 'duration_minutes', "Must be greater than or equal to 1 and less than or equal to 480."),
+    ({'duration_minutes': 481}, 'duration_minutes', "Must be greater than or equal to 1 and less than or equal to 480."),
+    ({'notes': ' padded '}, 'notes', "Notes should not have leading or trailing whitespace"),
+    ({'notes': 'x' * 501}, 'notes', "Longer than maximum length 500."),
+])
+def test_workout_rule_messages(data, field, message):
+    data = dict({'date': date.today().isoformat(), 'duration_minutes': 30}, **data)
+    assert WorkoutSchema().validate(data) == {field: [message]}
+
+def test_workout_exercise_rule_messages():
+    errors = WorkoutExerciseSchema().validate({'workout_id': 1, 'exercise_id': 1, 'reps': 0, 'sets': 51})
+    assert errors == {
+        'reps': ["Must be greater than or equal to 1 and less than or equal to 1000."],
+        'sets': ["Must be greater than or equal to 1 and less than or equal to 50."],
+    }
+
+def test_models_keep_only_the_stored_value_checks(app):
+    # Request-only rules (date recency, lowercase category, no digits,
+    # stripped notes) do not apply to rows written outside the API
+    workout = Workout(date=date(2000, 1, 1), duration_minutes=30, notes=' padded ')
+    assert workout.notes == ' padded '
+    exercise = Exercise(name='  squat 2 ', category='STRENGTH')
+    assert (exercise.name, exercise.category) == ('Squat 2', 'strength')
+
+    with pytest.raises(ValueError, match="Duration cannot exceed 480 minutes"):
+        Workout(date=date.today(), duration_minutes=481)
+    with pytest.raises(ValueError, match="Notes cannot exceed 500 characters"):
+        Workout(date=date.today(), duration_minutes=30, notes='x' * 501)
+    with pytest.raises(ValueError, match="Category must be one of: strength, cardio"):
+        Exercise(name='Squat', category='yoga')
+    with pytest.raises(ValueError, match="Exercise name must be at least 2 characters long"):
+        Exercise(name=' a ', category='strength')
+
+def test_build_trusted_normalizes_without_running_the_hooks(app, monkeypatch):
+    def fail(*args):
+        raise AssertionError("model validator ran")
+    for rule in (EXERCISE_RULES['name'], EXERCISE_RULES['category'], WORKOUT_RULES['duration_minutes']):
+        monkeypatch.setattr(rule, 'checks', (fail,))
+
+    exercise = build_trusted(Exercise, EXERCISE_RULES, {'name': ' rules check ', 'category': 'Cardio', 'equipment_needed': True})
+    assert (exercise.name, exercise.category, exercise.equipment_needed) == ('Rules Check', 'cardio', True)
+    workout = build_trusted(Workout, WORKOUT_RULES, {'date': date(2000, 1, 1), 'duration_minutes': 30, 'notes': ''})
+    workout.workout_exercises.append(WorkoutExercise(exercise=exercise, reps=5))
+
+    with app.app_context():
+        db.session.add(workout)
+        db.session.commit()
+        stored = db.session.get(Workout, workout.id)
+        assert (stored.date, stored.duration_minutes) == (date(2000, 1, 1), 30)
+        assert db.session.scalar(select(Exercise.name).where(Exercise.id == exercise.id)) == 'Rules Check'
+        assert [we.exercise_id for we in stored.workout_exercises] == [exercise.id]
@@ -0,0 +1,109 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from models import db, Exercise, Workout, WorkoutExercise
+from schemas import exercise_schema, exercises_schema, workout_schema, workouts_schema
+from serializers import (
+    EXERCISE_COLUMNS, WORKOUT_COLUMNS, LINK_COLUMNS,
+    dump_exercises, dump_workouts, exercises_from_rows, workouts_from_rows,
+    workout_detail_from_rows, exercise_detail_from_rows,
+)
+
+SAMPLE = 200
+
+def normalize(value):
+    """Sort lists of dicts by id, since relationship order is not guaranteed"""
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        items = [normalize(item) for item in value]
+        if all(isinstance(item, dict) and 'id' in item for item in items):
+            items.sort(key=lambda item: item['id'])
+        return items
+    return value
+
+def link_rows(workout_ids):
+    return db.session.execute(
+        select(*LINK_COLUMNS)
+        .join(Exercise, Exercise.id == WorkoutExercise.exercise_id)
+        .where(WorkoutExercise.workout_id.in_(workout_ids))
+        .order_by(WorkoutExercise.id)
+    ).all()
+
+@pytest.fixture
+def session(app):
+    with app.app_context():
+        yield db.session
+
+@pytest.fixture
+def workouts(session):
+    return Workout.query.options(
+        selectinload(Workout.exercises),
+        selectinload(Workout.workout_exercises).joinedload(WorkoutExercise.exercise),
+    ).order_by(Workout.id).limit(SAMPLE).all()
+
+@pytest.fixture
+def workout_rows(workouts):
+    ids = [w.id for w in workouts]
+    return db.session.execute(select(*WORKOUT_COLUMNS).where(Workout.id.in_(ids)).order_by(Workout.id)).all()
+
+@pytest.fixture
+def exercises(session):
+    return Exercise.query.order_by(Exercise.id).all()
+
+def test_dump_workouts_matches_schema(workouts):
+    assert normalize(dump_workouts(workouts)) == normalize(workouts_schema.dump(workouts))
+
+def test_workouts_from_rows_matches_schema(workouts, workout_rows):
+    links = link_rows([w.id for w in workouts])
+    assert normalize(workouts_from_rows(workout_rows, links)) == normalize(workouts_schema.dump(workouts))
+
+def test_exercise_serializers_match_schema(exercises):
+    rows = db.session.execute(select(*EXERCISE_COLUMNS).order_by(Exercise.id)).all()
+    expected = exercises_schema.dump(exercises)
+    assert dump_exercises(exercises) == expected
+    assert exercises_from_rows(rows) == expected
+
+def test_workout_detail_matches_schema(workouts, workout_rows):
+    links = link_rows([w.id for w in workouts])
+    for workout, row in zip(workouts, workout_rows):
+        # GET /workouts/<id> flattens workout_exercises to these fields
+        expected = workout_schema.dump(workout)
+        expected['workout_exercises'] = [
+            {'id': we.id, 'exercise': exercise_schema.dump(we.exercise),
+             'reps': we.reps, 'sets': we.sets, 'duration_seconds': we.duration_seconds}
+            for we in workout.workout_exercises
+        ]
+        actual = workout_detail_from_rows(row, [link for link in links if link.workout_id == workout.id])
+        assert normalize(actual) == normalize(expected), f"workout {workout.id}"
+
+def test_exercise_detail_matches_schema(exercises):
+    for exercise in exercises:
+        expected = exercise_schema.dump(exercise)
+        expected['workouts'] = [
+            {'id': w.id, 'date': w.date.isoformat(), 'duration_minutes': w.duration_minutes, 'notes': w.notes}
+            for w in exercise.workouts
+        ]
+        row = db.session.execute(select(*EXERCISE_COLUMNS).where(Exercise.id == exercise.id)).one()
+        workout_rows = db.session.execute(
+            select(*WORKOUT_COLUMNS)
+            .join(WorkoutExercise, WorkoutExercise.workout_id == Workout.id)
+            .where(WorkoutExercise.exercise_id == exercise.id)
+        ).all()
+        assert normalize(exercise_detail_from_rows(row, workout_rows)) == normalize(expected), f"exercise {exercise.id}"
+
+def test_detail_serializers_convert_values_like_the_others():
+    exercise = (3, 'rowing', 'cardio', 1)
+    link = (7, 11, None, '4', 30.0) + exercise
+    detail = workout_detail_from_rows((7, date(2024, 1, 2), '45', None), [link])
+    assert detail['workout_exercises'] == [{
+        'id': 11, 'exercise': {'category': 'cardio', 'equipment_needed': True, 'id': 3, 'name': 'rowing'},
+        'reps': None, 'sets': 4, 'duration_seconds': 30,
+    }]
+    assert detail['duration_minutes'] == 45
+
+    detail = exercise_detail_from_rows(exercise, [('7', None, 45, None)])
+    assert detail['workouts'] == [{'id': 7, 'date': None, 'duration_minutes': 45, 'notes': None}]
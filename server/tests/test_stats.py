@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import select
+
+from app import create_app
+from models import db, ExerciseVolume, Workout
+from query_counter import count_queries
+from query_plans import explain, full_scans
+from stats import rebuild_volume
+
+def volume_rows():
+    return db.session.execute(select(ExerciseVolume).order_by(ExerciseVolume.day, ExerciseVolume.exercise_id)).scalars().all()
+
+def snapshot(rows):
+    return [(row.day, row.exercise_id, row.workout_count, row.total_sets, row.total_reps) for row in rows]
+
+def test_deleting_workouts_keeps_rollup_equal_to_a_rebuild(app, client):
+    with app.app_context():
+        ids = db.session.scalars(select(Workout.id).order_by(Workout.id).limit(20)).all()
+    for id in ids:
+        assert client.delete(f'/workouts/{id}').status_code == 200
+
+    with app.app_context():
+        incremental = snapshot(volume_rows())
+        rebuild_volume()
+        assert incremental == snapshot(volume_rows())
+        db.session.rollback()
+
+def test_workout_delete_does_not_scan_the_rollup(app, client):
+    with app.app_context():
+        id = db.session.scalar(select(Workout.id).order_by(Workout.id.desc()))
+        engine = db.engine
+    with count_queries(engine) as counter:
+        assert client.delete(f'/workouts/{id}').status_code == 200
+
+    deletes = [
+        (statement, parameters) for statement, parameters in zip(counter.statements, counter.parameters)
+        if statement.lstrip().upper().startswith('DELETE FROM EXERCISE_VOLUME')
+    ]
+    assert deletes
+    with engine.connect() as connection:
+        for statement, parameters in deletes:
+            assert full_scans('sqlite', statement, explain(connection, statement, parameters)) == []
+
+def test_databases_without_upsert_are_refused_at_startup():
+    with pytest.raises(ValueError, match="Unsupported database 'mysql'"):
+        create_app('testing', {'SQLALCHEMY_DATABASE_URI': 'mysql://localhost/workouts'})
+
+def test_malformed_exercise_id_is_a_400(client):
+    response = client.get('/stats/volume?exercise_id=abc')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'exercise_id must be an integer'
@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import func, select
+
+from models import db, Exercise, Workout, WorkoutExercise
+
+@pytest.fixture
+def ids(app):
+    """A workout, one of its exercises, two exercises it does not have, and an id no exercise has"""
+    with app.app_context():
+        workout_id = db.session.scalar(select(Workout.id).where(Workout.workout_exercises.any()).order_by(Workout.id))
+        linked = select(WorkoutExercise.exercise_id).where(WorkoutExercise.workout_id == workout_id)
+        existing = db.session.scalar(linked.limit(1))
+        free = list(db.session.scalars(select(Exercise.id).where(Exercise.id.not_in(linked)).order_by(Exercise.id).limit(2)))
+        missing = db.session.scalar(select(func.max(Exercise.id))) + 1
+    return workout_id, existing, free, missing
+
+@pytest.fixture(params=[False, True], ids=['direct', 'write_behind'])
+def attach_client(request, make_app):
+    """Single adds go through the write-behind queue when it is on, so both paths are checked"""
+    return make_app(WRITE_BEHIND=request.param).test_client()
+
+def add_one(client, workout_id, exercise_id):
+    return client.post(f'/workouts/{workout_id}/exercises/{exercise_id}/workout_exercises', json={'reps': 5})
+
+def add_many(client, workout_id, exercise_ids):
+    return client.post(f'/workouts/{workout_id}/workout_exercises', json=[{'exercise_id': id, 'sets': 3} for id in exercise_ids])
+
+def assert_error(response, status, message):
+    assert response.status_code == status
+    assert response.get_json() == {'error': message}
+
+def test_single_add(attach_client, ids):
+    workout_id, existing, free, missing = ids
+    response = add_one(attach_client, workout_id, free[0])
+    assert response.status_code == 201
+    assert response.get_json()['exercise']['id'] == free[0]
+
+    assert_error(add_one(attach_client, workout_id, existing), 409, "Exercise already added to this workout")
+    assert_error(add_one(attach_client, workout_id, missing), 404, "Exercise not found")
+    assert_error(add_one(attach_client, 10 ** 9, free[1]), 404, "Workout not found")
+
+def test_batch_add(client, ids):
+    workout_id, existing, free, missing = ids
+    response = add_many(client, workout_id, free)
+    assert response.status_code == 201
+    assert sorted(we['exercise']['id'] for we in response.get_json()) == sorted(free)
+
+def test_batch_add_is_all_or_nothing(app, client, ids):
+    workout_id, existing, free, missing = ids
+    with app.app_context():
+        before = db.session.scalar(select(func.count()).select_from(WorkoutExercise).where(WorkoutExercise.workout_id == workout_id))
+
+    assert_error(add_many(client, workout_id, [free[0], existing]), 409, "One or more exercises are already added to this workout")
+    assert_error(add_many(client, workout_id, [free[0], missing]), 404, "Exercise not found")
+    assert_error(add_many(client, 10 ** 9, free), 404, "Workout not found")
+    assert_error(add_many(client, workout_id, [free[0], free[0]]), 400, "Each exercise can only be added to a workout once")
+
+    with app.app_context():
+        after = db.session.scalar(select(func.count()).select_from(WorkoutExercise).where(WorkoutExercise.workout_id == workout_id))
+    assert after == before
@@ -0,0 +1,95 @@
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+from sqlalchemy import func, select
+
+import app as app_module
+from models import db, Exercise, Workout, WorkoutExercise
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture
+def free_pair(make_app):
+    """A (workout_id, exercise_id) that are not linked yet"""
+    app = make_app()
+    with app.app_context():
+        workout_id = db.session.scalar(select(Workout.id).order_by(Workout.id))
+        linked = select(WorkoutExercise.exercise_id).where(WorkoutExercise.workout_id == workout_id)
+        exercise_id = db.session.scalar(select(Exercise.id).where(Exercise.id.not_in(linked)).order_by(Exercise.id))
+    return workout_id, exercise_id
+
+def link_count(app, workout_id, exercise_id):
+    with app.app_context():
+        return db.session.scalar(select(func.count()).select_from(WorkoutExercise).where(
+            WorkoutExercise.workout_id == workout_id, WorkoutExercise.exercise_id == exercise_id
+        ))
+
+def test_sync_ack_answers_once_the_row_is_committed(make_app, free_pair):
+    app = make_app(WRITE_BEHIND=True)
+    workout_id, exercise_id = free_pair
+    response = app.test_client().post(f'/workouts/{workout_id}/exercises/{exercise_id}/workout_exercises', json={'reps': 8})
+    assert response.status_code == 201
+    assert response.get_json()['exercise']['id'] == exercise_id
+    assert link_count(app, workout_id, exercise_id) == 1
+
+def test_stalled_flusher_gets_a_503_instead_of_hanging(make_app, free_pair):
+    app = make_app(WRITE_BEHIND=True, WRITE_BEHIND_ACK_TIMEOUT_MS=50)
+    write_queue = app.extensions['write_behind']
+    release = threading.Event()
+    write_batch = write_queue.write_batch
+
+    def stalled_write_batch(entries):
+        release.wait(10)
+        return write_batch(entries)
+    write_queue.write_batch = stalled_write_batch
+
+    workout_id, exercise_id = free_pair
+    response = app.test_client().post(f'/workouts/{workout_id}/exercises/{exercise_id}/workout_exercises', json={'reps': 8})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+    # Once the flusher recovers, the queued row is still written
+    release.set()
+    write_queue.close()
+    assert link_count(app, workout_id, exercise_id) == 1
+
+# Runs in a fresh interpreter, so atexit.register is patched before
+# write_behind registers its hook at import
+ATEXIT_SCRIPT = """
+import atexit
+registered = []
+atexit.register = registered.append
+
+from flask import Flask
+import write_behind
+
+app = Flask(__name__)
+for _ in range(2):
+    write_queue = write_behind.GroupCommitQueue(app, lambda entries: [None] * len(entries))
+    write_queue.result(write_queue.submit('row'))
+    # A forked child starts its own flusher without registering again
+    write_queue.after_fork()
+    write_queue.result(write_queue.submit('row'))
+    write_queue.close()
+hooks = [hook for hook in registered if getattr(hook, '__module__', None) == 'write_behind']
+assert hooks == [write_behind._close_queues], hooks
+"""
+
+def test_queues_are_closed_by_one_atexit_hook():
+    result = subprocess.run([sys.executable, '-c', ATEXIT_SCRIPT], cwd=SERVER_DIR, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+def test_a_failure_after_the_insert_rolls_the_batch_back(make_app, free_pair, monkeypatch):
+    def fail(*args):
+        raise RuntimeError("describing the new links failed")
+    monkeypatch.setattr(app_module, 'describe_new_links', fail)
+
+    app = make_app(WRITE_BEHIND=True)
+    workout_id, exercise_id = free_pair
+    response = app.test_client().post(f'/workouts/{workout_id}/exercises/{exercise_id}/workout_exercises', json={'reps': 8})
+    assert response.status_code == 400
+    # The batch's savepoint did not commit the insert on its own
+    assert link_count(app, workout_id, exercise_id) == 0
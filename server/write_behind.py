@@ -0,0 +1,187 @@
+"""Write-behind queue: group commits for high-frequency single-row writes.
+
+Requests put their rows on a bounded in-process queue, and one background
+thread writes whatever has gathered in a single transaction, at most
+`interval` seconds after the oldest row arrived or as soon as `max_rows`
+are waiting. Many requests then share one commit, so one fsync on SQLite.
+
+Acknowledgements:
+
+- sync: submit() returns a Future that resolves once the row's transaction
+  has committed (or fails with the row's own error). The request waits on
+  it through result(), so a success response still means the row is
+  durable. If the flusher stalls, result() gives up after `ack_timeout`
+  seconds with AckTimeout, which the routes answer with a 503; the row may
+  still be written later.
+- async: the request is answered as soon as its row is queued. Rows still
+  in the queue are lost if the process dies; failures are only logged.
+
+When the queue is full, submit() waits up to `timeout` seconds for room
+and then raises QueueFull, which the routes answer with a 503. close(),
+run at exit for every live queue by one atexit hook (which forked children
+inherit), stops intake and flushes everything queued.
+"""
+import atexit
+import queue
+import threading
+import time
+import weakref
+from concurrent import futures
+
+from models import db
+
+ACK_MODES = ('sync', 'async')
+
+class QueueFull(Exception):
+    """The write queue had no room for a row (or is shutting down)"""
+
+
+class AckTimeout(Exception):
+    """A queued row was not written within ack_timeout"""
+
+
+class GroupCommitQueue:
+    """Bounded queue of rows written in batches by write_batch(entries).
+
+    write_batch runs in an app context and returns one result per entry:
+    the value its Future resolves to, or an exception to fail it with.
+    Raising fails the whole batch.
+    """
+
+    def __init__(self, app, write_batch, ack='sync', max_rows=500, interval=0.005, max_pending=10000, timeout=0.1,
+                 ack_timeout=10.0):
+        if ack not in ACK_MODES:
+            raise ValueError(f"Unknown write-behind ack mode {ack!r}; expected one of: {', '.join(ACK_MODES)}")
+        self.app = app
+        self.write_batch = write_batch
+        self.ack = ack
+        self.max_rows = max_rows
+        self.interval = interval
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.ack_timeout = ack_timeout
+        self.after_fork()
+        _queues.add(self)
+
+    def after_fork(self):
+        """Start empty and stopped; the parent's flusher thread does not exist in a forked child"""
+        self._queue = queue.Queue(self.max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def submit(self, entry):
+        """Queue one entry; returns the Future of its write"""
+        if self._closed:
+            raise QueueFull("The server is shutting down; retry the write")
+        self._start()
+        future = futures.Future()
+        try:
+            self._queue.put((entry, future), timeout=self.timeout)
+        except queue.Full:
+            raise QueueFull("Too many writes pending; retry shortly")
+        return future
+
+    def result(self, future):
+        """Wait up to ack_timeout for a submitted entry's result"""
+        try:
+            return future.result(self.ack_timeout)
+        except futures.TimeoutError:
+            raise AckTimeout("The write was queued but not confirmed in time; it may still be applied")
+
+    def close(self, timeout=None):
+        """Stop taking writes and flush everything already queued"""
+        self._closed = True
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        self._queue.put(None)
+        thread.join(timeout)
+        if thread.is_alive():
+            self.app.logger.error("Write-behind flusher did not stop within %ss; queued rows may be lost", timeout)
+            return
+        # Rows that slipped in behind the stop marker
+        leftovers = self._drain()
+        if leftovers:
+            self._flush(leftovers)
+
+    def _start(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='write-behind', daemon=True)
+                    self._thread.start()
+
+    def _drain(self):
+        pending = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return pending
+            if item is not None:
+                pending.append(item)
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.interval
+            stop = False
+            while len(batch) < self.max_rows:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._flush(batch)
+            if stop:
+                return
+
+    def _flush(self, batch):
+        entries = [entry for entry, _ in batch]
+        with self.app.app_context():
+            try:
+                results = self.write_batch(entries)
+            except Exception as e:
+                db.session.rollback()
+                self.app.logger.exception("Write-behind batch of %d rows failed", len(entries))
+                results = [e] * len(entries)
+        for (entry, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                if self.ack == 'async':
+                    self.app.logger.warning("Queued write %r failed: %s", entry, result)
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+# Every live queue, flushed at exit by the one hook below
+_queues = weakref.WeakSet()
+
+def _close_queues():
+    for write_queue in list(_queues):
+        write_queue.close()
+
+atexit.register(_close_queues)
+
+def create_write_queue(app, write_batch):
+    """A GroupCommitQueue configured from the app's WRITE_BEHIND_* settings"""
+    config = app.config
+    return GroupCommitQueue(
+        app, write_batch,
+        ack=config['WRITE_BEHIND_ACK'],
+        max_rows=config['WRITE_BEHIND_MAX_ROWS'],
+        interval=config['WRITE_BEHIND_INTERVAL_MS'] / 1000,
+        max_pending=config['WRITE_BEHIND_QUEUE_SIZE'],
+        timeout=config['WRITE_BEHIND_ENQUEUE_TIMEOUT_MS'] / 1000,
+        ack_timeout=config['WRITE_BEHIND_ACK_TIMEOUT_MS'] / 1000,
+    )
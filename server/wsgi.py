@@ -0,0 +1,22 @@
+"""WSGI entry point for pre-forking servers.
+
+    gunicorn --preload --workers 4 wsgi:app
+
+With --preload the app is built and warmed up once in the master, then
+forked: workers start serving at once and share the master's memory
+pages copy-on-write. Each worker still gets its own database connections,
+response cache generation and metrics (app.reset_after_fork). Without
+--preload every worker imports and builds the app itself.
+
+Flask-Migrate is not loaded here; run `flask db` for migrations.
+"""
+import gc
+
+from app import create_app, warm_up
+
+app = create_app(overrides={'LOAD_MIGRATIONS': False})
+warm_up(app)
+
+# Keep the collector off everything built so far; otherwise its first pass
+# in each worker writes to (and so copies) every page of the master's objects
+gc.freeze()